@@ -0,0 +1,191 @@
+"""
+Generate many courses from a JSONL file of course configurations
+
+Each line is one course:
+
+    {"user": "Ada Lovelace", "difficulty_level": "Intermediate", "duration": "12 weeks",
+     "teaching_style": "Hands-on", "curriculum": "curricula/ml.pdf", "output_dir": "batch/ada"}
+
+"curriculum" defaults to Inputs and Outputs/curriculum.pdf and "output_dir" to
+Inputs and Outputs/batch/<user>. Every course runs the full pipeline
+(pipeline.py) in its own subprocess with the course directory as working
+directory, so all of its "Inputs and Outputs" files stay separate. At most
+--workers courses run at once. The response cache, summary cache, replay
+fixtures and the Gemini rate limiter are shared by every course.
+
+Usage: python batch.py COURSES.jsonl [--workers N] [--stages STAGE ...] [--force STAGE ...] [--combined-agents]
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+IO_DIR = "Inputs and Outputs"
+DEFAULT_BATCH_DIR = PROJECT_ROOT / IO_DIR / "batch"
+DEFAULT_CURRICULUM = PROJECT_ROOT / IO_DIR / "curriculum.pdf"
+DEFAULT_WORKERS = 2
+REQUIRED_FIELDS = ("difficulty_level", "duration", "teaching_style")
+
+
+def slugify(text):
+    return re.sub(r'[^a-z0-9]+', '-', str(text).lower()).strip('-') or "course"
+
+
+def load_courses(path):
+    """Read and validate the course records, resolving paths relative to the JSONL file"""
+    base_dir = Path(path).resolve().parent
+    courses = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            record = json.loads(line)
+            missing = [field for field in REQUIRED_FIELDS if not record.get(field)]
+            if missing:
+                raise ValueError(f"{path}:{line_number}: missing {', '.join(missing)}")
+
+            user = record.get("user") or record.get("user_name") or f"course-{line_number}"
+            curriculum = Path(record.get("curriculum") or record.get("curriculum_path") or DEFAULT_CURRICULUM)
+            output_dir = Path(record.get("output_dir") or DEFAULT_BATCH_DIR / f"{slugify(user)}-{line_number}")
+            courses.append({
+                "name": f"{slugify(user)}-{line_number}",
+                "user_config": {
+                    "user_name": user,
+                    "user_id": record.get("user_id") or slugify(user),
+                    "difficulty_level": record["difficulty_level"],
+                    "duration": record["duration"],
+                    "teaching_style": record["teaching_style"],
+                },
+                "curriculum": curriculum if curriculum.is_absolute() else base_dir / curriculum,
+                "output_dir": output_dir if output_dir.is_absolute() else base_dir / output_dir,
+            })
+    return courses
+
+
+def shared_environment():
+    """Environment shared by every course: one cache, one summary cache, one rate limiter"""
+    shared_dir = PROJECT_ROOT / IO_DIR / ".cache"
+    env = dict(os.environ)
+    env.setdefault("LLM_CACHE_DIR", str(shared_dir / "llm"))
+    env.setdefault("PROMPT_BUDGET_CACHE_DIR", str(shared_dir / "summaries"))
+    env.setdefault("GEMINI_RATE_LIMIT_DB", str(shared_dir / "ratelimit.sqlite"))
+    env.setdefault("COPILOT_FIXTURES_DIR", str(PROJECT_ROOT / IO_DIR / ".fixtures"))
+    env["PYTHONUNBUFFERED"] = "1"
+    return env
+
+
+def prepare_course(course):
+    """Create the course directory with its user_config.json"""
+    io_dir = course["output_dir"] / IO_DIR
+    io_dir.mkdir(parents=True, exist_ok=True)
+    with open(course["output_dir"] / "user_config.json", 'w', encoding='utf-8') as f:
+        json.dump(course["user_config"], f, indent=2)
+    return io_dir
+
+
+async def run_course(course, semaphore, env, pipeline_args):
+    """Run pipeline.py for one course and return its status record"""
+    async with semaphore:
+        log_path = course["output_dir"] / "pipeline.log"
+        print(f"▶️ [{course['name']}] started -> {course['output_dir']}")
+        start = time.perf_counter()
+        if not course["curriculum"].exists():
+            returncode, error, log_path = None, f"curriculum not found: {course['curriculum']}", None
+        else:
+            io_dir = prepare_course(course)
+            course_env = dict(env)
+            course_env["COPILOT_IO_DIR"] = str(io_dir.resolve())
+            course_env["COPILOT_CURRICULUM_PATH"] = str(course["curriculum"])
+            course_env["COPILOT_TRACE_ID"] = f"batch-{course['name']}"
+            with open(log_path, 'wb') as log:
+                process = await asyncio.create_subprocess_exec(
+                    sys.executable, str(PROJECT_ROOT / "pipeline.py"), *pipeline_args,
+                    cwd=course["output_dir"], env=course_env,
+                    stdin=asyncio.subprocess.DEVNULL, stdout=log, stderr=asyncio.subprocess.STDOUT,
+                )
+                returncode = await process.wait()
+            error = None if returncode == 0 else f"pipeline exited with code {returncode}, see {log_path}"
+        seconds = time.perf_counter() - start
+
+        status = "ok" if error is None else "failed"
+        print(f"{'✅' if status == 'ok' else '❌'} [{course['name']}] {status} in {seconds:.1f}s")
+        return {
+            "course": course["name"],
+            "user": course["user_config"]["user_name"],
+            "output_dir": str(course["output_dir"]),
+            "status": status,
+            "seconds": seconds,
+            "returncode": returncode,
+            "error": error,
+            "log": str(log_path) if log_path else None,
+        }
+
+
+async def run_batch(courses, workers=DEFAULT_WORKERS, pipeline_args=()):
+    semaphore = asyncio.Semaphore(max(1, workers))
+    env = shared_environment()
+    return await asyncio.gather(*(run_course(course, semaphore, env, list(pipeline_args)) for course in courses))
+
+
+def print_report(results, total_seconds):
+    print(f"\n{'=' * 70}")
+    print("📋 BATCH REPORT")
+    print(f"{'=' * 70}")
+    print(f"{'course':<32}{'status':<10}{'duration (s)':>15}")
+    for result in results:
+        print(f"{result['course'][:31]:<32}{result['status']:<10}{result['seconds']:>15.1f}")
+    print(f"{'-' * 57}")
+    succeeded = sum(1 for result in results if result["status"] == "ok")
+    print(f"{succeeded}/{len(results)} courses succeeded, total wall time {total_seconds:.1f}s")
+    for result in results:
+        if result["error"]:
+            print(f"   {result['course']}: {result['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate many courses from a JSONL file of course configurations")
+    parser.add_argument("courses", help="JSONL file with one course configuration per line")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="courses generated in parallel")
+    parser.add_argument("--stages", nargs="+", help="only run these pipeline stages")
+    parser.add_argument("--force", nargs="+", help="rebuild these pipeline stages even if up to date")
+    parser.add_argument("--combined-agents", action="store_true",
+                        help="plan each course and write its deep content in one agent session")
+    parser.add_argument("--report", help="where to write the JSON report (default: next to the courses file)")
+    args = parser.parse_args()
+
+    load_dotenv(dotenv_path=PROJECT_ROOT / ".env", override=False)
+    courses = load_courses(args.courses)
+    print(f"📚 {len(courses)} courses, {args.workers} workers")
+
+    pipeline_args = []
+    if args.stages:
+        pipeline_args += ["--stages", *args.stages]
+    if args.force:
+        pipeline_args += ["--force", *args.force]
+    if args.combined_agents:
+        pipeline_args.append("--combined-agents")
+
+    started = time.perf_counter()
+    results = asyncio.run(run_batch(courses, args.workers, pipeline_args))
+    total_seconds = time.perf_counter() - started
+    print_report(results, total_seconds)
+
+    report_path = args.report or str(Path(args.courses).with_suffix(".report.json"))
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump({"total_seconds": total_seconds, "courses": results}, f, indent=2)
+    print(f"💾 Report saved to {report_path}")
+
+    if any(result["status"] != "ok" for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Agent runner benchmark: separate planner/deep processes vs. one combined session
+
+Runs the course plan and deep content steps the way pipeline.py used to
+(copilot/main.py, then copilot/deep_main.py, each in its own interpreter
+reading the previous step's file) and with deep_main's combined mode (one
+interpreter, one ADK session, plan passed through session state, as
+pipeline.py --combined-agents runs it). Gemini is
+replaced by a canned in-process model, so the numbers are the runner overhead:
+interpreter start, ADK/genai imports, session setup and file round-trips
+through "Inputs and Outputs".
+
+Usage: python benchmarks/bench_combined_agents.py [--weeks 12] [--repeat 3] [--latency 0]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+FLOWS = {
+    "separate": ["planner", "deep"],
+    "combined": ["combined"],
+}
+
+
+def fake_plan(weeks):
+    return "# Course Plan\n\n" + "".join(f"## Week {n}: Topic {n}\n- Objective {n}\n\n" for n in range(1, weeks + 1))
+
+
+def fake_deep_content(weeks):
+    return "\n\n".join(
+        f"=== PROCESSING WEEK {n} ===\n# Week {n}: Topic {n}\n" + f"Lesson text for week {n}. " * 200 + f"\n=== WEEK {n} COMPLETED ==="
+        for n in range(1, weeks + 1)
+    ) + "\n\nDONE and DUSTED"
+
+
+def run_child(step, io_dir, weeks, latency):
+    """Run one step in this interpreter with a canned model and print its measurements as JSON"""
+    opens = {"reads": 0, "writes": 0}
+
+    def audit(event, args):
+        if event == "open" and isinstance(args[0], str) and args[0].startswith(io_dir) and args[0].endswith(".txt"):
+            opens["writes" if any(c in (args[1] or "r") for c in "wax+") else "reads"] += 1
+
+    sys.addaudithook(audit)
+    sys.path[:0] = [str(PROJECT_ROOT), str(PROJECT_ROOT / "copilot")]
+    started = time.perf_counter()
+    from google.adk.models.google_llm import Gemini
+    from google.adk.models.llm_response import LlmResponse
+    from google.genai import types
+    module = {"planner": "copilot.main", "deep": "copilot.deep_main", "combined": "copilot.deep_main"}[step]
+    runner_module = __import__(module, fromlist=["main_async"])
+    options = {"combined": True} if step == "combined" else {}
+    import_seconds = time.perf_counter() - started
+
+    async def fake_generate_content_async(self, llm_request, stream=False):
+        system = str(llm_request.config.system_instruction or "")
+        text = fake_plan(weeks) if "Course Planner Agent" in system else fake_deep_content(weeks)
+        await asyncio.sleep(latency)
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]))
+
+    Gemini.generate_content_async = fake_generate_content_async
+    started = time.perf_counter()
+    asyncio.run(runner_module.main_async(**options))
+    run_seconds = time.perf_counter() - started
+    print(json.dumps({"import_seconds": import_seconds, "run_seconds": run_seconds, **opens}))
+
+
+def run_flow(flow, weeks, latency):
+    """Run a flow's steps as subprocesses in a fresh output directory; returns summed measurements"""
+    with tempfile.TemporaryDirectory() as tmp:
+        io_dir = Path(tmp) / "Inputs and Outputs"
+        io_dir.mkdir()
+        (io_dir / "planner_agent_instruction.txt").write_text("Course: Benchmarking 101\nDuration: 12 weeks\n", encoding="utf-8")
+        env = dict(os.environ, COPILOT_IO_DIR=str(io_dir), COPILOT_GENAI_MODE="live", COPILOT_TRACE="off",
+                   COPILOT_DEEP_RESUME="off", GEMINI_API_KEY=os.getenv("GEMINI_API_KEY") or "benchmark")
+        totals = {"processes": 0, "wall_seconds": 0.0, "import_seconds": 0.0, "run_seconds": 0.0, "reads": 0, "writes": 0}
+        for step in FLOWS[flow]:
+            started = time.perf_counter()
+            result = subprocess.run(
+                [sys.executable, __file__, "--child", step, "--io-dir", str(io_dir), "--weeks", str(weeks), "--latency", str(latency)],
+                cwd=tmp, env=env, capture_output=True, text=True,
+            )
+            wall = time.perf_counter() - started
+            if result.returncode != 0:
+                raise RuntimeError(f"{flow}/{step} failed:\n{result.stdout[-2000:]}\n{result.stderr[-2000:]}")
+            measurements = json.loads(result.stdout.strip().splitlines()[-1])
+            totals["processes"] += 1
+            totals["wall_seconds"] += wall
+            for key in ("import_seconds", "run_seconds", "reads", "writes"):
+                totals[key] += measurements[key]
+        if not (io_dir / "deep_agent_output.txt").exists():
+            raise RuntimeError(f"{flow} did not write deep_agent_output.txt")
+        return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare separate planner/deep processes with the combined ADK session")
+    parser.add_argument("--weeks", type=int, default=12, help="weeks in the canned course")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per flow (median reported)")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated seconds per model call")
+    parser.add_argument("--child", choices=["planner", "deep", "combined"], help=argparse.SUPPRESS)
+    parser.add_argument("--io-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.io_dir, args.weeks, args.latency)
+        return
+
+    print(f"{'flow':<10}{'procs':>6}{'wall (s)':>10}{'imports (s)':>13}{'run (s)':>9}{'txt reads':>11}{'txt writes':>12}")
+    for flow in FLOWS:
+        runs = [run_flow(flow, args.weeks, args.latency) for _ in range(args.repeat)]
+        median = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+        print(f"{flow:<10}{median['processes']:>6.0f}{median['wall_seconds']:>10.2f}{median['import_seconds']:>13.2f}"
+              f"{median['run_seconds']:>9.2f}{median['reads']:>11.0f}{median['writes']:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Deep content output benchmark: open/append per event vs. the buffered writer
+
+Replays a synthetic stream of labelled agent events into deep_agent_output.txt
+the way copilot/deep_main.py used to (open in append mode per event, keep every
+chunk in memory, rewrite the file at the end) and with AsyncBufferedWriter.
+Reports wall time, write/fsync calls and tracemalloc peak memory for growing
+course lengths; the buffered writer's peak should stay flat.
+
+Usage: python benchmarks/bench_deep_writer.py [--events 1000 5000 20000] [--chunk-bytes 2000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from buffered_writer import AsyncBufferedWriter
+
+
+def make_event(i, chunk_bytes):
+    body = (f"Week {i // 50 + 1} lesson text, paragraph {i}. " * (chunk_bytes // 40 + 1))[:chunk_bytes]
+    return f"--- [DeepCourseContentCreator | ] ---\n{body}\n"
+
+
+async def write_per_event(path, events, chunk_bytes):
+    """The previous deep_main behaviour"""
+    path.write_text("", encoding="utf-8")
+    stream_all = []
+    for i in range(events):
+        chunk = make_event(i, chunk_bytes)
+        stream_all.append(chunk)
+        with path.open("a", encoding="utf-8") as f:
+            f.write(chunk)
+        await asyncio.sleep(0)
+    path.write_text("\n\n".join(stream_all).strip() + "\n", encoding="utf-8")
+
+
+async def write_buffered(path, events, chunk_bytes):
+    async with AsyncBufferedWriter(path) as writer:
+        for i in range(events):
+            await writer.write(("\n\n" if i else "") + make_event(i, chunk_bytes))
+            await asyncio.sleep(0)
+
+
+def run_case(fn, path, events, chunk_bytes):
+    counts = {"write": 0, "fsync": 0}
+    real_fsync = os.fsync
+
+    def counting_fsync(fd):
+        counts["fsync"] += 1
+        return real_fsync(fd)
+
+    # Count calls into the file write path (one per flushed buffer or per event)
+    original_open = Path.open
+    real_builtin_open = open
+
+    class CountingFile:
+        def __init__(self, f):
+            self._f = f
+
+        def write(self, data):
+            counts["write"] += 1
+            return self._f.write(data)
+
+        def __getattr__(self, name):
+            return getattr(self._f, name)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self._f.close()
+
+    with mock.patch("os.fsync", counting_fsync), \
+         mock.patch.object(Path, "open", lambda self, *a, **k: CountingFile(original_open(self, *a, **k))), \
+         mock.patch("builtins.open", lambda *a, **k: CountingFile(real_builtin_open(*a, **k))):
+        tracemalloc.start()
+        start = time.perf_counter()
+        asyncio.run(fn(path, events, chunk_bytes))
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return seconds, counts, peak, path.stat().st_size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-event appends with the buffered deep content writer")
+    parser.add_argument("--events", type=int, nargs="+", default=[1000, 5000, 20000], help="streamed events per run")
+    parser.add_argument("--chunk-bytes", type=int, default=2000, help="text per event")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'events':>8}  {'writer':<12}{'time (s)':>10}{'writes':>9}{'fsyncs':>8}{'peak MB':>10}{'file MB':>10}")
+        for events in args.events:
+            for name, fn in (("per-event", write_per_event), ("buffered", write_buffered)):
+                path = Path(tmp) / f"{name}.txt"
+                seconds, counts, peak, size = run_case(fn, path, events, args.chunk_bytes)
+                print(f"{events:>8}  {name:<12}{seconds:>10.3f}{counts['write']:>9}{counts['fsync']:>8}"
+                      f"{peak / 1e6:>10.1f}{size / 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
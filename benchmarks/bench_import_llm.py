@@ -0,0 +1,82 @@
+"""
+Import-time benchmark for llm.py
+
+Imports llm in fresh interpreters with all outbound socket connections blocked
+and stdin closed, so any network call or input() prompt made at import time
+fails the run. Reports the cold import time of llm on top of its third-party
+dependencies (google-genai, python-dotenv, numpy), which are imported first.
+
+Usage: python benchmarks/bench_import_llm.py [--runs N]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+CHILD_SCRIPT = r"""
+import json, socket, sys, time
+
+connections = []
+
+def _blocked_connect(self, address, *args, **kwargs):
+    connections.append(repr(address))
+    raise OSError(f"network access blocked during import: {address!r}")
+
+socket.socket.connect = _blocked_connect
+socket.socket.connect_ex = _blocked_connect
+socket.create_connection = lambda address, *a, **k: _blocked_connect(None, address)
+
+# Warm the third-party dependencies so only llm's own module body is timed
+from google import genai
+from google.genai import types
+import dotenv
+import numpy
+
+start = time.perf_counter()
+import llm
+elapsed = time.perf_counter() - start
+
+print(json.dumps({"seconds": elapsed, "connections": connections}))
+"""
+
+
+def run_once():
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT],
+        cwd=PROJECT_ROOT,
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import llm failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the cold import time of llm.py")
+    parser.add_argument("--runs", type=int, default=5, help="number of fresh interpreters to start")
+    args = parser.parse_args()
+
+    timings = []
+    for i in range(args.runs):
+        sample = run_once()
+        if sample["connections"]:
+            print(f"❌ Run {i + 1}: import llm attempted network connections: {sample['connections']}")
+            sys.exit(1)
+        timings.append(sample["seconds"] * 1000)
+        print(f"Run {i + 1}: {timings[-1]:.2f} ms")
+
+    print("=" * 40)
+    print(f"✅ No network calls or prompts during import ({args.runs} runs)")
+    print(f"Median import time: {statistics.median(timings):.2f} ms")
+    print(f"Max import time:    {max(timings):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Markdown IR benchmark: parse once, render DOCX and PDF from the same blocks
+
+Times, in CPU seconds, on the synthetic courses of bench_rendering.py:
+
+  parse_course             course text -> markdown_ir blocks (once per run)
+  docx+pdf, parse each     both combined renderers, each parsing the course itself
+  docx+pdf, parse once     parse_course, then both renderers from its blocks
+  quiz pdf                 quizzes.format_quiz_content_for_pdf
+
+With --baseline REV the same renderers are also timed from course_material.py
+and quizzes.py as of that git revision (for example the commit before the IR),
+where every renderer ran its own line-by-line interpreter.
+
+Usage: python benchmarks/bench_markdown_ir.py [--weeks 10 50 200] [--repeat 3] [--baseline REV]
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("COPILOT_TRACE", "off")
+
+import course_material
+import quizzes
+from bench_rendering import DEFAULT_SCALES, make_course, make_quiz_text
+
+
+def load_revision(name, revision, tmp):
+    """Import <name>.py as of a git revision under another module name"""
+    source = subprocess.run(["git", "show", f"{revision}:{name}.py"], cwd=PROJECT_ROOT,
+                            capture_output=True, text=True, encoding="utf-8", check=True).stdout
+    path = os.path.join(tmp, f"{name}_{revision.replace('~', '_').replace('^', '_')}.py")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(source)
+    spec = importlib.util.spec_from_file_location(f"baseline_{name}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def cpu_seconds(fn, repeat):
+    """Best process CPU time of fn over repeat runs, with its prints silenced"""
+    best = None
+    for _ in range(repeat):
+        start = time.process_time()
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+        elapsed = time.process_time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def cases(material, quiz_module, planner, deep, quiz_text, output_dir, shared_parse):
+    def each_parses():
+        material.create_combined_docx(planner, deep, output_dir)
+        material.create_combined_pdf_direct(planner, deep, output_dir)
+
+    result = [("docx+pdf, parse each", each_parses)]
+    if shared_parse:
+        def parse_once():
+            course = material.parse_course(planner, deep)
+            material.create_combined_docx(planner, deep, output_dir, course=course)
+            material.create_combined_pdf_direct(planner, deep, output_dir, course=course)
+
+        result.insert(0, ("parse_course", lambda: material.parse_course(planner, deep)))
+        result.append(("docx+pdf, parse once", parse_once))
+    result.append(("quiz pdf", lambda: quiz_module.format_quiz_content_for_pdf(quiz_text)))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the shared Markdown IR against per-renderer parsing")
+    parser.add_argument("--weeks", type=int, nargs="+", default=list(DEFAULT_SCALES), help="course sizes in weeks")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case; the fastest is reported")
+    parser.add_argument("--baseline", help="git revision whose course_material.py/quizzes.py to compare against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        implementations = [("current", course_material, quizzes)]
+        if args.baseline:
+            implementations.append((args.baseline, load_revision("course_material", args.baseline, tmp),
+                                    load_revision("quizzes", args.baseline, tmp)))
+
+        for weeks in args.weeks:
+            paragraphs = DEFAULT_SCALES.get(weeks, max(2, weeks // 25))
+            planner, deep = make_course(weeks, paragraphs)
+            quiz_text = make_quiz_text(weeks)
+            print(f"\n📚 {weeks} weeks, {(len(planner) + len(deep)) / 1024:,.0f} KB of course text")
+            print(f"{'implementation':<16}{'case':<26}{'CPU (s)':>10}")
+            for label, material, quiz_module in implementations:
+                shared_parse = hasattr(material, "parse_course")
+                for name, fn in cases(material, quiz_module, planner, deep, quiz_text, tmp, shared_parse):
+                    print(f"{label:<16}{name:<26}{cpu_seconds(fn, args.repeat):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
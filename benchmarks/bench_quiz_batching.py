@@ -0,0 +1,169 @@
+"""
+Quiz batching benchmark: one schema-constrained call vs. the per-theme loop
+
+Builds the exact requests both quiz modes send for the current course content
+and reports input tokens per mode. By default tokens are estimated locally
+(~4 characters per token); --count-tokens asks the Gemini count_tokens API
+instead. --live runs both modes against the API with caching disabled and
+reports wall-clock time and usage_metadata token totals.
+
+Usage: python benchmarks/bench_quiz_batching.py [--count-tokens] [--live]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from llm import build_contents, create_client, create_google_search_tool, generate_course_content
+import quizzes
+
+SAMPLE_WEEK = """# Week {n}: Topic {n} - From Real-World Problem to Solution
+
+## 🔍 The Real-World Problem
+A logistics team needs to route {n}00 parcels per hour through a congested city network.
+
+## 📚 Deep Explanation
+Concept {n} builds on the previous week by introducing heuristics, trade-offs and evaluation metrics.
+""" + ("Detailed explanation sentence covering definitions, examples and edge cases. " * 60) + """
+
+=== WEEK {n} COMPLETED ===
+"""
+
+
+def load_combined_content():
+    """Return the combined course content quizzes.py would send, or synthetic content if none exists"""
+    planner_content, deep_content = quizzes.read_course_content_files()
+    if not planner_content and not deep_content:
+        print("⚠️ No course content found, using a synthetic 8-week course")
+        planner_content = "# Course Plan\n" + "Module outline and objectives. " * 200
+        deep_content = "\n".join(SAMPLE_WEEK.format(n=n) for n in range(1, 9))
+    return f"""
+=== COURSE PLAN CONTENT ===
+{planner_content}
+
+=== DETAILED COURSE CONTENT ===
+{deep_content}
+"""
+
+
+def estimate_tokens(parts):
+    return sum(len(part) for part in parts if isinstance(part, str)) // 4
+
+
+def count_tokens(client, parts):
+    response = client.models.count_tokens(model="gemini-2.5-flash", contents=parts)
+    return response.total_tokens
+
+
+def build_requests(combined_content, user_config):
+    """Return [(label, parts)] for the per-theme loop and the batched call"""
+    difficulty = user_config['difficulty_level']
+    args = (user_config['teaching_style'], user_config['duration'], difficulty)
+
+    per_theme_prompt = quizzes.create_quiz_system_prompt(difficulty)
+    per_theme = [
+        (f"per-theme #{i}", [per_theme_prompt] + build_contents(*args, course_content=combined_content, task=quizzes.build_quiz_task(i, theme)))
+        for i, theme in enumerate(quizzes.QUIZ_THEMES, 1)
+    ]
+
+    batched_prompt = quizzes.create_quiz_system_prompt(difficulty, batched=True)
+    batched = [
+        ("batched", [batched_prompt] + build_contents(*args, course_content=combined_content, task=quizzes.build_quiz_batch_task(quizzes.QUIZ_THEMES)))
+    ]
+    return per_theme, batched
+
+
+def usage_tokens(response):
+    usage = getattr(response, "usage_metadata", None)
+    if not usage:
+        return 0, 0
+    return usage.prompt_token_count or 0, usage.candidates_token_count or 0
+
+
+def run_live(client, combined_content, user_config):
+    """Time the original sequential per-theme loop against one batched call"""
+    common = dict(
+        client=client,
+        teaching_style=user_config['teaching_style'],
+        duration=user_config['duration'],
+        difficulty_level=user_config['difficulty_level'],
+        course_content=combined_content,
+        use_cache=False,
+    )
+
+    start = time.perf_counter()
+    per_theme_in = per_theme_out = 0
+    search_tool = create_google_search_tool()
+    per_theme_prompt = quizzes.create_quiz_system_prompt(user_config['difficulty_level'])
+    for i, theme in enumerate(quizzes.QUIZ_THEMES, 1):
+        response = generate_course_content(google_search_tool=search_tool, system_prompt=per_theme_prompt, task=quizzes.build_quiz_task(i, theme), **common)
+        tokens_in, tokens_out = usage_tokens(response)
+        per_theme_in += tokens_in
+        per_theme_out += tokens_out
+    per_theme_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    response = generate_course_content(
+        google_search_tool=None,
+        system_prompt=quizzes.create_quiz_system_prompt(user_config['difficulty_level'], batched=True),
+        task=quizzes.build_quiz_batch_task(quizzes.QUIZ_THEMES),
+        response_schema=quizzes.QUIZ_BATCH_SCHEMA,
+        **common,
+    )
+    batched_seconds = time.perf_counter() - start
+    batched_in, batched_out = usage_tokens(response)
+    papers = sum(1 for paper in quizzes.split_quiz_batch(response, quizzes.QUIZ_THEMES) if paper)
+
+    print("\n" + "=" * 60)
+    print("LIVE RUN")
+    print("=" * 60)
+    print(f"{'mode':<12}{'wall (s)':>12}{'input tok':>14}{'output tok':>14}")
+    print(f"{'per-theme':<12}{per_theme_seconds:>12.1f}{per_theme_in:>14}{per_theme_out:>14}")
+    print(f"{'batched':<12}{batched_seconds:>12.1f}{batched_in:>14}{batched_out:>14}")
+    if per_theme_seconds:
+        print(f"Wall-clock saving: {100 * (1 - batched_seconds / per_theme_seconds):.1f}%  ({papers} papers in batched response)")
+    if per_theme_in:
+        print(f"Input token saving: {100 * (1 - batched_in / per_theme_in):.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare batched and per-theme quiz generation")
+    parser.add_argument("--count-tokens", action="store_true", help="use the count_tokens API instead of the local estimate")
+    parser.add_argument("--live", action="store_true", help="run both modes against the API and time them")
+    args = parser.parse_args()
+
+    user_config = quizzes.load_user_inputs() or {
+        "difficulty_level": "intermediate",
+        "duration": "8 weeks",
+        "teaching_style": "Project-Based / Hands-On",
+    }
+    combined_content = load_combined_content()
+    client = create_client() if (args.count_tokens or args.live) else None
+    counter = (lambda parts: count_tokens(client, parts)) if args.count_tokens else estimate_tokens
+
+    per_theme, batched = build_requests(combined_content, user_config)
+    per_theme_tokens = [(label, counter(parts)) for label, parts in per_theme]
+    batched_tokens = [(label, counter(parts)) for label, parts in batched]
+
+    print("=" * 60)
+    print(f"INPUT TOKENS PER REQUEST ({'count_tokens API' if args.count_tokens else 'estimated'})")
+    print("=" * 60)
+    for label, tokens in per_theme_tokens + batched_tokens:
+        print(f"{label:<16}{tokens:>12}")
+
+    per_theme_total = sum(tokens for _, tokens in per_theme_tokens)
+    batched_total = sum(tokens for _, tokens in batched_tokens)
+    print("-" * 28)
+    print(f"{'per-theme total':<16}{per_theme_total:>12}")
+    print(f"{'batched total':<16}{batched_total:>12}")
+    if per_theme_total:
+        print(f"Input token saving: {100 * (1 - batched_total / per_theme_total):.1f}%")
+
+    if args.live:
+        run_live(client, combined_content, user_config)
+
+
+if __name__ == "__main__":
+    main()
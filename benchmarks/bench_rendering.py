@@ -0,0 +1,178 @@
+"""
+Offline benchmark for the parsing and rendering hot paths
+
+Generates synthetic courses with 10, 50 and 200 weeks (sections grow with the
+course) and times course_material.parse_weeks_from_content,
+create_docx_for_week, create_combined_docx, create_combined_pdf_direct,
+quizzes.parse_quiz_content, format_quiz_content_for_pdf and
+flash_cards.create_flashcard_image. Each case reports wall time, tracemalloc
+peak memory and time per KB of input so superlinear growth stands out.
+Nothing touches the network.
+
+Usage: python benchmarks/bench_rendering.py [--weeks 10 50 200] [--repeat N] [--json OUT]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("COPILOT_TRACE", "off")
+
+import course_material
+import flash_cards
+import quizzes
+
+# (weeks, paragraphs per section): larger courses also get longer sections
+DEFAULT_SCALES = {10: 2, 50: 4, 200: 8}
+
+PARAGRAPH = ("This paragraph explains a **key concept** with an *illustrative example*, "
+             "connects it to the previous week and lists the trade-offs practitioners face. ") * 3
+
+SECTIONS = [
+    "🔍 The Real-World Problem",
+    "📚 Deep Explanation",
+    "🛠️ Worked Example",
+    "📊 Case Study",
+    "✅ Key Takeaways",
+]
+
+
+def make_week(number, paragraphs):
+    lines = [f"# Week {number}: Topic {number} - From Real-World Problem to Solution", ""]
+    for section in SECTIONS:
+        lines.append(f"## {section}")
+        for i in range(paragraphs):
+            lines.append(PARAGRAPH)
+            lines.append(f"- Bullet point {i + 1} for week {number}")
+        lines.append("")
+    lines.append(f"=== WEEK {number} COMPLETED ===")
+    lines.append("")
+    return "\n".join(lines)
+
+
+def make_course(weeks, paragraphs):
+    planner = "# Master Course Plan\n\n" + "\n".join(
+        f"## Week {n}: Topic {n}\n- Objective one\n- Objective two" for n in range(1, weeks + 1))
+    deep = "\n".join(make_week(n, paragraphs) for n in range(1, weeks + 1))
+    return planner, deep
+
+
+def make_quiz_text(questions):
+    papers = []
+    for number, theme in enumerate(["Conceptual Understanding", "Practical Application", "Critical Analysis"], start=1):
+        lines = [f"# Quiz Paper {number}: {theme}", "", "## Instructions", "Answer all questions in full sentences.", ""]
+        for q in range(1, questions + 1):
+            lines.append(f"### Question {q}")
+            lines.append(f"Explain **concept {q}** and give an *example* from week {q}. " * 2)
+            lines.append("**Evaluation Criteria:** clarity, accuracy")
+            lines.append("")
+        papers.append("\n".join(lines))
+    return "\n\n".join(papers)
+
+
+def make_flashcard(number):
+    return {
+        "week": f"Week {number}",
+        "topic": f"Topic {number}: trade-offs in system design",
+        "question": f"What is the main trade-off introduced in week {number}, and when does it matter most?",
+        "answer": "It balances latency against throughput; it matters when workloads are bursty. " * 2,
+        "difficulty": "medium",
+        "tags": ["design", "trade-offs", f"week-{number}"],
+    }
+
+
+def measure(fn, repeat):
+    """
+    Return (best seconds, peak bytes), with the functions' prints silenced
+
+    Timing runs without tracemalloc (it slows allocation-heavy code several
+    times over); one extra run under tracemalloc measures peak memory.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def run_scale(weeks, paragraphs, repeat, output_dir):
+    planner, deep = make_course(weeks, paragraphs)
+    quiz_text = make_quiz_text(weeks)
+    with contextlib.redirect_stdout(io.StringIO()):
+        parsed_weeks = course_material.parse_weeks_from_content(deep)
+    course_kb = (len(planner) + len(deep)) / 1024
+    quiz_kb = len(quiz_text) / 1024
+
+    def docx_per_week():
+        for week in parsed_weeks:
+            course_material.create_docx_for_week(week, output_dir)
+
+    def flashcard_images():
+        for number in range(1, weeks + 1):
+            flash_cards.create_flashcard_image(make_flashcard(number), output_dir, number)
+
+    cases = [
+        ("parse_weeks_from_content", course_kb, lambda: course_material.parse_weeks_from_content(deep)),
+        ("create_docx_for_week (all)", course_kb, docx_per_week),
+        ("create_combined_docx", course_kb, lambda: course_material.create_combined_docx(planner, deep, output_dir)),
+        ("create_combined_pdf_direct", course_kb, lambda: course_material.create_combined_pdf_direct(planner, deep, output_dir)),
+        ("parse_quiz_content", quiz_kb, lambda: quizzes.parse_quiz_content(quiz_text)),
+        ("format_quiz_content_for_pdf", quiz_kb, lambda: quizzes.format_quiz_content_for_pdf(quiz_text)),
+        (f"create_flashcard_image (x{weeks})", weeks, flashcard_images),
+    ]
+
+    results = []
+    for name, size, fn in cases:
+        seconds, peak = measure(fn, repeat)
+        results.append({"weeks": weeks, "paragraphs": paragraphs, "case": name, "seconds": seconds, "peak_bytes": peak, "input_size": size})
+    return course_kb, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parsing and rendering on synthetic courses")
+    parser.add_argument("--weeks", type=int, nargs="+", default=list(DEFAULT_SCALES), help="course sizes in weeks")
+    parser.add_argument("--paragraphs", type=int, help="paragraphs per section (default grows with course size)")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per case; the fastest is reported")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    all_results = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        for weeks in args.weeks:
+            paragraphs = args.paragraphs or DEFAULT_SCALES.get(weeks, max(2, weeks // 25))
+            course_kb, results = run_scale(weeks, paragraphs, args.repeat, output_dir)
+            all_results.extend(results)
+
+            print(f"\n📚 {weeks} weeks, {paragraphs} paragraphs/section, {course_kb:,.0f} KB of course text")
+            print(f"{'case':<34}{'time (s)':>10}{'peak MB':>10}{'per unit':>14}")
+            for result in results:
+                unit = "ms/card" if result["case"].startswith("create_flashcard_image") else "ms/KB"
+                per_unit = 1000 * result["seconds"] / max(result["input_size"], 1e-9)
+                print(f"{result['case']:<34}{result['seconds']:>10.3f}{result['peak_bytes'] / 1e6:>10.1f}"
+                      f"{per_unit:>8.3f} {unit}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(all_results, f, indent=2)
+        print(f"\n💾 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Week segmenter benchmark on multi-megabyte deep content logs
+
+Builds LoopAgent-style deep content output ("--- [agent | ] ---" labels,
+PROCESSING / COMPLETED markers, recap headings) of growing size and times
+course_material.parse_weeks_from_content (str, single-pass segmenter) and
+week_segmenter.iter_file_weeks (memory-mapped file, zero-copy slices). The
+"no markers" shape has week headings but no COMPLETED markers, the case
+that sent the old regex cascade through its quadratic fallbacks.
+
+With --baseline REV, parse_weeks_from_content from that git revision is
+timed too, on inputs up to --baseline-max-kb (the old cascade takes minutes
+on a few hundred KB without markers).
+
+Usage: python benchmarks/bench_week_segmenter.py [--mb 1 4 16] [--repeat 3] [--baseline REV]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("COPILOT_TRACE", "off")
+
+import course_material
+import week_segmenter
+from bench_markdown_ir import load_revision
+
+LESSON = ("The agent explains the **core idea** of the week, walks through a worked example "
+          "and lists the trade-offs practitioners face in production systems. ") * 4
+
+
+def make_log(size_bytes, markers=True):
+    """Deep content log of at least size_bytes, in the layout the deep content loop writes"""
+    parts = ["--- [DeepCourseContentCreator | ] ---\nCourse recap:\n"
+             + "".join(f"## Week {n}: Topic {n}\n" for n in range(1, 13)) + "\n"]
+    size = len(parts[0])
+    week = 0
+    while size < size_bytes:
+        week += 1
+        text = (f"--- [DeepCourseContentCreator | ] ---\n=== PROCESSING WEEK {week} ===\n"
+                f"# Week {week}: Topic {week}\n\n" + "\n\n".join([LESSON] * 12) + "\n\n")
+        if markers:
+            text += f"=== WEEK {week} COMPLETED ===\n\n"
+        parts.append(text)
+        size += len(text)
+    return "".join(parts) + "DONE and DUSTED\n", week
+
+
+def best_seconds(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def consume_file(path):
+    count = 0
+    for _, content in week_segmenter.iter_file_weeks(path):
+        count += len(content)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the single-pass week segmenter on large deep content logs")
+    parser.add_argument("--mb", type=float, nargs="+", default=[1, 4, 16], help="log sizes in MB")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case; the fastest is reported")
+    parser.add_argument("--baseline", help="git revision whose parse_weeks_from_content to compare against")
+    parser.add_argument("--baseline-max-kb", type=int, default=256, help="largest input the baseline is run on")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = load_revision("course_material", args.baseline, tmp) if args.baseline else None
+        print(f"{'shape':<12}{'size (MB)':>10}{'weeks':>7}  {'case':<30}{'time (s)':>10}{'ms/MB':>9}")
+        sizes = sorted(set(args.mb + ([args.baseline_max_kb / 1024] if baseline else [])))
+        for markers in (True, False):
+            shape = "markers" if markers else "no markers"
+            for mb in sizes:
+                text, weeks = make_log(int(mb * 1024 * 1024), markers)
+                size_mb = len(text.encode("utf-8")) / (1024 * 1024)
+                path = os.path.join(tmp, "deep_agent_output.txt")
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(text)
+
+                cases = [
+                    ("parse_weeks_from_content", lambda: course_material.parse_weeks_from_content(text)),
+                    ("iter_file_weeks (mmap)", lambda: consume_file(path)),
+                ]
+                if baseline and mb * 1024 <= args.baseline_max_kb:
+                    cases.append((f"{args.baseline} parse_weeks_from_content",
+                                  lambda: baseline.parse_weeks_from_content(text)))
+                for name, fn in cases:
+                    seconds = best_seconds(fn, args.repeat)
+                    print(f"{shape:<12}{size_mb:>10.2f}{weeks:>7}  {name:<30}{seconds:>10.3f}{1000 * seconds / size_mb:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
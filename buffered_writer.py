@@ -0,0 +1,106 @@
+import asyncio
+import os
+import time
+
+DEFAULT_BUFFER_BYTES = 64 * 1024
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_FSYNC_INTERVAL = 5.0
+
+
+class AsyncBufferedWriter:
+    """
+    Ordered, buffered text writer for long streaming runs
+
+    Writes are collected in memory and flushed to the file in order when the
+    buffer reaches max_buffer_bytes or flush_interval seconds pass, whichever
+    comes first. The file is fsynced at most every fsync_interval seconds and
+    on close, so a crash loses at most a few seconds of output. File I/O runs
+    in a worker thread to keep the event loop responsive, and memory use is
+    bounded by the buffer size rather than the length of the run.
+
+    Usage:
+        async with AsyncBufferedWriter(path) as writer:
+            await writer.write(text)
+    """
+
+    def __init__(self, path, max_buffer_bytes=DEFAULT_BUFFER_BYTES, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 fsync_interval=DEFAULT_FSYNC_INTERVAL, mode="w", encoding="utf-8"):
+        self.path = path
+        self.max_buffer_bytes = max_buffer_bytes
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.mode = mode
+        self.encoding = encoding
+        self.bytes_written = 0
+        self.flushes = 0
+        self._file = None
+        self._buffer = []
+        self._buffered = 0
+        self._lock = asyncio.Lock()
+        self._flusher = None
+        self._closing = None
+        self._last_fsync = time.monotonic()
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def open(self):
+        self._file = await asyncio.to_thread(open, self.path, self.mode, encoding=self.encoding)
+        self._last_fsync = time.monotonic()
+        self._closing = asyncio.Event()
+        self._flusher = asyncio.create_task(self._flush_periodically())
+
+    async def write(self, text):
+        """Queue text for writing; flushes immediately once the buffer is full"""
+        if not text:
+            return
+        self._buffer.append(text)
+        self._buffered += len(text)
+        if self._buffered >= self.max_buffer_bytes:
+            await self.flush()
+
+    async def flush(self, fsync=False):
+        """Write everything buffered so far, in order, and fsync if due (or forced)"""
+        async with self._lock:
+            if self._buffer:
+                data = "".join(self._buffer)
+                self._buffer = []
+                self._buffered = 0
+                await asyncio.to_thread(self._write_through, data)
+                self.bytes_written += len(data)
+                self.flushes += 1
+            if fsync or time.monotonic() - self._last_fsync >= self.fsync_interval:
+                await asyncio.to_thread(self._fsync)
+
+    def _write_through(self, data):
+        self._file.write(data)
+        self._file.flush()
+
+    def _fsync(self):
+        os.fsync(self._file.fileno())
+        self._last_fsync = time.monotonic()
+
+    async def _flush_periodically(self):
+        # Never cancelled mid-write: close() signals it and waits for the current flush
+        while not self._closing.is_set():
+            try:
+                await asyncio.wait_for(self._closing.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                await self.flush()
+
+    async def close(self):
+        if self._file is None:
+            return
+        try:
+            if self._flusher is not None:
+                self._closing.set()
+                flusher, self._flusher = self._flusher, None
+                await flusher
+            await self.flush(fsync=True)
+        finally:
+            await asyncio.to_thread(self._file.close)
+            self._file = None
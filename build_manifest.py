@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+MANIFEST_DIR = os.path.join("Inputs and Outputs", ".manifests")
+
+
+def hash_file(path):
+    """SHA-256 of a file's bytes, or None if it does not exist"""
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+    except (FileNotFoundError, IsADirectoryError):
+        return None
+    return digest.hexdigest()
+
+
+def resolve_paths(entries):
+    """Resolve path entries, calling any that are callables (paths only known at run time)"""
+    paths = []
+    for entry in entries:
+        value = entry() if callable(entry) else entry
+        if value:
+            paths.append(str(value))
+    return paths
+
+
+def hash_inputs(entries):
+    """Return {path: sha256 or None} for a stage's inputs (data files, prompt and code files)"""
+    return {path: hash_file(path) for path in resolve_paths(entries)}
+
+
+def expand_outputs(entries):
+    """Expand output entries into the files they contain (directories are listed recursively)"""
+    files = []
+    for path in resolve_paths(entries):
+        if os.path.isdir(path):
+            files.extend(str(p) for p in sorted(Path(path).rglob('*')) if p.is_file())
+        elif os.path.exists(path):
+            files.append(path)
+    return files
+
+
+def manifest_path(stage_name):
+    return os.path.join(MANIFEST_DIR, f"{stage_name}.json")
+
+
+def load_manifest(stage_name):
+    try:
+        with open(manifest_path(stage_name), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def write_manifest(stage_name, input_hashes, output_entries):
+    """Record the inputs a stage was built from and the outputs it produced"""
+    manifest = {
+        "stage": stage_name,
+        "built_at": time.time(),
+        "inputs": input_hashes,
+        "outputs": expand_outputs(output_entries),
+    }
+    os.makedirs(MANIFEST_DIR, exist_ok=True)
+    tmp_path = manifest_path(stage_name) + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path(stage_name))
+    return manifest
+
+
+def rebuild_reasons(stage_name, input_hashes, manifest=None):
+    """
+    Return why a stage must be rebuilt, or an empty list when it is up to date
+
+    A stage is up to date when a manifest exists, every input hash matches
+    the recorded one, and every recorded output still exists.
+    """
+    if manifest is None:
+        manifest = load_manifest(stage_name)
+    if manifest is None:
+        return ["no manifest (never built)"]
+
+    reasons = []
+    recorded = manifest.get("inputs", {})
+    for path, digest in input_hashes.items():
+        if path not in recorded:
+            reasons.append(f"new input: {path}")
+        elif recorded[path] != digest:
+            reasons.append(f"input changed: {path}" if digest else f"input missing: {path}")
+    for path in recorded:
+        if path not in input_hashes:
+            reasons.append(f"input removed: {path}")
+
+    outputs = manifest.get("outputs", [])
+    if not outputs:
+        reasons.append("no outputs recorded")
+    for path in outputs:
+        if not os.path.exists(path):
+            reasons.append(f"output missing: {path}")
+    return reasons
@@ -2,22 +2,48 @@ import asyncio, os, sys, uuid, inspect
 from pathlib import Path
 from datetime import datetime
 
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
+from google.adk.agents import SequentialAgent
 from google.genai import types  # Content / Part
 from dotenv import load_dotenv
 
 # Make project root importable
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from knowledge_1.agent import deep_content_loop as final_pipeline  # LoopAgent over DeepCourseContentCreator
+from buffered_writer import AsyncBufferedWriter
+from fake_genai import agent_digest, create_runner, genai_mode
+from llm import create_client, run_concurrently
+from progress import ProgressTracker, stage_progress
+from prompt_budget import compact_course_content, split_into_weeks, summarize_week
+from session_store import COMPLETED_RE, SqliteSessionService, WeekCheckpoints, WeekTracker, first_incomplete_week
+from tracing import record_event, span
+from week_files import merge_weeks, read_week, reset_weeks, save_week_file, week_title
+
+# Agents are built per run from the current plan, so one process can generate many courses
+from knowledge.agent import create_course_planner_agent
+from knowledge_1.agent import (COMPLETION_CHECKER_NAME, CREATOR_NAME, create_deep_content_loop,
+                               create_deep_content_loop_from_state, create_week_agent, read_planner_output)
 
 APP_NAME = "AI Copilot for Instructors"
 EXPORT_DIR = "Inputs and Outputs"
+SESSION_DB = os.path.join(".cache", "deep_sessions.sqlite")  # under the output dir
+PLANNER_NAME = "CoursePlannerAgent"
+
+DEEP_PROMPT = "Take the provided course_content and generate deeply elaborated week-by-week lessons."
+COMBINED_PROMPT = "Generate the course plan, then take it and generate deeply elaborated week-by-week lessons."
+
+RESUME_PROMPT = """{prompt}
+
+RESUMING AN INTERRUPTED RUN: Weeks 1 to {last_done} are already complete and saved.
+Do NOT regenerate or save them again; call save_week only for the remaining weeks.
+Start directly with Week {next_week} and continue until every remaining week is complete.
+
+Content of the completed weeks, for continuity:
+{context}"""
 
 def _out_dir() -> Path:
+    # COPILOT_IO_DIR lets batch runs point each course at its own directory
     root = Path(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-    p = root / EXPORT_DIR
+    p = Path(os.getenv("COPILOT_IO_DIR") or root / EXPORT_DIR)
     p.mkdir(parents=True, exist_ok=True)
     return p
 
@@ -40,102 +66,416 @@ def _extract_text(event) -> str:
                 return pt
     return ""
 
-async def run_knowledge_and_save(prompt: str):
+def _require_api_key():
     # Ensure GEMINI_API_KEY loaded from project root .env
     project_root = Path(__file__).resolve().parents[1]
     load_dotenv(dotenv_path=project_root / ".env", override=False)
-    if not os.getenv("GEMINI_API_KEY"):
+    if not os.getenv("GEMINI_API_KEY") and genai_mode() != "replay":
         raise EnvironmentError(
             "GEMINI_API_KEY is not set. Create a .env at project root with GEMINI_API_KEY=... or set the environment variable."
         )
 
-    # 1) DB-free session
-    session_service = InMemorySessionService()
+def _summary_client():
+    # Summaries fall back to extractive ones without a key
+    if os.getenv("GEMINI_API_KEY") or genai_mode() == "replay":
+        return create_client()
+    return None
+
+def _open_run(pipeline, resume, session_id=None):
+    """
+    Durable session store + week checkpoints, keyed by the agent tree (its instructions embed the course plan)
+
+    A finished (or forced fresh) run starts over; an interrupted one keeps its checkpointed weeks.
+    Returns (session_service, checkpoints, run_key, attempt, completed_weeks).
+    """
+    db_path = _out_dir() / SESSION_DB
+    checkpoints = WeekCheckpoints(db_path)
+    run_key = agent_digest(APP_NAME, pipeline).hexdigest()
+    run = checkpoints.get_run(run_key)
+    fresh = not resume or run is None or run["status"] == "complete"
+    attempt = checkpoints.start_run(run_key, session_id, reset=fresh)
+    completed = {} if fresh else checkpoints.completed_weeks(run_key)
+    return SqliteSessionService(db_path), checkpoints, run_key, attempt, completed
+
+def _prepare_week_files(completed):
+    """Start the weeks/ directory over for a fresh run; on resume make sure every checkpointed week has its file"""
+    if not completed:
+        reset_weeks(_out_dir())
+        return
+    for week, text in completed.items():
+        if read_week(week, _out_dir()) is None:
+            save_week_file(week, week_title(text), text, io_dir=_out_dir())
+
+def _resume_context(completed, next_week):
+    """Completed weeks before next_week, compacted to the deep content prompt budget"""
+    prior = "\n\n".join(completed[week] for week in range(1, next_week))
+    return compact_course_content(_summary_client(), prior, stage="deep_content")
+
+async def _stream_deep_content(runner, user_id, session_id, user_msg, run, tracker, trace_span, on_plan=None):
+    """
+    Stream a deep content run into its output file and checkpoint its weeks as they arrive
+
+    run is a dict with checkpoints, run_key, completed (weeks kept from an
+    earlier attempt, written first) and output_path; wrote_any, seen_done and
+    saved_with_tool are set on it. Every text event is written labelled with
+    its author and loop iteration. The buffered writer flushes by size/time
+    and fsyncs periodically, so progress is persisted without an open/append
+    per event or a copy of the stream in memory.
+
+    Each saved week (save_week call, or "=== WEEK N COMPLETED ===" marker in
+    plain text) is checkpointed right away, from its week file when there is
+    one; a week written as plain text also gets its week file, so the weeks/
+    directory holds every checkpointed week. With on_plan, the run starts with
+    the CoursePlannerAgent in the same session: its events are not written,
+    and on_plan(plan_text) is awaited when the plan lands in the session state,
+    which has to set run["run_key"].
+    """
+    week_tracker = WeekTracker()
+    iteration = 1
+    async with AsyncBufferedWriter(run["output_path"]) as writer:
+        # Weeks kept from earlier attempts come first, so the file always holds the whole course
+        for week in sorted(run["completed"]):
+            separator = "\n\n" if run["wrote_any"] else ""
+            await writer.write(f"{separator}--- [checkpoint | week {week}] ---\n{run['completed'][week]}")
+            run["wrote_any"] = True
+        async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=user_msg):
+            record_event(trace_span, event)
+            await tracker.feed(event)
+            author = getattr(event, "author", None)
+            delta = event.actions.state_delta if event.actions else {}
+            # The plan is exported on its own, not mixed into the course text
+            if author == PLANNER_NAME:
+                txt = _extract_text(event)
+                if txt:
+                    run["planner_texts"].append(txt)
+                if on_plan and delta.get("course_plan"):
+                    await on_plan(delta["course_plan"].strip())
+                continue
+            # Completion checks end the loop early; they go to the trace, not the course text
+            if author == COMPLETION_CHECKER_NAME:
+                iteration = (delta.get("deep_loop_iterations") or iteration) + 1
+                trace_span.set("loop_iterations", delta.get("deep_loop_iterations"))
+                trace_span.set("missing_weeks", delta.get("missing_weeks"))
+                print(f"🔎 {_extract_text(event)}")
+                continue
+            # A successful save_week call checkpoints its week from the saved file
+            for response in event.get_function_responses() if hasattr(event, "get_function_responses") else []:
+                result = response.response or {}
+                if response.name == "save_week" and result.get("status") == "success" and run["run_key"]:
+                    week = int(result["week_number"])
+                    run["checkpoints"].save_week(run["run_key"], week, read_week(week, _out_dir()) or "")
+                    trace_span.add("weeks_checkpointed")
+                    run["saved_with_tool"] = True
+            # Capture ANY event text to avoid missing intermediate chunks
+            txt = _extract_text(event)
+            if not txt:
+                continue
+            separator = "\n\n" if run["wrote_any"] else ""
+            await writer.write(f"{separator}--- [{author or CREATOR_NAME} | iteration {iteration}] ---\n{txt}\n")
+            run["wrote_any"] = True
+            for week, week_text in week_tracker.feed(txt + "\n"):
+                saved_text = read_week(week, _out_dir())
+                if saved_text is None:
+                    save_week_file(week, week_title(week_text), week_text, io_dir=_out_dir())
+                if run["run_key"]:
+                    run["checkpoints"].save_week(run["run_key"], week, saved_text or week_text)
+                    trace_span.add("weeks_checkpointed")
+            # Detect completion sentinel
+            if "DONE and DUSTED" in txt:
+                run["seen_done"] = True
+    trace_span.set("bytes_written", writer.bytes_written)
+    trace_span.set("flushes", writer.flushes)
+
+async def _finish_deep_content(run, session_service, user_id, session_id):
+    """Merge the week files when save_week was used, fall back to the session state, and mark the run complete"""
+    # With save_week the streamed log only holds acknowledgements for those weeks, so the
+    # output is rebuilt from the week files, which cover every checkpointed week
+    if run["saved_with_tool"]:
+        merged = merge_weeks(run["output_path"], _out_dir(), done=run["seen_done"])
+        print(f"[OK] Merged {merged} week files into {run['output_path']}")
+        run["wrote_any"] = True
+
+    # The output file is complete if the sentinel was found
+    if not (run["wrote_any"] and run["seen_done"]):
+        # Fallback to final state output if stream didn't capture
+        sess = session_service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+        if inspect.isawaitable(sess):
+            sess = await sess
+        state = getattr(sess, "state", {}) or {}
+        deep_txt = state.get("deep_content", "").strip()  # from DeepCourseContentCreator (output_key)
+        if deep_txt and not run["completed"]:
+            _write_txt("deep_agent_output", deep_txt)
+        # Keep whatever was streamed, or fail if nothing came back at all
+        elif not run["wrote_any"]:
+            raise RuntimeError("No output captured from DeepCourseContentCreator. Ensure output_key is set and agent replies.")
+    run["checkpoints"].finish_run(run["run_key"])
+
+async def run_knowledge_and_save(prompt: str, resume: bool = True, plan_text: str = None, tracker: ProgressTracker = None):
+    _require_api_key()
+    if plan_text is None:
+        plan_text = read_planner_output()
+    tracker = tracker or ProgressTracker("deep_content")
+    final_pipeline = create_deep_content_loop(plan_text)  # LoopAgent over DeepCourseContentCreator
+
+    # 1) Durable session + week checkpoints (see _open_run)
     user_id = "user-local"
     session_id = f"session-{uuid.uuid4()}"
-    created = session_service.create_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+    session_service, checkpoints, run_key, attempt, completed = _open_run(final_pipeline, resume, session_id)
+    next_week = first_incomplete_week(completed)
+    completed = {week: completed[week] for week in range(1, next_week)}
+    # The completion checker counts checkpointed weeks as done
+    created = session_service.create_session(app_name=APP_NAME, user_id=user_id, session_id=session_id,
+                                             state={"checkpointed_weeks": list(completed)})
     if inspect.isawaitable(created):
         await created  # some builds expose async create
+    _prepare_week_files(completed)
+
+    if next_week > 1:
+        print(f"♻️ Resuming deep content (attempt {attempt}): weeks 1-{next_week - 1} checkpointed, starting at week {next_week}")
+        prompt = RESUME_PROMPT.format(prompt=prompt, last_done=next_week - 1, next_week=next_week,
+                                      context=_resume_context(completed, next_week))
 
     # 2) Prepare message (GenAI format)
     user_msg = types.Content(role="user", parts=[types.Part.from_text(text=prompt)])
 
-    # 3) Runner (SequentialAgent executes sub-agents in order) 
-    #    (Sequential/Loop agent semantics in ADK docs)
-    runner = Runner(agent=final_pipeline, app_name=APP_NAME, session_service=session_service)
+    # 3) Runner (LoopAgent: creator + completion checker, see knowledge_1.agent)
+    runner = create_runner(final_pipeline, APP_NAME, session_service)
+    await tracker.stage_started(total_weeks=len(_plan_weeks(plan_text)[1]), done_weeks=completed)
 
     print("\n=== Running Deep Content Loop (DeepCourseContentCreator) ===")
-    # Prepare output file: truncate at start so this run has a clean log
-    output_path = _out_dir() / "deep_agent_output.txt"
-    output_path.write_text("", encoding="utf-8")
-    # Stream buckets as a fallback if session.state isn't filled
-    stream_bucket = {
-        "DeepCourseContentCreator": [],
-        "Other": []
+    run = _new_run(checkpoints, run_key, completed)
+    with span("adk.run_async", kind="agent", stage="deep_content", agent=final_pipeline.name,
+              attempt=attempt, resumed_from_week=next_week) as trace_span:
+        await _stream_deep_content(runner, user_id, session_id, user_msg, run, tracker, trace_span)
+
+    # 4) Merge, fall back to the session state, finish
+    await _finish_deep_content(run, session_service, user_id, session_id)
+
+def _new_run(checkpoints, run_key, completed=None):
+    return {
+        "checkpoints": checkpoints,
+        "run_key": run_key,
+        "completed": completed or {},
+        "output_path": _out_dir() / "deep_agent_output.txt",
+        "planner_texts": [],
+        "wrote_any": False,
+        "seen_done": False,
+        "saved_with_tool": False,
     }
-    # Chronological capture of ALL text events (to preserve order)
-    stream_all: list[str] = []
-
-    seen_done = False
-    async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=user_msg):
-        # Capture ANY event text to avoid missing intermediate chunks
-        txt = _extract_text(event)
-        if not txt:
-            continue
-        # Detect source agent if available, else try to infer, else mark unknown
-        agent_name = getattr(event, "agent_name", None)
-        if not agent_name and txt.startswith("=== [DeepCourseContentCreator] ==="):
-            agent_name = "DeepCourseContentCreator"
-        # Save into buckets
-        if agent_name in stream_bucket:
-            stream_bucket[agent_name].append(txt)
-        else:
-            stream_bucket["Other"].append(txt)
-        # Append to chronological log with labels
-        etype = getattr(event, "type", "")
-        label = agent_name or "UnknownAgent"
-        chunk = f"--- [{label} | {etype}] ---\n{txt}\n"
-        stream_all.append(chunk)
-        # Also append to the file immediately to persist progress
-        with output_path.open("a", encoding="utf-8") as f:
-            f.write(chunk)
-        # Detect completion sentinel
-        if "DONE and DUSTED" in txt:
-            seen_done = True
-
-    # 4) Prefer full chronological stream so every iteration/message is captured (with labels)
-    stream_full = "\n\n".join(stream_all).strip()
-
-    if stream_full:
-        # If we already appended while streaming, ensure file has the final full content as well
-        # Overwrite to keep a single cohesive log
-        output_path.write_text(stream_full + "\n", encoding="utf-8")
-        # If sentinel was found, we consider this a complete run
-        if seen_done:
+
+def create_course_pipeline(planner_instruction=None):
+    """CoursePlannerAgent then the deep content loop, sharing the course plan through session state"""
+    return SequentialAgent(
+        name="CourseCopilotPipeline",
+        sub_agents=[create_course_planner_agent(planner_instruction), create_deep_content_loop_from_state("course_plan")],
+        description="Plans the course and elaborates it week by week in one session.",
+    )
+
+async def _session_plan(session_service, user_id, session_id):
+    """Course plan stored in a (durable) session's state, if any"""
+    if not session_id:
+        return ""
+    sess = await session_service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+    return ((getattr(sess, "state", {}) or {}).get("course_plan") or "").strip()
+
+async def run_plan_and_content(prompt: str, resume: bool = True, planner_instruction: str = None,
+                               tracker: ProgressTracker = None):
+    """
+    Plan the course and write its deep content in one ADK session
+
+    A SequentialAgent runs the CoursePlannerAgent, then the deep content loop,
+    which reads the plan from the course_plan session state. The plan is
+    exported to plan_agent_output.txt as soon as it lands; the deep content is
+    then streamed, checkpointed and merged as in run_knowledge_and_save, under
+    the run key that function uses for the same plan. An interrupted run
+    therefore resumes without planning again: the plan is read back from the
+    durable session and the remaining weeks go through run_knowledge_and_save.
+    """
+    _require_api_key()
+    tracker = tracker or ProgressTracker("deep_content")
+    pipeline = create_course_pipeline(planner_instruction)
+
+    user_id = "user-local"
+    session_id = f"session-{uuid.uuid4()}"
+    db_path = _out_dir() / SESSION_DB
+    session_service = SqliteSessionService(db_path)
+    checkpoints = WeekCheckpoints(db_path)
+    # Keyed by the planner instruction (and agent code): the same course resumes, a new one starts over
+    pipeline_key = agent_digest(APP_NAME, pipeline).hexdigest()
+    previous = checkpoints.get_run(pipeline_key)
+    if resume and previous and previous["status"] != "complete":
+        plan_text = await _session_plan(session_service, user_id, previous["session_id"])
+        if plan_text:
+            print("♻️ Resuming the combined run: keeping the plan of the interrupted attempt")
+            _write_txt("plan_agent_output", plan_text)
+            await run_knowledge_and_save(DEEP_PROMPT, resume=True, plan_text=plan_text, tracker=tracker)
+            checkpoints.finish_run(pipeline_key)
             return
+    attempt = checkpoints.start_run(pipeline_key, session_id, reset=True)
+    await session_service.create_session(app_name=APP_NAME, user_id=user_id, session_id=session_id,
+                                         state={"checkpointed_weeks": []})
+    reset_weeks(_out_dir())
 
-    # 5) Fallback to final state output if stream didn't capture
-    sess = session_service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
-    if inspect.isawaitable(sess):
-        sess = await sess
-    state = getattr(sess, "state", {}) or {}
-    deep_txt = state.get("deep_content", "").strip()  # from DeepCourseContentCreator (output_key)
+    user_msg = types.Content(role="user", parts=[types.Part.from_text(text=prompt)])
+    runner = create_runner(pipeline, APP_NAME, session_service)
+    run = _new_run(checkpoints, None)
 
-    if deep_txt:
-        _write_txt("deep_agent_output", deep_txt)
-        return
+    async def on_plan(plan_text):
+        if run["run_key"]:
+            return
+        _write_txt("plan_agent_output", plan_text)
+        # Same key as run_knowledge_and_save for this plan, so either can resume the other's weeks
+        run["run_key"] = agent_digest(APP_NAME, create_deep_content_loop(plan_text)).hexdigest()
+        checkpoints.start_run(run["run_key"], session_id, reset=True)
+        await tracker.stage_started(total_weeks=len(_plan_weeks(plan_text)[1]))
+
+    print("\n=== Running Course Pipeline (Planner → Deep Content) in one session ===")
+    with span("adk.run_async", kind="agent", stage="deep_content", agent=pipeline.name,
+              attempt=attempt, combined=True) as trace_span:
+        await _stream_deep_content(runner, user_id, session_id, user_msg, run, tracker, trace_span, on_plan=on_plan)
+
+    # The plan from the session state (or the planner's replies) if it never showed up as a state change
+    if not run["run_key"]:
+        plan_text = await _session_plan(session_service, user_id, session_id) or "\n\n".join(run["planner_texts"]).strip()
+        if not plan_text:
+            raise RuntimeError("No output captured from planner agent. Ensure output_key is set and agent replies.")
+        await on_plan(plan_text)
+    await _finish_deep_content(run, session_service, user_id, session_id)
+    checkpoints.finish_run(pipeline_key)
+
+def _plan_weeks(plan_text):
+    """Split the course plan into (overview before the first week, {week_number: week plan})"""
+    overview, weeks = [], {}
+    for week, text in split_into_weeks(plan_text):
+        if week is None:
+            if not weeks:
+                overview.append(text)
+        else:
+            # A week can show up more than once (outline, then schedule): keep all of its parts
+            weeks[week] = weeks.get(week, "") + text
+    return "".join(overview).strip(), weeks
+
+async def _generate_week(session_service, week, agent, tracker):
+    """Run one week's agent in its own session and return the week text, ending with its COMPLETED marker"""
+    user_id = "user-local"
+    session_id = f"session-{uuid.uuid4()}-week{week:02d}"
+    await session_service.create_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+    runner = create_runner(agent, APP_NAME, session_service)
+    user_msg = types.Content(role="user", parts=[types.Part.from_text(text=f"Write the deeply elaborated lesson for Week {week}.")])
 
-    # 6) Last resort: dump anything else we caught
-    combined = "\n\n".join(stream_bucket["Other"]).strip()
-    if not combined:
-        raise RuntimeError("No output captured from DeepCourseContentCreator. Ensure output_key is set and agent replies.")
-    _write_txt("deep_agent_output", combined)
-    return
-
-async def main_async():
-    # Provide the deep content creator a concise task prompt
-    prompt = "Take the provided course_content and generate deeply elaborated week-by-week lessons."
-    await run_knowledge_and_save(prompt)
+    parts = []
+    with span("adk.run_async", kind="agent", stage="deep_content", agent=agent.name, week=week) as trace_span:
+        async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=user_msg):
+            record_event(trace_span, event)
+            await tracker.feed(event)
+            txt = _extract_text(event)
+            if txt and not getattr(event, "partial", False):
+                parts.append(txt)
+    text = "\n\n".join(parts).strip()
+    if not text:
+        sess = await session_service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+        text = ((getattr(sess, "state", {}) or {}).get(agent.output_key) or "").strip()
+    if not text:
+        raise RuntimeError(f"No output captured from {agent.name}")
+    if not any(int(m.group(1)) == week for m in COMPLETED_RE.finditer(text)):
+        text += f"\n\n=== WEEK {week} COMPLETED ==="
+    return text + "\n"
+
+async def run_weeks_in_parallel(prompt: str, resume: bool = True, max_concurrency=None, plan_text: str = None,
+                                tracker: ProgressTracker = None):
+    """
+    Generate every week of the plan as its own agent run, at most max_concurrency at once
+
+    Each week agent gets the course overview, its own week of the plan and
+    compact summaries of the previous weeks' plans (not their generated text,
+    which does not exist yet), so latency is about that of the slowest week
+    rather than the sum of all of them. Weeks are checkpointed and saved to
+    weeks/ as they finish, then merged in week order into
+    deep_agent_output.txt. Falls back to the sequential loop when the plan has
+    no week headings.
+    """
+    _require_api_key()
+    if plan_text is None:
+        plan_text = read_planner_output()
+    tracker = tracker or ProgressTracker("deep_content")
+    overview, plan_weeks = _plan_weeks(plan_text)
+    if not plan_weeks:
+        print("⚠️ No week headings found in the course plan, using the sequential deep content loop")
+        return await run_knowledge_and_save(prompt, resume=resume, plan_text=plan_text, tracker=tracker)
+
+    # Same run key as the loop, so either mode can resume the other's checkpoints
+    session_service, checkpoints, run_key, attempt, completed = _open_run(create_deep_content_loop(plan_text), resume)
+    week_numbers = sorted(plan_weeks)
+    pending = [week for week in week_numbers if week not in completed]
+    _prepare_week_files(completed)
+    if len(pending) < len(week_numbers):
+        print(f"♻️ Resuming deep content (attempt {attempt}): {len(week_numbers) - len(pending)} of {len(week_numbers)} weeks checkpointed")
+
+    # Previous-week context: cached summaries of the plan's weeks, built concurrently
+    client = _summary_client()
+    summaries = await run_concurrently(
+        [lambda week=week: asyncio.to_thread(summarize_week, client, week, plan_weeks[week]) for week in week_numbers[:-1]],
+        max_concurrency=max_concurrency,
+    )
+    summaries = dict(zip(week_numbers, summaries))
+    await tracker.stage_started(total_weeks=len(week_numbers), done_weeks=completed)
+
+    async def generate(week):
+        previous = "".join(summaries[w] for w in week_numbers if w < week and isinstance(summaries.get(w), str))
+        agent = create_week_agent(week, plan_weeks[week], course_overview=overview, previous_weeks=previous)
+        await tracker.week_started(week)
+        text = await _generate_week(session_service, week, agent, tracker)
+        save_week_file(week, week_title(text), text, io_dir=_out_dir())
+        checkpoints.save_week(run_key, week, text)
+        await tracker.week_completed(week)
+        print(f"✅ Week {week} generated")
+        return text
+
+    print(f"\n=== Running Deep Content per week ({len(pending)} weeks, max {max_concurrency or 'default'} concurrent) ===")
+    with span("deep_content.parallel", kind="agent", stage="deep_content", attempt=attempt,
+              weeks=len(week_numbers), pending=len(pending), max_concurrency=max_concurrency) as trace_span:
+        results = await run_concurrently([lambda week=week: generate(week) for week in pending], max_concurrency=max_concurrency)
+        generated = dict(zip(pending, results))
+
+        failed = [week for week, result in generated.items() if isinstance(result, BaseException)]
+        for week in failed:
+            print(f"❌ Week {week} failed: {generated[week]}")
+
+        # Ordered merge of the checkpointed and freshly generated week files
+        output_path = _out_dir() / "deep_agent_output.txt"
+        merge_weeks(output_path, _out_dir(), done=not failed)
+        trace_span.set("failed_weeks", len(failed))
+        trace_span.set("bytes_written", output_path.stat().st_size)
+
+    if failed:
+        raise RuntimeError(f"Deep content failed for weeks {failed}; run again to resume from the checkpointed weeks")
+    checkpoints.finish_run(run_key)
+    print(f"[OK] Saved: {output_path}")
+
+async def main_async(plan_text=None, progress=None, combined=False, planner_instruction=None):
+    """
+    Run the deep content stage
+
+    combined=True plans the course in the same session first (see run_plan_and_content),
+    instead of reading plan_agent_output.txt written by the course_plan stage.
+    """
+    # COPILOT_DEEP_RESUME=off regenerates every week even after an interrupted run
+    resume = os.getenv("COPILOT_DEEP_RESUME", "on").lower() not in ("off", "0", "false")
+    # progress receives live progress events (see progress.stream_progress)
+    async with stage_progress("deep_content", progress) as tracker:
+        if combined:
+            # The plan only exists inside the session, so the weeks are written by the loop agent
+            if os.getenv("COPILOT_DEEP_MODE", "loop").lower() == "parallel":
+                print("ℹ️ COPILOT_DEEP_MODE=parallel is not used with combined agents; running the deep content loop")
+            await run_plan_and_content(COMBINED_PROMPT, resume=resume, planner_instruction=planner_instruction,
+                                       tracker=tracker)
+        # COPILOT_DEEP_MODE=parallel writes each week with its own agent, COPILOT_DEEP_CONCURRENCY at a time
+        elif os.getenv("COPILOT_DEEP_MODE", "loop").lower() == "parallel":
+            concurrency = os.getenv("COPILOT_DEEP_CONCURRENCY")
+            await run_weeks_in_parallel(DEEP_PROMPT, resume=resume, max_concurrency=int(concurrency) if concurrency else None,
+                                        plan_text=plan_text, tracker=tracker)
+        else:
+            await run_knowledge_and_save(DEEP_PROMPT, resume=resume, plan_text=plan_text, tracker=tracker)
 
 if __name__ == "__main__":
     asyncio.run(main_async())
@@ -1,29 +1,29 @@
 from google.adk.agents import LlmAgent
 from google.adk.tools import google_search
 from pathlib import Path
+import os
 
-# Read the planner agent instruction file
+# Read the planner agent instruction file (at run time, so every course gets its own)
 def read_planner_instruction():
+    # Resolve project root: this file is at copilot/knowledge/agent.py -> go up 2 levels
+    project_root = Path(__file__).resolve().parents[2]
+    file_path = Path(os.getenv("COPILOT_IO_DIR") or project_root / "Inputs and Outputs") / "planner_agent_instruction.txt"
     try:
-        # Resolve project root: this file is at copilot/knowledge/agent.py -> go up 2 levels
-        project_root = Path(__file__).resolve().parents[2]
-        file_path = project_root / "Inputs and Outputs" / "planner_agent_instruction.txt"
         with file_path.open('r', encoding='utf-8') as file:
             return file.read()
     except FileNotFoundError:
-        return "Planner instruction file not found. Please ensure the file exists at 'Inputs and Outputs/planner_agent_instruction.txt' under the project root."
-    except Exception as e:
-        return f"Error reading planner instruction file: {str(e)}"
-
-# Get the content from the planner instruction file
-planner_content = read_planner_instruction()
-
-courseplanneragent = LlmAgent(
-    name="CoursePlannerAgent",
-    model="gemini-2.5-flash",
-    tools=[google_search],
-    description="A course planning agent that helps design and organize educational content.",
-    instruction=f"""
+        raise FileNotFoundError(f"Planner instruction file not found at '{file_path}'. Run the planner stage first.") from None
+
+def create_course_planner_agent(planner_content=None):
+    """Build the CoursePlannerAgent around the planner instruction text (read from disk if not given)"""
+    if planner_content is None:
+        planner_content = read_planner_instruction()
+    return LlmAgent(
+        name="CoursePlannerAgent",
+        model="gemini-2.5-flash",
+        tools=[google_search],
+        description="A course planning agent that helps design and organize educational content.",
+        instruction=f"""
     You are an expert Course Planner Agent that creates comprehensive, detailed course content plans while also functioning as a high-precision Web Search Agent to find, evaluate, and organize high-quality online resources. Your goal is to produce a fully implementable course plan aligned with the provided curriculum, topic, teaching style, and difficulty level.
 
 ---
@@ -185,12 +185,12 @@ At the end of your output:
 
 You must combine your **course planning expertise** with **rigorous web resource discovery and evaluation** to produce a plan that is both academically strong and practically implementable.
 Begin every response with a heading saying "=== [CoursePlannerAgent] ===
-""",
-    output_key="course_plan",
-)
-
-print("Planner agent has successfully completed its task")
-
-root_agent = courseplanneragent
-
-print("Course content generation pipeline has been successfully configured!")
\ No newline at end of file
+    """,
+        output_key="course_plan",
+    )
+
+def __getattr__(name):
+    # root_agent (for `adk web`) and courseplanneragent are built on access from the current input file
+    if name in ("root_agent", "courseplanneragent"):
+        return create_course_planner_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
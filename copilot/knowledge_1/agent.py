@@ -1,89 +1,63 @@
-from google.adk.agents import LlmAgent, SequentialAgent, LoopAgent
+from google.adk.agents import BaseAgent, LlmAgent, SequentialAgent, LoopAgent
+from google.adk.events import Event, EventActions
 from google.adk.tools import google_search
+from google.genai import types
 from pathlib import Path
 import os
+import re
+import sys
 
-# File writing function (will be automatically wrapped as FunctionTool by ADK)
-def write_to_file(file_path: str, content: str, mode: str = "a") -> dict:
+PLAN_WEEK_RE = re.compile(r'^#{1,6}\s*Week\s+(\d+)\b', re.IGNORECASE | re.MULTILINE)
+COMPLETED_RE = re.compile(r'=== WEEK (\d+) COMPLETED ===')
+DONE_SENTINEL = "DONE and DUSTED"
+CREATOR_NAME = "DeepCourseContentCreator"
+COMPLETION_CHECKER_NAME = "DeepContentCompletionChecker"
+
+# Make project root importable (week_files lives there)
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from week_files import save_week_file
+
+def _io_dir():
+    project_root = Path(__file__).resolve().parents[2]
+    return Path(os.getenv("COPILOT_IO_DIR") or project_root / "Inputs and Outputs")
+
+# Week saving function (will be automatically wrapped as FunctionTool by ADK)
+def save_week(week_number: int, title: str, markdown: str) -> dict:
+    """Save one finished week of the course as its own Markdown file and add it to the weeks index.
+
+    Args:
+        week_number: The week's number (1, 2, 3, ...).
+        title: The week's title, without the "Week N:" prefix.
+        markdown: The week's complete Markdown content in the required week structure.
+    """
     try:
-        # Ensure the directory exists
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        
-        with open(file_path, mode, encoding='utf-8') as file:
-            file.write(content)
-        
+        entry = save_week_file(week_number, title, markdown, io_dir=_io_dir())
         return {
             "status": "success",
-            "message": f"Successfully wrote content to {file_path}",
-            "file_path": file_path,
-            "mode": mode
+            "message": f"Saved week {entry['week']} ({entry['bytes']} bytes) to weeks/{entry['file']}",
+            "week_number": entry["week"],
         }
     except Exception as e:
         return {
-            "status": "error", 
-            "message": f"Error writing to file {file_path}: {str(e)}",
-            "file_path": file_path,
+            "status": "error",
+            "message": f"Error saving week {week_number}: {str(e)}",
             "error": str(e)
         }
 
-# Helper function to get the proper file path
-def get_output_file_path():
-    """Get the proper file path for saving the deep course content"""
-    project_root = Path(__file__).resolve().parents[2]
-    file_path = project_root / "Inputs and Outputs" / "deep_agent_output.txt"
-    return str(file_path)
-
-# Read the planner agent instruction file
+# Read the course plan (at run time, so every course gets its own)
 def read_planner_output():
+    # Resolve project root: this file is at copilot/knowledge_1/agent.py -> go up 2 levels
+    project_root = Path(__file__).resolve().parents[2]
+    file_path = Path(os.getenv("COPILOT_IO_DIR") or project_root / "Inputs and Outputs") / "plan_agent_output.txt"
     try:
-        # Resolve project root: this file is at copilot/knowledge/agent.py -> go up 2 levels
-        project_root = Path(__file__).resolve().parents[2]
-        file_path = project_root / "Inputs and Outputs" / "plan_agent_output.txt"
         with file_path.open('r', encoding='utf-8') as file:
             return file.read()
     except FileNotFoundError:
-        return "Planner agent output file not found. Please ensure the file exists at 'Inputs and Outputs/planner_agent_instruction.txt' under the project root."
-    except Exception as e:
-        return f"Error reading planner output file: {str(e)}"
-
-# Get the content from the planner instruction file
-planner_content = read_planner_output()
-
-deep_course_content_Creator = LlmAgent(
-    name = "DeepCourseContentCreator",
-    model = "gemini-2.0-flash",
-    tools = [write_to_file],  
-    description = "A deep content creator agent that generates extremely comprehensive and detailed course materials week-by-week and saves them to a file.",
-    instruction= f"""
-You are an Expert Deep Course Content Creator Agent with 20+ years of experience in educational design. 
-You transform basic course content into fully teachable, deeply elaborated week-by-week lessons.
-
-INPUT:
-You will be provided with the following course design specifications (from `plan_agent_output.txt`):
-{planner_content}
-
-YOUR MANDATE:
-- Teach using a real-world-problem-first approach
-- Each week should be a complete, stand-alone teaching unit
-- Always connect new weeks to the knowledge from previous weeks
-- Focus on rich explanations, not quizzes or flashcards
-- Use BOTH your LLM intelligence and the Google Search tool to gather, verify, and integrate the **most accurate, current, and outstanding course content possible**
-- **IMPORTANT: Save ALL generated content to a file using the write_to_file tool**
+        raise FileNotFoundError(f"Planner agent output file not found at '{file_path}'. Run the course_plan stage first.") from None
 
-FILE SAVING INSTRUCTIONS:
-- At the start of content generation, use write_to_file tool to create/overwrite the output file: 'Inputs and Outputs/deep_course_content_output.txt' with a course header
-- After completing each week's content, use write_to_file tool with mode='a' to append that week's content to the file
-- At the end, use write_to_file tool with mode='a' to append "DONE and DUSTED" to signal completion
-
-WEEK-BY-WEEK PROCESS:
-1. **FIRST**: Call write_to_file(file_path='Inputs and Outputs/deep_course_content_output.txt', content='Course Content Generated by DeepCourseContentCreator Agent\\n\\n', mode='w') to initialize the file
-2. Identify the total number of weeks in the course
-3. Start with Week 1 (or next incomplete week) and complete it fully
-4. **After each week**: Call write_to_file(file_path='Inputs and Outputs/deep_course_content_output.txt', content=[week_content], mode='a') to append the week's content
-5. After each week, output a HALT marker to pause for ~10 seconds before continuing
-
-CONTENT STRUCTURE FOR EACH WEEK:
-=== PROCESSING WEEK [NUMBER] ===
+# Per-week lesson layout, shared by the sequential creator and the per-week agents
+WEEK_CONTENT_STRUCTURE = """=== PROCESSING WEEK [NUMBER] ===
 
 # Week [Number]: [Week Title] - From Real-World Problem to Solution
 
@@ -117,29 +91,210 @@ Briefly recap what was covered before and explain how it links to this week's to
 - Summarize key takeaways
 - Explain how this week's content sets up the next week's learning
 
-=== WEEK [NUMBER] COMPLETED ===
+=== WEEK [NUMBER] COMPLETED ==="""
+
+def create_deep_content_creator(planner_content):
+    """Build the DeepCourseContentCreator around the course plan text"""
+    return LlmAgent(
+        name = CREATOR_NAME,
+        model = "gemini-2.0-flash",
+        tools = [save_week],
+        description = "A deep content creator agent that generates extremely comprehensive and detailed course materials week-by-week and saves each week to its own file.",
+        instruction= f"""
+You are an Expert Deep Course Content Creator Agent with 20+ years of experience in educational design. 
+You transform basic course content into fully teachable, deeply elaborated week-by-week lessons.
+
+INPUT:
+You will be provided with the following course design specifications (from `plan_agent_output.txt`):
+{planner_content}
+
+YOUR MANDATE:
+- Teach using a real-world-problem-first approach
+- Each week should be a complete, stand-alone teaching unit
+- Always connect new weeks to the knowledge from previous weeks
+- Focus on rich explanations, not quizzes or flashcards
+- Use BOTH your LLM intelligence and the Google Search tool to gather, verify, and integrate the **most accurate, current, and outstanding course content possible**
+- **IMPORTANT: Save every week with the save_week tool. The tool call is the ONLY place the week's content is written**
+
+FILE SAVING INSTRUCTIONS:
+- Write each week's full content ONLY as the `markdown` argument of save_week(week_number, title, markdown)
+- NEVER repeat the week's content in your replies. Any text next to a save_week call is at most one short line: "Week [NUMBER] saved: [Week Title]"
+- Keep calling save_week, week after week, until every week is saved; a reply without a save_week call ends your turn
+- When every week is saved, reply with just "DONE and DUSTED"
+
+WEEK-BY-WEEK PROCESS:
+1. Identify the total number of weeks in the course
+2. Start with Week 1 (or next incomplete week) and complete it fully
+3. **For each week**: Call save_week(week_number=[NUMBER], title=[Week Title], markdown=[week_content])
+4. Continue with the next week until all weeks are saved
+5. If a completion check already listed missing weeks, generate and save ONLY those weeks, then reply "DONE and DUSTED". Missing weeks (empty on the first pass): {{missing_weeks?}}
+
+CONTENT STRUCTURE FOR EACH WEEK:
+{WEEK_CONTENT_STRUCTURE}
 
 <Halt/Pause for 4 seconds>
 
 WORKFLOW SUMMARY:
-1. Start by calling write_to_file to create 'Inputs and Outputs/deep_course_content_output.txt' with course header (mode='w')
-2. Generate each week's content fully using Google Search for enriched information
-3. After each week, call write_to_file with mode='a' to append that week's content to the file
-4. Continue until all weeks are complete
-5. Finally, call write_to_file with mode='a' to append "\\n\\nDONE and DUSTED\\n" to signal completion
+1. Generate each week's content fully using Google Search for enriched information
+2. Save it with save_week (the week's content goes only into the tool call)
+3. Continue until all weeks are saved
+4. Finally, reply "DONE and DUSTED" to signal completion
 
 Begin every response with a heading saying "=== [DeepCourseContentCreator] ===
 
-Important: After all weeks are completed, use write_to_file to append "DONE and DUSTED" to the file to signal that the course content has been fully elaborated into week-by-week lessons.
+Important: After all weeks are saved, reply "DONE and DUSTED" to signal that the course content has been fully elaborated into week-by-week lessons.
+    """,
+        output_key="deep_content",
+    )
+
+def create_week_agent(week_number, week_plan, course_overview="", previous_weeks=""):
+    """Agent that writes a single week, so weeks can be generated concurrently"""
+    return LlmAgent(
+        name=f"DeepWeek{week_number:02d}ContentCreator",
+        model="gemini-2.0-flash",
+        description=f"A deep content creator agent that generates the fully elaborated lesson for week {week_number}.",
+        instruction=f"""
+You are an Expert Deep Course Content Creator Agent with 20+ years of experience in educational design.
+You transform ONE week of a course plan into a fully teachable, deeply elaborated lesson.
+The other weeks are written at the same time by other agents.
+
+COURSE OVERVIEW:
+{course_overview or "Not provided."}
+
+PREVIOUS WEEKS (compact summaries, for continuity):
+{previous_weeks or "None - this is the first week."}
+
+THIS WEEK'S PLAN (Week {week_number}):
+{week_plan}
+
+YOUR MANDATE:
+- Teach using a real-world-problem-first approach
+- Make this week a complete, stand-alone teaching unit that builds on the previous weeks above
+- Focus on rich explanations, not quizzes or flashcards
+- Write Week {week_number} only: no other weeks, no file writing, no "DONE and DUSTED"
+
+Use exactly this structure, with [NUMBER] = {week_number}:
+{WEEK_CONTENT_STRUCTURE}
 """,
-    output_key="deep_content",
-)
+        output_key=f"week_{week_number:02d}_content",
+    )
+
+def _event_texts(event):
+    # Completed weeks show up as successful save_week responses (or as COMPLETED markers in plain text replies)
+    for part in (event.content.parts if event.content else None) or []:
+        if part.text:
+            yield part.text
+    for response in event.get_function_responses():
+        result = response.response or {}
+        # A failed save (disk error, bad week number) leaves its week missing, so the loop writes it again
+        if response.name == "save_week" and result.get("status") == "success":
+            yield f"=== WEEK {int(result['week_number'])} COMPLETED ==="
+
+
+class CompletionChecker(BaseAgent):
+    """
+    Ends the deep content loop as soon as every planned week is complete
+
+    Runs after the creator in each loop iteration. Weeks count as done when
+    their "=== WEEK N COMPLETED ===" marker appears in the creator's output,
+    save_week reported them saved, or they are listed in the
+    checkpointed_weeks state (resumed runs). Sets missing_weeks and
+    deep_loop_iterations in the state and escalates to stop the loop when
+    nothing is missing; without week headings in the plan the
+    "DONE and DUSTED" sentinel decides. With plan_state_key the planned weeks
+    are read from that session state key (a plan produced earlier in the
+    same session) instead of planned_weeks.
+    """
+
+    planned_weeks: list[int] = []
+    plan_state_key: str = ""
+    creator_name: str = ""
+
+    async def _run_async_impl(self, ctx):
+        state = ctx.session.state
+        planned_weeks = self.planned_weeks
+        if self.plan_state_key:
+            planned_weeks = _planned_weeks(state.get(self.plan_state_key) or "")
+        done = set(state.get("checkpointed_weeks") or [])
+        seen_sentinel = False
+        for event in ctx.session.events:
+            if event.author != self.creator_name:
+                continue
+            for text in _event_texts(event):
+                done.update(int(week) for week in COMPLETED_RE.findall(text))
+                seen_sentinel = seen_sentinel or DONE_SENTINEL in text
+
+        iterations = state.get("deep_loop_iterations", 0) + 1
+        missing = [week for week in planned_weeks if week not in done]
+        complete = not missing if planned_weeks else seen_sentinel
+        if complete:
+            message = f"Completion check (iteration {iterations}): all {len(planned_weeks) or len(done)} weeks complete."
+        elif missing:
+            message = (f"Completion check (iteration {iterations}): missing or incomplete weeks: {', '.join(map(str, missing))}. "
+                       f"Generate ONLY these weeks, then append \"{DONE_SENTINEL}\".")
+        else:
+            message = f"Completion check (iteration {iterations}): \"{DONE_SENTINEL}\" not written yet. Finish the remaining weeks."
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=message)]),
+            actions=EventActions(
+                escalate=complete,
+                state_delta={"missing_weeks": missing, "deep_loop_iterations": iterations},
+            ),
+        )
+
+
+def _planned_weeks(planner_content):
+    return sorted({int(week) for week in PLAN_WEEK_RE.findall(planner_content)})
+
+
+def create_completion_checker(planner_content=None, creator_name=CREATOR_NAME, plan_state_key=""):
+    return CompletionChecker(
+        name=COMPLETION_CHECKER_NAME,
+        description="Checks that every planned week is complete and ends the deep content loop early.",
+        planned_weeks=_planned_weeks(planner_content or ""),
+        plan_state_key=plan_state_key,
+        creator_name=creator_name,
+    )
+
+
+def create_deep_content_loop(planner_content=None):
+    """Build the deep content LoopAgent (creator + completion checker) for a course plan (read from disk if not given)"""
+    if planner_content is None:
+        planner_content = read_planner_output()
+    return LoopAgent(
+        name="deepcontentloop",
+        sub_agents=[create_deep_content_creator(planner_content), create_completion_checker(planner_content)],
+        description="A loop agent that refines and enhances the generated course content based on quality checks and saves output to file.",
+        max_iterations=3,
+    )
+
+
+def create_deep_content_loop_from_state(state_key="course_plan"):
+    """
+    Deep content LoopAgent that reads the course plan from session state
+
+    For a SequentialAgent that runs the planner first in the same session: the
+    creator's instruction uses the {course_plan} placeholder, which ADK fills
+    from state at run time, so the plan never goes through a file.
+    """
+    return LoopAgent(
+        name="deepcontentloop",
+        sub_agents=[
+            create_deep_content_creator("{" + state_key + "}"),
+            create_completion_checker(plan_state_key=state_key),
+        ],
+        description="A loop agent that refines and enhances the generated course content based on quality checks and saves output to file.",
+        max_iterations=3,
+    )
 
-deep_content_loop = LoopAgent(
-    name="deepcontentloop",
-    sub_agents=[deep_course_content_Creator],
-    description="A loop agent that refines and enhances the generated course content based on quality checks and saves output to file.",
-    max_iterations=3,
-)
 
-root_agent = deep_content_loop
\ No newline at end of file
+def __getattr__(name):
+    # root_agent (for `adk web`) and the former module-level agents are built on access from the current plan file
+    if name in ("root_agent", "deep_content_loop"):
+        return create_deep_content_loop()
+    if name == "deep_course_content_Creator":
+        return create_deep_content_creator(read_planner_output())
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -2,7 +2,6 @@ import asyncio, os, sys, uuid, inspect
 from pathlib import Path
 from datetime import datetime
 
-from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
 from google.genai import types  # Content / Part
 from dotenv import load_dotenv
@@ -10,7 +9,12 @@ from dotenv import load_dotenv
 # Make project root importable
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from knowledge.agent import courseplanneragent as final_pipeline  # your SequentialAgent (planner -> loop(content))
+from fake_genai import create_runner, genai_mode
+from progress import ProgressTracker, stage_progress
+from tracing import record_event, span
+
+# The planner agent is built per run from the current instruction file, so one process can plan many courses
+from knowledge.agent import create_course_planner_agent
 
 APP_NAME = "AI Copilot for Instructors"
 EXPORT_DIR = "Inputs and Outputs"
@@ -19,8 +23,9 @@ def _nowstamp():
     return datetime.now().strftime("%Y%m%d-%H%M%S")
 
 def _out_dir() -> Path:
+    # COPILOT_IO_DIR lets batch runs point each course at its own directory
     root = Path(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-    p = root / EXPORT_DIR
+    p = Path(os.getenv("COPILOT_IO_DIR") or root / EXPORT_DIR)
     p.mkdir(parents=True, exist_ok=True)
     return p
 
@@ -43,14 +48,16 @@ def _extract_text(event) -> str:
                 return pt
     return ""
 
-async def run_knowledge_and_save(prompt: str):
+async def run_knowledge_and_save(prompt: str, planner_instruction: str = None, tracker: ProgressTracker = None):
     # Ensure GEMINI_API_KEY loaded from project root .env
     project_root = Path(__file__).resolve().parents[1]
     load_dotenv(dotenv_path=project_root / ".env", override=False)
-    if not os.getenv("GEMINI_API_KEY"):
+    if not os.getenv("GEMINI_API_KEY") and genai_mode() != "replay":
         raise EnvironmentError(
             "GEMINI_API_KEY is not set. Create a .env at project root with GEMINI_API_KEY=... or set the environment variable."
         )
+    final_pipeline = create_course_planner_agent(planner_instruction)
+    tracker = tracker or ProgressTracker("course_plan")
 
     # 1) DB-free session
     session_service = InMemorySessionService()
@@ -65,7 +72,8 @@ async def run_knowledge_and_save(prompt: str):
 
     # 3) Runner (SequentialAgent executes sub-agents in order) 
     #    (Sequential/Loop agent semantics in ADK docs)
-    runner = Runner(agent=final_pipeline, app_name=APP_NAME, session_service=session_service)
+    runner = create_runner(final_pipeline, APP_NAME, session_service)
+    await tracker.stage_started()
 
     print("\n=== Running Knowledge Pipeline (Planner → Content) ===")
     # Stream buckets as a fallback if session.state isn't filled
@@ -74,17 +82,20 @@ async def run_knowledge_and_save(prompt: str):
         "Other": []
     }
 
-    async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=user_msg):
-        if getattr(event, "type", "") == "agent_reply" or hasattr(event, "is_final_response"):
-            txt = _extract_text(event)
-            # Try to detect source agent
-            agent_name = getattr(event, "agent_name", None)
-            if not agent_name and txt.startswith("=== [CoursePlannerAgent] ==="):
-                agent_name = "CoursePlannerAgent"
-            if agent_name in stream_bucket:
-                stream_bucket[agent_name].append(txt)
-            else:
-                stream_bucket["Other"].append(txt)
+    with span("adk.run_async", kind="agent", stage="course_plan", agent=final_pipeline.name) as trace_span:
+        async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=user_msg):
+            record_event(trace_span, event)
+            await tracker.feed(event)
+            if getattr(event, "type", "") == "agent_reply" or hasattr(event, "is_final_response"):
+                txt = _extract_text(event)
+                # Try to detect source agent
+                agent_name = getattr(event, "agent_name", None)
+                if not agent_name and txt.startswith("=== [CoursePlannerAgent] ==="):
+                    agent_name = "CoursePlannerAgent"
+                if agent_name in stream_bucket:
+                    stream_bucket[agent_name].append(txt)
+                else:
+                    stream_bucket["Other"].append(txt)
 
     sess = session_service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
     if inspect.isawaitable(sess):
@@ -107,10 +118,12 @@ async def run_knowledge_and_save(prompt: str):
     if plan_txt:
         _write_txt("plan_agent_output", plan_txt)
 
-async def main_async():
+async def main_async(planner_instruction=None, progress=None):
     # You can tailor this to your exact expected input contract for the planner
     prompt = "Generate the course plan."
-    await run_knowledge_and_save(prompt)
+    # progress receives live progress events (see progress.stream_progress)
+    async with stage_progress("course_plan", progress) as tracker:
+        await run_knowledge_and_save(prompt, planner_instruction=planner_instruction, tracker=tracker)
 
 if __name__ == "__main__":
     asyncio.run(main_async())
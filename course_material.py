@@ -1,10 +1,9 @@
+import functools
 import pathlib
 import os
-import re
 from docx import Document
 from docx.shared import Inches
 from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.shared import RGBColor
 from docx.enum.text import WD_COLOR_INDEX
 from docx2pdf import convert
 from reportlab.lib.pagesizes import A4
@@ -12,8 +11,32 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
+import markdown_ir
+import week_segmenter
+from tracing import traced
 
-def read_course_content_files():
+COPILOT_OUTPUT_DIR = pathlib.Path("copilot/Inputs and Outputs")
+
+def find_deep_content_file():
+    """
+    The deep content file to read (it may not exist)
+
+    From the copilot folder "Inputs and Outputs" (agents launched from copilot/ by start.bat),
+    falling back to the project "Inputs and Outputs" (agents run in-process by pipeline.py).
+    """
+    for deep_file in (COPILOT_OUTPUT_DIR / "deep_course_content_output.txt", COPILOT_OUTPUT_DIR / "deep_agent_output.txt"):
+        if deep_file.exists():
+            return deep_file
+    return pathlib.Path("Inputs and Outputs") / "deep_agent_output.txt"
+
+def read_course_content_files(deep_as_path=False):
+    """
+    Return (planner_content, deep_content)
+
+    With deep_as_path the deep content file is not read: its path is returned
+    instead ("" when it is missing or empty), for parse_course to read one
+    week at a time.
+    """
     planner_content = ""
     deep_content = ""
     
@@ -32,16 +55,13 @@ def read_course_content_files():
     else:
         print(f"⚠️ Planner file not found: {planner_file}")
     
-    # Read from copilot folder "Inputs and Outputs"
-    copilot_dir_path = pathlib.Path("copilot/Inputs and Outputs")
-    
     # Try to read deep course content output
-    deep_file = copilot_dir_path / "deep_course_content_output.txt"
-    if not deep_file.exists():
-        # Try alternative filename
-        deep_file = copilot_dir_path / "deep_agent_output.txt"
-    
-    if deep_file.exists():
+    deep_file = find_deep_content_file()
+    if deep_file.exists() and deep_as_path:
+        if deep_file.stat().st_size:
+            deep_content = deep_file
+        print(f"✅ Found deep content in: {deep_file}")
+    elif deep_file.exists():
         try:
             with open(deep_file, 'r', encoding='utf-8') as f:
                 deep_content = f.read()
@@ -49,92 +69,74 @@ def read_course_content_files():
         except Exception as e:
             print(f"❌ Error reading {deep_file}: {e}")
     else:
-        print(f"⚠️ Deep content file not found in: {copilot_dir_path}")
+        print(f"⚠️ Deep content file not found in: {COPILOT_OUTPUT_DIR}")
     
     return planner_content, deep_content
 
+# Numbering of the alternative patterns in the messages, as in the old regex cascade
+ALTERNATIVE_PATTERNS = {"marker": 1, "colon": 2, "completed": 5}
+
 def parse_weeks_from_content(content):
     """Parse the content to extract individual weeks/modules based on the specific pattern"""
     weeks = []
     
     print("🔍 Looking for week patterns: '# Week X' ... '=== WEEK X COMPLETED ==='")
     
-    # Primary pattern: # Week X ... === WEEK X COMPLETED ===
-    week_pattern = r'# Week (\d+)(.*?)=== WEEK \1 COMPLETED ==='
-    matches = re.findall(week_pattern, content, re.DOTALL | re.IGNORECASE)
-    
-    if matches:
-        print(f"✅ Found {len(matches)} weeks using primary pattern")
-        for week_num, week_content in matches:
-            weeks.append({
-                'number': int(week_num),
-                'type': 'Week',
-                'content': week_content.strip(),
-                'title': f"Week {week_num}"
-            })
+    # One sweep indexes every week marker; the patterns below are tried on that index, not the text
+    tokens = week_segmenter.scan(content)
+    strategy, spans = week_segmenter.segment(content, tokens)
+    _print_strategy(strategy, spans, tokens)
+    
+    for week_num, start, end in spans:
+        start, end = week_segmenter.strip_span(content, start, end)
+        weeks.append(_week(week_num, content[start:end]))
+    
+    return _sorted_weeks(weeks)
+
+def parse_weeks_from_file(path):
+    """
+    parse_weeks_from_content for a file, without reading it into one string
+
+    The file is memory-mapped and segmented in place; only one week's text
+    is decoded at a time. Newlines are normalized as a text-mode read would.
+    """
+    print("🔍 Looking for week patterns: '# Week X' ... '=== WEEK X COMPLETED ==='")
+    weeks = []
+    reported = False
+    
+    def on_segment(strategy, spans, tokens):
+        nonlocal reported
+        reported = True
+        _print_strategy(strategy, spans, tokens)
+    
+    for week_num, content in week_segmenter.iter_file_weeks(path, on_segment):
+        text = str(content, 'utf-8').replace('\r\n', '\n').replace('\r', '\n')
+        weeks.append(_week(week_num, text.strip()))
+    if not reported:  # empty file
+        _print_strategy(None, [], [])
+    
+    return _sorted_weeks(weeks)
+
+def _week(week_num, content):
+    return {
+        'number': week_num,
+        'type': 'Week',
+        'content': content,
+        'title': f"Week {week_num}"
+    }
+
+def _print_strategy(strategy, spans, tokens):
+    if strategy == "heading":
+        print(f"✅ Found {len(spans)} weeks using primary pattern")
+    elif strategy in ("marker", "colon", "completed"):
+        print("⚠️ Primary pattern not found, trying alternative patterns...")
+        print(f"✅ Found {len(spans)} weeks using alternative pattern {ALTERNATIVE_PATTERNS[strategy]}")
     else:
         print("⚠️ Primary pattern not found, trying alternative patterns...")
-        
-        # Alternative patterns to try
-        patterns = [
-            # Pattern 1: === WEEK X === ... === WEEK X COMPLETED ===
-            r'=== WEEK (\d+) ===(.*?)=== WEEK \1 COMPLETED ===',
-            # Pattern 2: Week X: ... === WEEK X COMPLETED ===
-            r'Week (\d+):(.*?)=== WEEK \1 COMPLETED ===',
-            # Pattern 3: ## Week X ... === WEEK X COMPLETED ===
-            r'## Week (\d+)(.*?)=== WEEK \1 COMPLETED ===',
-            # Pattern 4: ### Week X ... === WEEK X COMPLETED ===
-            r'### Week (\d+)(.*?)=== WEEK \1 COMPLETED ===',
-            # Pattern 5: Just split by === WEEK X COMPLETED === and work backwards
-            r'(.*?)=== WEEK (\d+) COMPLETED ===',
-        ]
-        
-        for i, pattern in enumerate(patterns):
-            matches = re.findall(pattern, content, re.DOTALL | re.IGNORECASE)
-            if matches:
-                print(f"✅ Found {len(matches)} weeks using alternative pattern {i+1}")
-                for match in matches:
-                    if len(match) == 2:
-                        if pattern == patterns[-1]:  # Last pattern has different order
-                            week_content, week_num = match
-                        else:
-                            week_num, week_content = match
-                        
-                        weeks.append({
-                            'number': int(week_num),
-                            'type': 'Week',
-                            'content': week_content.strip(),
-                            'title': f"Week {week_num}"
-                        })
-                break
-    
-    # If still no matches, try to find any week markers and extract content between them
-    if not weeks:
         print("🔍 Trying to find week markers in content...")
-        
-        # Look for any week markers
-        week_markers = re.findall(r'(?:^|\n)(.*?Week (\d+).*?)(?=\n|$)', content, re.MULTILINE | re.IGNORECASE)
-        completion_markers = re.findall(r'=== WEEK (\d+) COMPLETED ===', content, re.IGNORECASE)
-        
-        print(f"Found {len(week_markers)} week markers and {len(completion_markers)} completion markers")
-        
-        if week_markers or completion_markers:
-            # Try to extract content between week numbers
-            week_numbers = sorted(list(set([int(match[1]) for match in week_markers] + [int(num) for num in completion_markers])))
-            
-            for week_num in week_numbers:
-                # Find content that mentions this week
-                week_content_pattern = rf'.*?Week {week_num}.*?(?=Week {week_num + 1}|$)'
-                match = re.search(week_content_pattern, content, re.DOTALL | re.IGNORECASE)
-                
-                if match:
-                    weeks.append({
-                        'number': week_num,
-                        'type': 'Week',
-                        'content': match.group(0).strip(),
-                        'title': f"Week {week_num}"
-                    })
-    
+        print(f"Found {len(tokens)} week markers and 0 completion markers")
+
+def _sorted_weeks(weeks):
     # Sort by week number
     weeks.sort(key=lambda x: x['number'])
     
@@ -145,6 +147,25 @@ def parse_weeks_from_content(content):
     
     return weeks
 
+def parse_course(planner_content, deep_content):
+    """
+    Parse the course once for every output format
+
+    deep_content is the text, or the path of the deep content file (read a
+    week at a time, see parse_weeks_from_file). Returns {'plan': blocks,
+    'weeks': [week dicts with their 'blocks']}, with blocks as produced by
+    markdown_ir.parse.
+    """
+    if isinstance(deep_content, pathlib.Path):
+        weeks = parse_weeks_from_file(deep_content)
+    else:
+        weeks = parse_weeks_from_content(deep_content) if deep_content else []
+    return {
+        'plan': markdown_ir.parse(planner_content) if planner_content else [],
+        'weeks': [dict(week, blocks=markdown_ir.parse(week['content'])) for week in weeks],
+    }
+
+@traced("render.create_docx_for_week", kind="render")
 def create_docx_for_week(week_data, output_dir):
     """Create a DOCX file for a specific week"""
     
@@ -167,165 +188,11 @@ def create_docx_for_week(week_data, output_dir):
     # Add a separator line
     doc.add_paragraph('─' * 80)
     
-    # Process the content
-    content_lines = week_data['content'].split('\n')
-    current_paragraph = ""
-    in_code_block = False
-    
-    for line in content_lines:
-        original_line = line
-        line = line.strip()
-        
-        # Skip empty lines but add spacing
-        if not line:
-            if current_paragraph:
-                # Handle bold formatting in current paragraph before adding
-                if '**' in current_paragraph:
-                    p = doc.add_paragraph()
-                    parts = current_paragraph.split('**')
-                    for i, part in enumerate(parts):
-                        run = p.add_run(part)
-                        if i % 2 == 1:  # Odd indices should be bold
-                            run.bold = True
-                else:
-                    doc.add_paragraph(current_paragraph)
-                current_paragraph = ""
-            doc.add_paragraph()  # Add blank line
-            continue
-        
-        # Handle code blocks
-        if line.startswith('```'):
-            if current_paragraph:
-                doc.add_paragraph(current_paragraph)
-                current_paragraph = ""
-            in_code_block = not in_code_block
-            continue
-            
-        if in_code_block:
-            # Add code with monospace formatting
-            p = doc.add_paragraph(original_line)
-            for run in p.runs:
-                run.font.name = 'Courier New'
-            continue
-        
-        # Handle different types of content formatting
-        if line.startswith('###### '):  # Level 6 heading
-            if current_paragraph:
-                doc.add_paragraph(current_paragraph)
-                current_paragraph = ""
-            doc.add_heading(line.replace('###### ', ''), level=6)
-            
-        elif line.startswith('##### '):  # Level 5 heading
-            if current_paragraph:
-                doc.add_paragraph(current_paragraph)
-                current_paragraph = ""
-            doc.add_heading(line.replace('##### ', ''), level=5)
-            
-        elif line.startswith('#### '):  # Level 4 heading
-            if current_paragraph:
-                doc.add_paragraph(current_paragraph)
-                current_paragraph = ""
-            doc.add_heading(line.replace('#### ', ''), level=4)
-            
-        elif line.startswith('### '):  # Level 3 heading
-            if current_paragraph:
-                doc.add_paragraph(current_paragraph)
-                current_paragraph = ""
-            doc.add_heading(line.replace('### ', ''), level=3)
-            
-        elif line.startswith('## '):  # Level 2 heading
-            if current_paragraph:
-                doc.add_paragraph(current_paragraph)
-                current_paragraph = ""
-            doc.add_heading(line.replace('## ', ''), level=2)
-            
-        elif line.startswith('# ') and not line.startswith('# Week'):  # Level 1 heading (but not week title)
-            if current_paragraph:
-                doc.add_paragraph(current_paragraph)
-                current_paragraph = ""
-            doc.add_heading(line.replace('# ', ''), level=1)
-        
-        # Handle special sections with icons
-        elif line.startswith('## 🔗') or line.startswith('## 🔍') or line.startswith('## 💡') or line.startswith('## 📚') or line.startswith('## 🌟') or line.startswith('## 📖') or line.startswith('## 🚀'):
-            if current_paragraph:
-                doc.add_paragraph(current_paragraph)
-                current_paragraph = ""
-            doc.add_heading(line.replace('## ', ''), level=2)
-            
-        # Handle bullet points and lists
-        elif line.startswith('- ') or line.startswith('* '):
-            if current_paragraph:
-                doc.add_paragraph(current_paragraph)
-                current_paragraph = ""
-            bullet_text = line.replace('- ', '').replace('* ', '')
-            # Handle bold text in bullet points
-            if '**' in bullet_text:
-                p = doc.add_paragraph(style='List Bullet')
-                parts = bullet_text.split('**')
-                for i, part in enumerate(parts):
-                    run = p.add_run(part)
-                    if i % 2 == 1:  # Odd indices should be bold
-                        run.bold = True
-            else:
-                doc.add_paragraph(bullet_text, style='List Bullet')
-        
-        # Handle numbered lists
-        elif re.match(r'^\d+\. ', line):
-            if current_paragraph:
-                doc.add_paragraph(current_paragraph)
-                current_paragraph = ""
-            list_text = re.sub(r'^\d+\. ', '', line)
-            # Handle bold text in numbered lists
-            if '**' in list_text:
-                p = doc.add_paragraph(style='List Number')
-                parts = list_text.split('**')
-                for i, part in enumerate(parts):
-                    run = p.add_run(part)
-                    if i % 2 == 1:  # Odd indices should be bold
-                        run.bold = True
-            else:
-                doc.add_paragraph(list_text, style='List Number')
-        
-        # Handle separator lines
-        elif line.startswith('---') or line == '=' * len(line):
-            if current_paragraph:
-                doc.add_paragraph(current_paragraph)
-                current_paragraph = ""
-            doc.add_paragraph('─' * 80)
-        
-        # Handle special completion markers
-        elif 'COMPLETED' in line.upper() and '===' in line:
-            if current_paragraph:
-                doc.add_paragraph(current_paragraph)
-                current_paragraph = ""
-            p = doc.add_paragraph(line)
-            for run in p.runs:
-                run.bold = True
-                run.font.color.rgb = RGBColor(0, 128, 0)  # Green color
-        
-        # Handle halt markers
-        elif 'Halt for' in line and 'seconds' in line:
-            # Skip halt markers in DOCX output
-            continue
-            
-        # Regular content - accumulate into paragraph
-        else:
-            if current_paragraph:
-                current_paragraph += " " + line
-            else:
-                current_paragraph = line
-    
-    # Add any remaining paragraph
-    if current_paragraph:
-        if '**' in current_paragraph:
-            p = doc.add_paragraph()
-            parts = current_paragraph.split('**')
-            for i, part in enumerate(parts):
-                run = p.add_run(part)
-                if i % 2 == 1:  # Odd indices should be bold
-                    run.bold = True
-        else:
-            doc.add_paragraph(current_paragraph)
+    # Render the parsed content (parsed here unless parse_course already did)
+    blocks = week_data.get('blocks')
+    if blocks is None:
+        blocks = markdown_ir.parse(week_data['content'])
+    markdown_ir.render_docx(doc, blocks, rule_width=80)
     
     # Create filename - make it more descriptive
     filename = f"Week_{week_data['number']:02d}_Course_Content.docx"
@@ -406,8 +273,11 @@ def create_course_material_docx():
         
     return created_files
 
-def create_combined_docx(planner_content, deep_content, output_dir):
-    """Create a combined DOCX file with all course content"""
+@traced("render.create_combined_docx", kind="render")
+def create_combined_docx(planner_content, deep_content, output_dir, course=None):
+    """Create a combined DOCX file with all course content (course: parse_course() result, parsed here if not given)"""
+    if course is None:
+        course = parse_course(planner_content, deep_content)
     
     # Create a new document
     doc = Document()
@@ -433,85 +303,7 @@ def create_combined_docx(planner_content, deep_content, output_dir):
         plan_heading = doc.add_heading('Course Plan & Structure', 1)
         doc.add_paragraph('─' * 60)
         
-        # Process planner content
-        plan_lines = planner_content.split('\n')
-        current_paragraph = ""
-        
-        for line in plan_lines:
-            line = line.strip()
-            if not line:
-                if current_paragraph:
-                    if '**' in current_paragraph:
-                        p = doc.add_paragraph()
-                        parts = current_paragraph.split('**')
-                        for i, part in enumerate(parts):
-                            run = p.add_run(part)
-                            if i % 2 == 1:
-                                run.bold = True
-                    else:
-                        doc.add_paragraph(current_paragraph)
-                    current_paragraph = ""
-                doc.add_paragraph()
-                continue
-            
-            # Handle headings
-            if line.startswith('### **'):
-                if current_paragraph:
-                    doc.add_paragraph(current_paragraph)
-                    current_paragraph = ""
-                heading_text = line.replace('### **', '').replace('**', '')
-                doc.add_heading(heading_text, 2)
-                
-            elif line.startswith('### '):
-                if current_paragraph:
-                    doc.add_paragraph(current_paragraph)
-                    current_paragraph = ""
-                doc.add_heading(line.replace('### ', ''), 3)
-                
-            elif line.startswith('## '):
-                if current_paragraph:
-                    doc.add_paragraph(current_paragraph)
-                    current_paragraph = ""
-                doc.add_heading(line.replace('## ', ''), 2)
-                
-            elif line.startswith('*   ') or line.startswith('    *   '):
-                if current_paragraph:
-                    doc.add_paragraph(current_paragraph)
-                    current_paragraph = ""
-                bullet_text = line.replace('*   ', '').replace('    *   ', '')
-                if '**' in bullet_text:
-                    p = doc.add_paragraph(style='List Bullet')
-                    parts = bullet_text.split('**')
-                    for i, part in enumerate(parts):
-                        run = p.add_run(part)
-                        if i % 2 == 1:
-                            run.bold = True
-                else:
-                    doc.add_paragraph(bullet_text, style='List Bullet')
-                    
-            elif line.startswith('---'):
-                if current_paragraph:
-                    doc.add_paragraph(current_paragraph)
-                    current_paragraph = ""
-                doc.add_paragraph('─' * 60)
-                
-            else:
-                if current_paragraph:
-                    current_paragraph += " " + line
-                else:
-                    current_paragraph = line
-        
-        # Add any remaining paragraph
-        if current_paragraph:
-            if '**' in current_paragraph:
-                p = doc.add_paragraph()
-                parts = current_paragraph.split('**')
-                for i, part in enumerate(parts):
-                    run = p.add_run(part)
-                    if i % 2 == 1:
-                        run.bold = True
-            else:
-                doc.add_paragraph(current_paragraph)
+        markdown_ir.render_docx(doc, course['plan'], rule_width=60)
     
     # Add page break
     doc.add_page_break()
@@ -521,129 +313,12 @@ def create_combined_docx(planner_content, deep_content, output_dir):
         deep_heading = doc.add_heading('Detailed Course Content', 1)
         doc.add_paragraph('─' * 60)
         
-        # Process deep content (parse weeks)
-        weeks = parse_weeks_from_content(deep_content)
-        
-        for week in weeks:
+        for week in course['weeks']:
             # Add week heading
             week_heading = doc.add_heading(f"Week {week['number']}: Detailed Content", 2)
             
-            # Process week content
-            content_lines = week['content'].split('\n')
-            current_paragraph = ""
-            in_code_block = False
-            
-            for line in content_lines:
-                original_line = line
-                line = line.strip()
-                
-                if not line:
-                    if current_paragraph:
-                        if '**' in current_paragraph:
-                            p = doc.add_paragraph()
-                            parts = current_paragraph.split('**')
-                            for i, part in enumerate(parts):
-                                run = p.add_run(part)
-                                if i % 2 == 1:
-                                    run.bold = True
-                        else:
-                            doc.add_paragraph(current_paragraph)
-                        current_paragraph = ""
-                    doc.add_paragraph()
-                    continue
-                
-                # Handle code blocks
-                if line.startswith('```'):
-                    if current_paragraph:
-                        doc.add_paragraph(current_paragraph)
-                        current_paragraph = ""
-                    in_code_block = not in_code_block
-                    continue
-                    
-                if in_code_block:
-                    p = doc.add_paragraph(original_line)
-                    for run in p.runs:
-                        run.font.name = 'Courier New'
-                    continue
-                
-                # Handle headings with icons
-                if line.startswith('## 🔗') or line.startswith('## 🔍') or line.startswith('## 💡') or line.startswith('## 📚') or line.startswith('## 🌟') or line.startswith('## 📖') or line.startswith('## 🚀'):
-                    if current_paragraph:
-                        doc.add_paragraph(current_paragraph)
-                        current_paragraph = ""
-                    doc.add_heading(line.replace('## ', ''), 3)
-                
-                elif line.startswith('### '):
-                    if current_paragraph:
-                        doc.add_paragraph(current_paragraph)
-                        current_paragraph = ""
-                    doc.add_heading(line.replace('### ', ''), 4)
-                
-                elif line.startswith('- ') or line.startswith('* '):
-                    if current_paragraph:
-                        doc.add_paragraph(current_paragraph)
-                        current_paragraph = ""
-                    bullet_text = line.replace('- ', '').replace('* ', '')
-                    if '**' in bullet_text:
-                        p = doc.add_paragraph(style='List Bullet')
-                        parts = bullet_text.split('**')
-                        for i, part in enumerate(parts):
-                            run = p.add_run(part)
-                            if i % 2 == 1:
-                                run.bold = True
-                    else:
-                        doc.add_paragraph(bullet_text, style='List Bullet')
-                
-                elif re.match(r'^\d+\. ', line):
-                    if current_paragraph:
-                        doc.add_paragraph(current_paragraph)
-                        current_paragraph = ""
-                    list_text = re.sub(r'^\d+\. ', '', line)
-                    if '**' in list_text:
-                        p = doc.add_paragraph(style='List Number')
-                        parts = list_text.split('**')
-                        for i, part in enumerate(parts):
-                            run = p.add_run(part)
-                            if i % 2 == 1:
-                                run.bold = True
-                    else:
-                        doc.add_paragraph(list_text, style='List Number')
-                
-                elif line.startswith('---') or line == '=' * len(line):
-                    if current_paragraph:
-                        doc.add_paragraph(current_paragraph)
-                        current_paragraph = ""
-                    doc.add_paragraph('─' * 60)
-                
-                elif 'COMPLETED' in line.upper() and '===' in line:
-                    if current_paragraph:
-                        doc.add_paragraph(current_paragraph)
-                        current_paragraph = ""
-                    p = doc.add_paragraph(line)
-                    for run in p.runs:
-                        run.bold = True
-                        run.font.color.rgb = RGBColor(0, 128, 0)
-                
-                elif 'Halt for' in line and 'seconds' in line:
-                    continue  # Skip halt markers
-                    
-                else:
-                    if current_paragraph:
-                        current_paragraph += " " + line
-                    else:
-                        current_paragraph = line
-            
-            # Add any remaining paragraph
-            if current_paragraph:
-                if '**' in current_paragraph:
-                    p = doc.add_paragraph()
-                    parts = current_paragraph.split('**')
-                    for i, part in enumerate(parts):
-                        run = p.add_run(part)
-                        if i % 2 == 1:
-                            run.bold = True
-                else:
-                    doc.add_paragraph(current_paragraph)
+            # Week headings sit under the week heading: ## -> level 3, ### -> level 4
+            markdown_ir.render_docx(doc, week['blocks'], heading_offset=1, rule_width=60)
             
             # Add spacing between weeks
             doc.add_paragraph()
@@ -662,60 +337,77 @@ def create_combined_docx(planner_content, deep_content, output_dir):
         print(f"❌ Error creating combined DOCX: {e}")
         return None
 
-def create_combined_pdf_direct(planner_content, deep_content, output_dir):
-    """Create a combined PDF file directly using ReportLab"""
+@functools.lru_cache(maxsize=1)
+def create_pdf_styles():
+    """ParagraphStyles of the combined PDF, built once per process"""
+    styles = getSampleStyleSheet()
     
-    filename = "Complete_Course_Material.pdf"
-    filepath = os.path.join(output_dir, filename)
-    
-    try:
-        # Create PDF document
-        doc = SimpleDocTemplate(
-            filepath,
-            pagesize=A4,
-            rightMargin=1*inch,
-            leftMargin=1*inch,
-            topMargin=1*inch,
-            bottomMargin=1*inch
-        )
-        
-        # Create styles
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
+    return {
+        'title': ParagraphStyle(
             'CustomTitle',
             parent=styles['Heading1'],
             fontSize=20,
             spaceAfter=30,
             alignment=TA_CENTER,
             textColor='blue'
-        )
-        
-        heading1_style = ParagraphStyle(
+        ),
+        'heading1': ParagraphStyle(
             'CustomHeading1',
             parent=styles['Heading1'],
             fontSize=16,
             spaceAfter=20,
             spaceBefore=20,
             textColor='darkblue'
-        )
-        
-        heading2_style = ParagraphStyle(
+        ),
+        'heading2': ParagraphStyle(
             'CustomHeading2',
             parent=styles['Heading2'],
             fontSize=14,
             spaceAfter=15,
             spaceBefore=15,
             textColor='darkblue'
-        )
-        
-        normal_style = ParagraphStyle(
+        ),
+        'normal': ParagraphStyle(
             'CustomNormal',
             parent=styles['Normal'],
             fontSize=11,
             spaceAfter=8,
             alignment=TA_JUSTIFY
+        ),
+        'code': styles['Code'],
+    }
+
+@traced("render.create_combined_pdf_direct", kind="render")
+def create_combined_pdf_direct(planner_content, deep_content, output_dir, course=None):
+    """Create a combined PDF file directly using ReportLab (course: parse_course() result, parsed here if not given)"""
+    if course is None:
+        course = parse_course(planner_content, deep_content)
+    
+    filename = "Complete_Course_Material.pdf"
+    filepath = os.path.join(output_dir, filename)
+    
+    try:
+        # Create PDF document
+        doc = SimpleDocTemplate(
+            filepath,
+            pagesize=A4,
+            rightMargin=1*inch,
+            leftMargin=1*inch,
+            topMargin=1*inch,
+            bottomMargin=1*inch
         )
         
+        styles = create_pdf_styles()
+        title_style = styles['title']
+        heading1_style = styles['heading1']
+        heading2_style = styles['heading2']
+        normal_style = styles['normal']
+        
+        ir_styles = {'normal': normal_style, 'code': styles['code']}
+        # Plan: # and ## headings as section headings, deeper ones as subsections; week headings are all subsections
+        plan_heading_styles = {level: heading1_style if level <= 2 else heading2_style for level in range(1, 7)}
+        week_heading_styles = {level: heading2_style for level in range(1, 7)}
+        
         elements = []
         
         # Add title
@@ -727,28 +419,7 @@ def create_combined_pdf_direct(planner_content, deep_content, output_dir):
             elements.append(Paragraph("Course Plan & Structure", heading1_style))
             elements.append(Spacer(1, 10))
             
-            # Clean and format planner content
-            clean_content = re.sub(r'\*\*(.*?)\*\*', r'<b>\1</b>', planner_content)
-            clean_content = re.sub(r'\*(.*?)\*', r'<i>\1</i>', clean_content)
-            
-            paragraphs = clean_content.split('\n\n')
-            for para in paragraphs:
-                para = para.strip()
-                if para:
-                    if para.startswith('###'):
-                        elements.append(Paragraph(para.replace('###', '').strip(), heading2_style))
-                    elif para.startswith('##'):
-                        elements.append(Paragraph(para.replace('##', '').strip(), heading1_style))
-                    else:
-                        # Clean up any remaining markdown
-                        para = re.sub(r'^\*\s+', '', para, flags=re.MULTILINE)
-                        try:
-                            elements.append(Paragraph(para, normal_style))
-                        except:
-                            # If formatting fails, use plain text
-                            clean_para = re.sub(r'<[^>]+>', '', para)
-                            elements.append(Paragraph(clean_para, normal_style))
-                    elements.append(Spacer(1, 6))
+            elements.extend(markdown_ir.render_flowables(course['plan'], ir_styles, plan_heading_styles))
             
             elements.append(PageBreak())
         
@@ -757,69 +428,11 @@ def create_combined_pdf_direct(planner_content, deep_content, output_dir):
             elements.append(Paragraph("Detailed Course Content", heading1_style))
             elements.append(Spacer(1, 10))
             
-            weeks = parse_weeks_from_content(deep_content)
-            
-            for week in weeks:
+            for week in course['weeks']:
                 # Add week heading
                 elements.append(Paragraph(f"Week {week['number']}: Detailed Content", heading1_style))
                 elements.append(Spacer(1, 10))
-                
-                # Process week content
-                content = week['content']
-                # Clean up markdown formatting
-                content = re.sub(r'\*\*(.*?)\*\*', r'<b>\1</b>', content)
-                content = re.sub(r'\*(.*?)\*', r'<i>\1</i>', content)
-                
-                # Split into sections by headings
-                sections = re.split(r'\n## ', content)
-                
-                for section in sections:
-                    section = section.strip()
-                    if not section:
-                        continue
-                    
-                    lines = section.split('\n')
-                    if lines:
-                        # First line might be a heading
-                        first_line = lines[0].strip()
-                        if first_line and ('🔗' in first_line or '🔍' in first_line or '💡' in first_line or '📚' in first_line or '🌟' in first_line or '📖' in first_line or '🚀' in first_line):
-                            elements.append(Paragraph(first_line, heading2_style))
-                            content_lines = lines[1:]
-                        else:
-                            content_lines = lines
-                        
-                        # Process content
-                        paragraph_text = []
-                        for line in content_lines:
-                            line = line.strip()
-                            if line and not line.startswith('===') and 'Halt for' not in line:
-                                # Handle bullet points
-                                if line.startswith('- ') or line.startswith('* '):
-                                    if paragraph_text:
-                                        try:
-                                            elements.append(Paragraph(' '.join(paragraph_text), normal_style))
-                                        except:
-                                            clean_text = re.sub(r'<[^>]+>', '', ' '.join(paragraph_text))
-                                            elements.append(Paragraph(clean_text, normal_style))
-                                        paragraph_text = []
-                                    
-                                    bullet_text = line.replace('- ', '').replace('* ', '')
-                                    try:
-                                        elements.append(Paragraph(f"• {bullet_text}", normal_style))
-                                    except:
-                                        clean_bullet = re.sub(r'<[^>]+>', '', bullet_text)
-                                        elements.append(Paragraph(f"• {clean_bullet}", normal_style))
-                                else:
-                                    paragraph_text.append(line)
-                        
-                        if paragraph_text:
-                            try:
-                                elements.append(Paragraph(' '.join(paragraph_text), normal_style))
-                            except:
-                                clean_text = re.sub(r'<[^>]+>', '', ' '.join(paragraph_text))
-                                elements.append(Paragraph(clean_text, normal_style))
-                    
-                    elements.append(Spacer(1, 10))
+                elements.extend(markdown_ir.render_flowables(week['blocks'], ir_styles, week_heading_styles))
                 
                 # Add separator between weeks
                 elements.append(Spacer(1, 20))
@@ -839,9 +452,9 @@ def create_course_material_combined():
     print("📚 Starting Combined Course Material Creation...")
     print("=" * 60)
     
-    # Read content from text files
+    # Read content from text files (the deep content is parsed from its file, a week at a time)
     print("🔍 Reading course content files...")
-    planner_content, deep_content = read_course_content_files()
+    planner_content, deep_content = read_course_content_files(deep_as_path=True)
     
     if not planner_content and not deep_content:
         print("❌ No course content found. Please ensure text files exist.")
@@ -854,15 +467,18 @@ def create_course_material_combined():
     
     created_files = []
     
+    # Parse once, render to both formats
+    course = parse_course(planner_content, deep_content)
+    
     # Create combined DOCX
     print(f"\n📄 Creating combined DOCX file...")
-    docx_path = create_combined_docx(planner_content, deep_content, output_dir)
+    docx_path = create_combined_docx(planner_content, deep_content, output_dir, course=course)
     if docx_path:
         created_files.append(docx_path)
     
     # Create combined PDF
     print(f"\n📄 Creating combined PDF file...")
-    pdf_path = create_combined_pdf_direct(planner_content, deep_content, output_dir)
+    pdf_path = create_combined_pdf_direct(planner_content, deep_content, output_dir, course=course)
     if pdf_path:
         created_files.append(pdf_path)
     
@@ -0,0 +1,353 @@
+"""
+Record/replay Gemini clients for deterministic, network-free pipeline runs
+
+COPILOT_GENAI_MODE selects the backend used by llm.create_client() and the
+ADK runners in copilot/main.py and copilot/deep_main.py:
+
+    live    (default) real Gemini client and ADK Runner
+    record  real calls, every response and runner event saved as a fixture
+    replay  fixtures served back through the same interfaces, no network
+
+Fixtures live in COPILOT_FIXTURES_DIR (default Inputs and Outputs/.fixtures)
+and are keyed by the same request hash as the response cache, so any change
+to a prompt, model, schema or input file is a fixture miss.
+
+COPILOT_REPLAY_LATENCY shapes replay timing:
+
+    recorded[:SCALE]        the recorded latencies, optionally scaled (default)
+    none                    no delay
+    fixed:SECONDS           constant delay per call
+    uniform:LOW,HIGH        uniformly distributed delay per call
+    lognormal:MEDIAN,SIGMA  log-normally distributed delay per call
+
+COPILOT_REPLAY_SEED makes the synthetic distributions reproducible.
+"""
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import time
+from pathlib import Path
+
+from google.genai import types
+
+from response_cache import make_cache_key
+from retrieval import estimate_tokens
+
+DEFAULT_FIXTURES_DIR = os.path.join("Inputs and Outputs", ".fixtures")
+MODES = ("live", "record", "replay")
+
+
+class FixtureNotFoundError(LookupError):
+    """A replayed request has no recorded fixture"""
+
+
+def genai_mode():
+    mode = os.getenv("COPILOT_GENAI_MODE", "live").lower()
+    if mode not in MODES:
+        raise ValueError(f"COPILOT_GENAI_MODE must be one of {', '.join(MODES)}, got {mode!r}")
+    return mode
+
+
+def fixtures_dir():
+    return Path(os.getenv("COPILOT_FIXTURES_DIR", DEFAULT_FIXTURES_DIR))
+
+
+def parse_latency(spec=None):
+    """Return a function mapping a recorded latency (seconds) to the latency to simulate"""
+    spec = (spec if spec is not None else os.getenv("COPILOT_REPLAY_LATENCY", "recorded")).strip().lower()
+    name, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v.strip()]
+    rng = random.Random(os.getenv("COPILOT_REPLAY_SEED"))
+
+    if name in ("none", "0", ""):
+        return lambda recorded: 0.0
+    if name == "recorded":
+        scale = values[0] if values else 1.0
+        return lambda recorded: max(0.0, (recorded or 0.0) * scale)
+    if name == "fixed" and len(values) == 1:
+        return lambda recorded: values[0]
+    if name == "uniform" and len(values) == 2:
+        return lambda recorded: rng.uniform(values[0], values[1])
+    if name == "lognormal" and len(values) == 2:
+        return lambda recorded: rng.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Invalid COPILOT_REPLAY_LATENCY: {spec!r}")
+
+
+def _fixture_path(kind, key):
+    return fixtures_dir() / kind / f"{key}.json"
+
+
+def _save_fixture(kind, key, data):
+    path = _fixture_path(kind, key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(data), encoding="utf-8")
+    os.replace(tmp_path, path)
+    print(f"📼 Recorded {kind} fixture {key[:12]}")
+
+
+def _load_fixture(kind, key):
+    path = _fixture_path(kind, key)
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        raise FixtureNotFoundError(
+            f"No {kind} fixture {key[:12]} in {fixtures_dir()}; record one with COPILOT_GENAI_MODE=record"
+        ) from None
+
+
+def _dump(obj):
+    return obj.model_dump(mode="json", exclude_none=True)
+
+
+def _request_key(model, contents, config=None):
+    if not isinstance(contents, (list, tuple)):
+        contents = [contents]
+    return make_cache_key(model, contents, config)
+
+
+# --- generate_content -----------------------------------------------------
+
+
+class _RecordingModels:
+    def __init__(self, models):
+        self._models = models
+
+    def __getattr__(self, name):
+        return getattr(self._models, name)
+
+    def generate_content(self, *, model, contents, config=None, **kwargs):
+        start = time.perf_counter()
+        response = self._models.generate_content(model=model, contents=contents, config=config, **kwargs)
+        _save_fixture("generate_content", _request_key(model, contents, config), {
+            "model": model, "latency": time.perf_counter() - start, "response": _dump(response),
+        })
+        return response
+
+    def generate_content_stream(self, *, model, contents, config=None, **kwargs):
+        start = time.perf_counter()
+        chunks = []
+        for chunk in self._models.generate_content_stream(model=model, contents=contents, config=config, **kwargs):
+            chunks.append({"offset": time.perf_counter() - start, "chunk": _dump(chunk)})
+            yield chunk
+        _save_fixture("generate_content_stream", _request_key(model, contents, config), {
+            "model": model, "latency": time.perf_counter() - start, "chunks": chunks,
+        })
+
+    def count_tokens(self, *, model, contents, **kwargs):
+        response = self._models.count_tokens(model=model, contents=contents, **kwargs)
+        _save_fixture("count_tokens", _request_key(model, contents), {"model": model, "response": _dump(response)})
+        return response
+
+
+class _RecordingAsyncModels:
+    def __init__(self, models):
+        self._models = models
+
+    def __getattr__(self, name):
+        return getattr(self._models, name)
+
+    async def generate_content(self, *, model, contents, config=None, **kwargs):
+        start = time.perf_counter()
+        response = await self._models.generate_content(model=model, contents=contents, config=config, **kwargs)
+        _save_fixture("generate_content", _request_key(model, contents, config), {
+            "model": model, "latency": time.perf_counter() - start, "response": _dump(response),
+        })
+        return response
+
+
+class _Namespace:
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
+
+
+class RecordingClient:
+    """Wraps a real genai.Client and saves every response as a replay fixture"""
+
+    def __init__(self, client):
+        self._client = client
+        self.models = _RecordingModels(client.models)
+        self.aio = _Namespace(models=_RecordingAsyncModels(client.aio.models))
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+class _ReplayModels:
+    def __init__(self, latency):
+        self._latency = latency
+
+    def generate_content(self, *, model, contents, config=None, **kwargs):
+        fixture = _load_fixture("generate_content", _request_key(model, contents, config))
+        time.sleep(self._latency(fixture.get("latency")))
+        return types.GenerateContentResponse.model_validate(fixture["response"])
+
+    def generate_content_stream(self, *, model, contents, config=None, **kwargs):
+        fixture = _load_fixture("generate_content_stream", _request_key(model, contents, config))
+        # The sampled latency delays the first chunk; later chunks keep their recorded spacing
+        first_offset = fixture["chunks"][0]["offset"] if fixture["chunks"] else 0.0
+        previous = None
+        for entry in fixture["chunks"]:
+            if previous is None:
+                time.sleep(self._latency(first_offset))
+            else:
+                time.sleep(max(0.0, self._latency(entry["offset"] - previous)))
+            previous = entry["offset"]
+            yield types.GenerateContentResponse.model_validate(entry["chunk"])
+
+    def count_tokens(self, *, model, contents, **kwargs):
+        try:
+            fixture = _load_fixture("count_tokens", _request_key(model, contents))
+            return types.CountTokensResponse.model_validate(fixture["response"])
+        except FixtureNotFoundError:
+            texts = contents if isinstance(contents, (list, tuple)) else [contents]
+            return types.CountTokensResponse(total_tokens=sum(estimate_tokens(t) for t in texts if isinstance(t, str)))
+
+
+class _ReplayAsyncModels:
+    def __init__(self, latency):
+        self._latency = latency
+
+    async def generate_content(self, *, model, contents, config=None, **kwargs):
+        fixture = _load_fixture("generate_content", _request_key(model, contents, config))
+        await asyncio.sleep(self._latency(fixture.get("latency")))
+        return types.GenerateContentResponse.model_validate(fixture["response"])
+
+
+class ReplayClient:
+    """Serves recorded fixtures through the genai.Client interfaces the pipeline uses"""
+
+    def __init__(self, latency=None):
+        latency = latency or parse_latency()
+        self.models = _ReplayModels(latency)
+        self.aio = _Namespace(models=_ReplayAsyncModels(latency))
+
+
+def wrap_client(make_live_client):
+    """Return the client for the current COPILOT_GENAI_MODE"""
+    mode = genai_mode()
+    if mode == "replay":
+        print(f"📼 Replaying Gemini responses from {fixtures_dir()}")
+        return ReplayClient()
+    if mode == "record":
+        print(f"📼 Recording Gemini responses to {fixtures_dir()}")
+        return RecordingClient(make_live_client())
+    return make_live_client()
+
+
+# --- ADK runner -----------------------------------------------------------
+
+
+def _agent_tree(agent):
+    yield agent
+    for sub_agent in getattr(agent, "sub_agents", None) or []:
+        yield from _agent_tree(sub_agent)
+
+
+def agent_digest(app_name, agent):
+    """SHA-256 over the app name and the agent tree's names and instructions"""
+    digest = hashlib.sha256(f"app={app_name}\0".encode("utf-8"))
+    for node in _agent_tree(agent):
+        digest.update(f"agent={node.name}\0".encode("utf-8"))
+        instruction = getattr(node, "instruction", None)
+        if isinstance(instruction, str):
+            digest.update(instruction.encode("utf-8"))
+        digest.update(b"\0")
+    return digest
+
+
+def _runner_key(app_name, agent, new_message):
+    """Key a runner invocation by app, the agent tree (names and instructions) and the user message"""
+    digest = agent_digest(app_name, agent)
+    if new_message is not None:
+        digest.update(new_message.model_dump_json(exclude_none=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class RecordingRunner:
+    """Wraps an ADK Runner and saves the events of each run as a replay fixture"""
+
+    def __init__(self, runner, agent, app_name):
+        self._runner = runner
+        self._agent = agent
+        self._app_name = app_name
+
+    def __getattr__(self, name):
+        return getattr(self._runner, name)
+
+    async def run_async(self, *, user_id, session_id, new_message=None, **kwargs):
+        events = []
+        previous = time.perf_counter()
+        async for event in self._runner.run_async(user_id=user_id, session_id=session_id, new_message=new_message, **kwargs):
+            now = time.perf_counter()
+            events.append({"gap": now - previous, "event": event.model_dump(mode="json", exclude_none=True)})
+            previous = now
+            yield event
+        _save_fixture("adk_run", _runner_key(self._app_name, self._agent, new_message), {
+            "app_name": self._app_name, "agent": self._agent.name, "events": events,
+        })
+
+
+class ReplayRunner:
+    """
+    Replays recorded ADK events without calling the model
+
+    Events are appended to the session so state written through output_key
+    (course_plan, deep_content) is available afterwards, and plain-function
+    tool calls are re-executed so their file side effects are reproduced.
+    """
+
+    def __init__(self, agent, app_name, session_service, latency=None):
+        self.agent = agent
+        self.app_name = app_name
+        self.session_service = session_service
+        self._latency = latency or parse_latency()
+        self._tools = {}
+        for node in _agent_tree(agent):
+            for tool in getattr(node, "tools", None) or []:
+                func = getattr(tool, "func", tool)
+                if callable(func):
+                    self._tools[getattr(tool, "name", None) or func.__name__] = func
+
+    def _run_tools(self, event):
+        content = getattr(event, "content", None)
+        for part in (getattr(content, "parts", None) or []):
+            call = getattr(part, "function_call", None)
+            if call is None or call.name not in self._tools:
+                continue
+            try:
+                self._tools[call.name](**(call.args or {}))
+            except Exception as e:
+                print(f"⚠️ Replayed tool {call.name} failed: {e}")
+
+    async def run_async(self, *, user_id, session_id, new_message=None, **kwargs):
+        from google.adk.events import Event
+
+        fixture = _load_fixture("adk_run", _runner_key(self.app_name, self.agent, new_message))
+        session = await self.session_service.get_session(app_name=self.app_name, user_id=user_id, session_id=session_id)
+        for entry in fixture["events"]:
+            event = Event.model_validate(entry["event"])
+            # Synthetic distributions apply per model response; other events keep their recorded gap
+            delay = self._latency(entry["gap"]) if event.usage_metadata is not None else min(entry["gap"], 0.01)
+            await asyncio.sleep(delay)
+            if session is not None and not event.partial:
+                await self.session_service.append_event(session, event)
+            self._run_tools(event)
+            yield event
+
+
+def create_runner(agent, app_name, session_service):
+    """Return the ADK runner for the current COPILOT_GENAI_MODE"""
+    mode = genai_mode()
+    if mode == "replay":
+        return ReplayRunner(agent, app_name, session_service)
+
+    from google.adk.runners import Runner
+
+    runner = Runner(agent=agent, app_name=app_name, session_service=session_service)
+    if mode == "record":
+        return RecordingRunner(runner, agent, app_name)
+    return runner
@@ -1,3 +1,5 @@
+import asyncio
+import functools
 import os
 import pathlib
 import re
@@ -5,7 +7,10 @@ from PIL import Image, ImageDraw, ImageFont
 from google import genai
 from google.genai import types
 from dotenv import load_dotenv
-from llm import generate_course_content, load_user_inputs
+from llm import create_client, generate_course_content, generate_course_content_async, load_user_inputs
+from response_cache import get_default_cache
+from retrieval import CourseIndex, build_retrieved_content
+from tracing import traced
 import json
 import textwrap
 
@@ -30,7 +35,8 @@ def read_course_content_files():
     else:
         print(f"⚠️ Planner file not found: {planner_file}")
     
-    # Read from copilot folder "Inputs and Outputs"
+    # Read from copilot folder "Inputs and Outputs" (agents launched from copilot/ by start.bat),
+    # falling back to the project "Inputs and Outputs" (agents run in-process by pipeline.py)
     copilot_dir_path = pathlib.Path("copilot/Inputs and Outputs")
     
     # Try to read deep course content output
@@ -38,6 +44,8 @@ def read_course_content_files():
     if not deep_file.exists():
         # Try alternative filename
         deep_file = copilot_dir_path / "deep_agent_output.txt"
+    if not deep_file.exists():
+        deep_file = home_dir_path / "deep_agent_output.txt"
     
     if deep_file.exists():
         try:
@@ -202,10 +210,7 @@ Then provide your comprehensive analysis followed by the complete JSON array of
 
     return system_prompt
 
-def generate_flashcard_content(client, google_search_tool, system_prompt, combined_content, user_config):
-    """Generate flashcard content using LLM"""
-    
-    task = """
+FLASHCARD_TASK = """
 GENERATE FLASHCARD CONTENT:
 
 Create 15-20 high-quality flashcards covering all weeks of the course content.
@@ -214,6 +219,46 @@ Ensure proper distribution across all weeks and topics.
 
 Output the result as a valid JSON array of flashcard objects.
 """
+
+# Retrieval query used to pick the course chunks most useful for flashcards
+FLASHCARD_QUERY = "definition key concept term algorithm example application comparison difference steps process advantages disadvantages"
+
+def parse_flashcard_response(response):
+    """Extract the JSON array of flashcards from an LLM response"""
+    if not response or not hasattr(response, 'text') or not response.text:
+        print("❌ No response received from LLM")
+        return None
+    
+    # Extract JSON from the response
+    response_text = response.text
+    print(f"✅ Received response ({len(response_text)} characters)")
+    
+    # Try to find JSON array in the response
+    json_match = re.search(r'\[.*\]', response_text, re.DOTALL)
+    if json_match:
+        json_str = json_match.group(0)
+        try:
+            flashcards = json.loads(json_str)
+            print(f"✅ Successfully parsed {len(flashcards)} flashcards")
+            return flashcards
+        except json.JSONDecodeError as e:
+            print(f"❌ JSON parsing error: {e}")
+            # Try to clean up the JSON
+            json_str = json_str.replace('// ... continue for all flashcards', '')
+            json_str = re.sub(r'//.*?\n', '', json_str)  # Remove comments
+            try:
+                flashcards = json.loads(json_str)
+                print(f"✅ Successfully parsed {len(flashcards)} flashcards after cleanup")
+                return flashcards
+            except json.JSONDecodeError:
+                print("❌ Could not parse JSON even after cleanup")
+                return None
+    else:
+        print("❌ No JSON array found in response")
+        return None
+
+def generate_flashcard_content(client, google_search_tool, system_prompt, combined_content, user_config):
+    """Generate flashcard content using LLM"""
     
     print("🔄 Generating flashcard content...")
     
@@ -226,40 +271,33 @@ Output the result as a valid JSON array of flashcard objects.
             google_search_tool=google_search_tool,
             system_prompt=system_prompt,
             course_content=combined_content,
-            task=task
+            stage="flashcards",
+            task=FLASHCARD_TASK
         )
+        return parse_flashcard_response(response)
         
-        if not response or not hasattr(response, 'text') or not response.text:
-            print("❌ No response received from LLM")
-            return None
-        
-        # Extract JSON from the response
-        response_text = response.text
-        print(f"✅ Received response ({len(response_text)} characters)")
-        
-        # Try to find JSON array in the response
-        json_match = re.search(r'\[.*\]', response_text, re.DOTALL)
-        if json_match:
-            json_str = json_match.group(0)
-            try:
-                flashcards = json.loads(json_str)
-                print(f"✅ Successfully parsed {len(flashcards)} flashcards")
-                return flashcards
-            except json.JSONDecodeError as e:
-                print(f"❌ JSON parsing error: {e}")
-                # Try to clean up the JSON
-                json_str = json_str.replace('// ... continue for all flashcards', '')
-                json_str = re.sub(r'//.*?\n', '', json_str)  # Remove comments
-                try:
-                    flashcards = json.loads(json_str)
-                    print(f"✅ Successfully parsed {len(flashcards)} flashcards after cleanup")
-                    return flashcards
-                except json.JSONDecodeError:
-                    print("❌ Could not parse JSON even after cleanup")
-                    return None
-        else:
-            print("❌ No JSON array found in response")
-            return None
+    except Exception as e:
+        print(f"❌ Error generating flashcards: {e}")
+        return None
+
+async def generate_flashcard_content_async(client, google_search_tool, system_prompt, combined_content, user_config):
+    """Async counterpart of generate_flashcard_content"""
+    
+    print("🔄 Generating flashcard content...")
+    
+    try:
+        response = await generate_course_content_async(
+            client=client,
+            teaching_style=user_config.get('teaching_style', 'Project-Based / Hands-On'),
+            duration=user_config.get('duration', '6 weeks'),
+            difficulty_level=user_config.get('difficulty_level', 'intermediate'),
+            google_search_tool=google_search_tool,
+            system_prompt=system_prompt,
+            course_content=combined_content,
+            stage="flashcards",
+            task=FLASHCARD_TASK
+        )
+        return parse_flashcard_response(response)
         
     except Exception as e:
         print(f"❌ Error generating flashcards: {e}")
@@ -282,6 +320,24 @@ def get_font_path():
     
     return None  # Use default font
 
+@functools.lru_cache(maxsize=1)
+def load_fonts():
+    """Load the flashcard fonts once per process (title, subtitle, main, meta)"""
+    font_path = get_font_path()
+    try:
+        title_font = ImageFont.truetype(font_path, 32) if font_path else ImageFont.load_default()
+        subtitle_font = ImageFont.truetype(font_path, 24) if font_path else ImageFont.load_default()
+        main_font = ImageFont.truetype(font_path, 28) if font_path else ImageFont.load_default()
+        meta_font = ImageFont.truetype(font_path, 20) if font_path else ImageFont.load_default()
+    except:
+        # Fallback to default font
+        title_font = ImageFont.load_default()
+        subtitle_font = ImageFont.load_default()
+        main_font = ImageFont.load_default()
+        meta_font = ImageFont.load_default()
+    return title_font, subtitle_font, main_font, meta_font
+
+@traced("render.create_flashcard_image", kind="render")
 def create_flashcard_image(flashcard_data, output_dir, card_number):
     """Create a visual flashcard image"""
     
@@ -299,19 +355,7 @@ def create_flashcard_image(flashcard_data, output_dir, card_number):
     back_img = Image.new('RGB', (width, height), background_color)
     back_draw = ImageDraw.Draw(back_img)
     
-    # Try to load fonts
-    font_path = get_font_path()
-    try:
-        title_font = ImageFont.truetype(font_path, 32) if font_path else ImageFont.load_default()
-        subtitle_font = ImageFont.truetype(font_path, 24) if font_path else ImageFont.load_default()
-        main_font = ImageFont.truetype(font_path, 28) if font_path else ImageFont.load_default()
-        meta_font = ImageFont.truetype(font_path, 20) if font_path else ImageFont.load_default()
-    except:
-        # Fallback to default font
-        title_font = ImageFont.load_default()
-        subtitle_font = ImageFont.load_default()
-        main_font = ImageFont.load_default()
-        meta_font = ImageFont.load_default()
+    title_font, subtitle_font, main_font, meta_font = load_fonts()
     
     # FRONT SIDE - Question
     # Header
@@ -398,6 +442,7 @@ def create_flashcard_image(flashcard_data, output_dir, card_number):
         print(f"❌ Error saving flashcard {card_number}: {e}")
         return None, None
 
+@traced("render.create_flashcard_summary", kind="render")
 def create_flashcard_summary(flashcards, output_dir):
     """Create a summary document of all flashcards"""
     
@@ -451,14 +496,33 @@ def create_flashcard_summary(flashcards, output_dir):
         print(f"❌ Error creating summary: {e}")
         return None
 
+def render_flashcards(flashcards, output_dir):
+    """Draw every flashcard and write the summary; returns the created file paths"""
+    created_files = []
+    for i, flashcard in enumerate(flashcards, 1):
+        front_path, back_path = create_flashcard_image(flashcard, output_dir, i)
+        if front_path and back_path:
+            created_files.extend([front_path, back_path])
+    
+    # Create summary
+    summary_path = create_flashcard_summary(flashcards, output_dir)
+    if summary_path:
+        created_files.append(summary_path)
+    return created_files
+
 def generate_flashcards():
     """Main function to generate flashcards"""
+    return asyncio.run(generate_flashcards_async())
+
+async def generate_flashcards_async(client=None, user_config=None):
+    """Generate flashcards using the async LLM API so other stages can run alongside"""
     
     print("📚 Starting Flashcard Generation Process...")
     print("=" * 60)
     
     # Load user configuration
-    user_config = load_user_inputs()
+    if user_config is None:
+        user_config = load_user_inputs()
     if not user_config:
         print("❌ No user configuration found. Please run the main application first.")
         return
@@ -474,19 +538,16 @@ def generate_flashcards():
         print("❌ No course content found. Please ensure content files exist.")
         return
     
-    # Create combined content
-    combined_content = f"""
-=== COURSE PLAN CONTENT ===
-{planner_content}
-
-=== DETAILED COURSE CONTENT ===
-{deep_content}
-"""
+    # Send only the chunks most useful for flashcards, covering every week
+    index = CourseIndex.from_texts(planner_content, deep_content)
+    print(f"✅ Indexed {len(index.chunks)} content chunks (~{index.total_tokens} tokens)")
+    combined_content = build_retrieved_content(index, planner_content, deep_content, FLASHCARD_QUERY)
     
     print(f"✅ Combined content length: {len(combined_content)} characters")
     
-    # Initialize LLM client
-    client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+    # Initialize LLM client (reuse the caller's client when running inside the pipeline)
+    if client is None:
+        client = create_client()
     
     # Configure Google Search tool
     google_search_tool = genai.types.Tool(
@@ -498,7 +559,7 @@ def generate_flashcards():
     
     # Generate flashcard content
     print("\n🧠 Generating flashcard content with AI...")
-    flashcards = generate_flashcard_content(
+    flashcards = await generate_flashcard_content_async(
         client=client,
         google_search_tool=google_search_tool,
         system_prompt=system_prompt,
@@ -524,19 +585,9 @@ def generate_flashcards():
     os.makedirs(output_dir, exist_ok=True)
     print(f"📁 Created flashcards output directory: {output_dir}")
     
-    # Generate flashcard images
+    # Generate flashcard images (PIL rendering and file writes, off the event loop shared with the other stages)
     print(f"\n🎨 Creating flashcard images...")
-    created_files = []
-    
-    for i, flashcard in enumerate(flashcards, 1):
-        front_path, back_path = create_flashcard_image(flashcard, output_dir, i)
-        if front_path and back_path:
-            created_files.extend([front_path, back_path])
-    
-    # Create summary
-    summary_path = create_flashcard_summary(flashcards, output_dir)
-    if summary_path:
-        created_files.append(summary_path)
+    created_files = await asyncio.to_thread(render_flashcards, flashcards, output_dir)
     
     # Final summary
     print(f"\n{'=' * 60}")
@@ -587,6 +638,9 @@ def main():
             print(f"\n📁 Check the 'Inputs and Outputs/flashcards' folder for all generated files!")
         else:
             print("\n❌ Flashcard generation failed.")
+
+        cache_stats = get_default_cache().stats()
+        print(f"💾 Response cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
             
     except Exception as e:
         print(f"❌ An error occurred: {e}")
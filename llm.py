@@ -1,12 +1,27 @@
+import argparse
+import asyncio
 from google import genai
 from dotenv import load_dotenv
 import os
 import pathlib
 from google.genai import types
 import json
+import time
+from fake_genai import genai_mode, wrap_client
+from prompt_budget import compact_course_content
+from rate_limit import DEFAULT_MAX_RETRIES, backoff_delay, call_with_retry, call_with_retry_async, get_default_limiter, is_retryable
+from response_cache import cache_mode, get_default_cache, make_cache_key
+from retrieval import estimate_tokens
+from tracing import record_response, retry_counter, span
 
 load_dotenv()
 
+PLANNER_MODEL = 'gemini-2.5-flash'
+CURRICULUM_PATH = pathlib.Path(os.getenv("COPILOT_CURRICULUM_PATH") or "Inputs and Outputs/curriculum.pdf")
+PLANNER_OUTPUT_PATH = "Inputs and Outputs/planner_agent_instruction.txt"
+DEFAULT_MAX_CONCURRENCY = 3
+EXPECTED_OUTPUT_TOKENS = 8000
+
 def load_user_inputs():
     """Load user inputs from file if exists"""
     config_file = "user_config.json"
@@ -36,27 +51,22 @@ def save_user_inputs(user_name, user_id, difficulty_level, duration, teaching_st
         pass
 
 
-# Try to load existing user inputs
-saved_inputs = load_user_inputs()
+def prompt_user_inputs():
+    """Load saved user inputs, or interactively ask for them on first run"""
+    saved_inputs = load_user_inputs()
 
+    if saved_inputs:
+        print("Using saved user configuration:")
+        print(f"User Name: {saved_inputs['user_name']}")
+        print(f"User ID: {saved_inputs['user_id']}")
+        print(f"Difficulty Level: {saved_inputs['difficulty_level']}")
+        print(f"Duration: {saved_inputs['duration']}")
+        print(f"Teaching Style: {saved_inputs['teaching_style']}")
+        print("Using existing configuration.")
+        return saved_inputs
 
-if saved_inputs:
-    print("Using saved user configuration:")
-    print(f"User Name: {saved_inputs['user_name']}")
-    print(f"User ID: {saved_inputs['user_id']}")
-    print(f"Difficulty Level: {saved_inputs['difficulty_level']}")
-    print(f"Duration: {saved_inputs['duration']}")
-    print(f"Teaching Style: {saved_inputs['teaching_style']}")
-    
-    user_name = saved_inputs['user_name']
-    user_id = saved_inputs['user_id']
-    difficulty_level = saved_inputs['difficulty_level']
-    duration = saved_inputs['duration']
-    teaching_style = saved_inputs['teaching_style']
-    print("Using existing configuration.")
-else:
     print("First time setup - please provide your details:")
-    
+
     while True:
         user_name = input("Give a user name: ")
         if user_name.strip() == "":
@@ -89,20 +99,31 @@ else:
     teaching_style = input("Enter preferred teaching style (e.g., Exploratory & Guided, Project-Based / Hands-On, Conceptual & Conversational): ")
     if teaching_style.lower() == "none":
         teaching_style = "Exploratory & Guided"  # Default to Exploratory & Guided if none specified
-    
+
     # Save inputs for future runs
     save_user_inputs(user_name, user_id, difficulty_level, duration, teaching_style)
     print("Configuration saved for future runs.")
 
+    return {
+        "user_name": user_name,
+        "user_id": user_id,
+        "difficulty_level": difficulty_level,
+        "duration": duration,
+        "teaching_style": teaching_style
+    }
+
+
+def create_client():
+    """Create the Gemini client from GEMINI_API_KEY (recorded or replayed per COPILOT_GENAI_MODE)"""
+    return wrap_client(lambda: genai.Client(api_key=os.getenv("GEMINI_API_KEY")))
 
-print("Thank you for providing the inputs. Processing your request...")
 
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+def create_google_search_tool():
+    """Configure Google Search as a tool for grounding"""
+    return genai.types.Tool(
+        google_search=genai.types.GoogleSearch()
+    )
 
-# Configure Google Search as a tool for grounding
-google_search_tool = genai.types.Tool(
-    google_search=genai.types.GoogleSearch()
-)
 
 system_prompt = """You are a course design assistant.
 
@@ -200,24 +221,8 @@ Create a **cohesive, learner-aligned course plan** that:
 
 Respond only after carefully analyzing all inputs and formatting the final course plan in structured Markdown."""
 
-def generate_course_content(client, teaching_style, duration, difficulty_level, google_search_tool, system_prompt, filepath=None, course_content=None, task=None):
-    """
-    Generate course content using the LLM
-    
-    Args:
-        client: The Gemini client instance
-        teaching_style: Teaching style preference
-        duration: Course duration
-        difficulty_level: Difficulty level
-        google_search_tool: Google search tool for the LLM
-        system_prompt: System instruction for the LLM
-        filepath: Optional path to PDF file to include
-        course_content: Optional text content to include (for quiz generation, etc.)
-        task: Optional specific task description
-        
-    Returns:
-        Generated response from the LLM
-    """
+def build_contents(teaching_style, duration, difficulty_level, filepath=None, course_content=None, task=None):
+    """Build the contents list sent to the LLM for a generation request"""
     # Build contents list - start with basic inputs
     contents = [teaching_style, duration, difficulty_level]
     
@@ -235,33 +240,292 @@ def generate_course_content(client, teaching_style, duration, difficulty_level,
             data=filepath.read_bytes(),
             mime_type='application/pdf',
         ))
-    
-    response = client.models.generate_content(
-        model='gemini-2.5-flash',
-        contents=contents,
-        config=genai.types.GenerateContentConfig(
-            tools=[google_search_tool],
+    return contents
+
+
+def build_generate_config(google_search_tool, system_prompt, response_schema=None):
+    """Build the GenerateContentConfig shared by every generation request"""
+    if response_schema is not None:
+        # Controlled JSON output cannot be combined with search grounding
+        return genai.types.GenerateContentConfig(
             system_instruction=system_prompt,
-        ),
+            response_mime_type='application/json',
+            response_schema=response_schema,
+        )
+    return genai.types.GenerateContentConfig(
+        tools=[google_search_tool] if google_search_tool else None,
+        system_instruction=system_prompt,
     )
-    return response
 
-try:
-    filepath = pathlib.Path("Inputs and Outputs/curriculum.pdf")
-    response = generate_course_content(client, teaching_style, duration, difficulty_level, google_search_tool, system_prompt, filepath)
 
-    print(response.text)
+def estimate_request_tokens(contents, system_prompt):
+    """Rough token estimate for a request, used to draw from the shared tokens-per-minute quota"""
+    tokens = estimate_tokens(system_prompt or "") + EXPECTED_OUTPUT_TOKENS
+    for part in contents:
+        if isinstance(part, str):
+            tokens += estimate_tokens(part)
+        elif getattr(part, "inline_data", None) is not None:
+            tokens += len(part.inline_data.data or b"") // 200
+    return tokens
+
+
+def _resolve_cache_flags(use_cache, refresh_cache):
+    """Apply the LLM_CACHE environment override to the per-call cache flags"""
+    mode = cache_mode()
+    if mode == "off":
+        use_cache = False
+    elif mode == "refresh":
+        refresh_cache = True
+    if genai_mode() == "record":
+        # A cache hit would never reach the recording client
+        refresh_cache = True
+    return use_cache, refresh_cache
+
+
+def _cache_lookup(contents, config, use_cache, refresh_cache):
+    """Return (cache, key, cached_response) for a request, honouring the bypass flags"""
+    use_cache, refresh_cache = _resolve_cache_flags(use_cache, refresh_cache)
+    if not use_cache:
+        return None, None, None
+    cache = get_default_cache()
+    cache_key = make_cache_key(PLANNER_MODEL, contents, config)
+    if not refresh_cache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            print(f"💾 Cache hit for {PLANNER_MODEL} request ({cache_key[:12]})")
+            return cache, cache_key, cached
+    return cache, cache_key, None
+
+
+def generate_course_content(client, teaching_style, duration, difficulty_level, google_search_tool, system_prompt, filepath=None, course_content=None, task=None, use_cache=True, refresh_cache=False, response_schema=None, stage=None):
+    """
+    Generate course content using the LLM
     
-    # Save the response to a text file for the master agent
-    output_file_path = "Inputs and Outputs/planner_agent_instruction.txt"
-    try:
-        with open(output_file_path, 'w', encoding='utf-8') as f:
-            f.write(response.text)
-        print(f"\nResponse saved to: {output_file_path}")
-    except Exception as e:
-        print(f"Error saving response to file: {e}")
+    Args:
+        client: The Gemini client instance
+        teaching_style: Teaching style preference
+        duration: Course duration
+        difficulty_level: Difficulty level
+        google_search_tool: Google search tool for the LLM
+        system_prompt: System instruction for the LLM
+        filepath: Optional path to PDF file to include
+        course_content: Optional text content to include (for quiz generation, etc.)
+        task: Optional specific task description
+        use_cache: Serve identical requests from the on-disk response cache
+        refresh_cache: Skip the cache lookup but store the fresh response
+        response_schema: Optional schema for JSON output (disables the search tool)
+        stage: Pipeline stage name, selects the token budget course_content is compacted to
+        
+    Returns:
+        Generated response from the LLM
+    """
+    with span("llm.generate_content", kind="llm", stage=stage, model=PLANNER_MODEL) as current:
+        course_content = compact_course_content(client, course_content, stage)
+        contents = build_contents(teaching_style, duration, difficulty_level, filepath, course_content, task)
+        config = build_generate_config(google_search_tool, system_prompt, response_schema)
+
+        cache, cache_key, cached = _cache_lookup(contents, config, use_cache, refresh_cache)
+        if cached is not None:
+            current.set("cached", True)
+            return cached
+
+        response = call_with_retry(
+            lambda: client.models.generate_content(
+                model=PLANNER_MODEL,
+                contents=contents,
+                config=config,
+            ),
+            model=PLANNER_MODEL,
+            tokens=estimate_request_tokens(contents, system_prompt),
+            on_retry=retry_counter(current),
+        )
+        record_response(current, response)
+
+        if cache and response.text:
+            cache.put(cache_key, response, model=PLANNER_MODEL)
+        return response
+
+
+async def generate_course_content_async(client, teaching_style, duration, difficulty_level, google_search_tool, system_prompt, filepath=None, course_content=None, task=None, use_cache=True, refresh_cache=False, response_schema=None, stage=None):
+    """
+    Async counterpart of generate_course_content built on client.aio
 
-    # Optional: Print grounding metadata if available
+    Takes the same arguments and shares the same response cache, so a sync and
+    an async call with identical inputs resolve to the same cache entry.
+    """
+    with span("llm.generate_content", kind="llm", stage=stage, model=PLANNER_MODEL) as current:
+        course_content = await asyncio.to_thread(compact_course_content, client, course_content, stage)
+        contents = build_contents(teaching_style, duration, difficulty_level, filepath, course_content, task)
+        config = build_generate_config(google_search_tool, system_prompt, response_schema)
+
+        cache, cache_key, cached = _cache_lookup(contents, config, use_cache, refresh_cache)
+        if cached is not None:
+            current.set("cached", True)
+            return cached
+
+        response = await call_with_retry_async(
+            lambda: client.aio.models.generate_content(
+                model=PLANNER_MODEL,
+                contents=contents,
+                config=config,
+            ),
+            model=PLANNER_MODEL,
+            tokens=estimate_request_tokens(contents, system_prompt),
+            on_retry=retry_counter(current),
+        )
+        record_response(current, response)
+
+        if cache and response.text:
+            cache.put(cache_key, response, model=PLANNER_MODEL)
+        return response
+
+
+async def run_concurrently(tasks, max_concurrency=None):
+    """
+    Run async tasks with a bounded number in flight
+
+    Args:
+        tasks: Coroutines, or zero-argument callables returning awaitables
+               (callables are only invoked once a concurrency slot is free)
+        max_concurrency: Maximum tasks in flight, defaults to LLM_MAX_CONCURRENCY
+
+    Returns:
+        Results in the same order as tasks. A task that raised is returned as
+        its exception instance so one failure does not cancel the others.
+    """
+    if max_concurrency is None:
+        max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY))
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def _run(task):
+        async with semaphore:
+            return await (task() if callable(task) else task)
+
+    return await asyncio.gather(*(_run(task) for task in tasks), return_exceptions=True)
+
+
+def _usage_total_tokens(response):
+    usage = response.usage_metadata
+    return usage.total_token_count if usage else None
+
+
+def _merge_stream_chunks(chunks, text):
+    """Fold streamed chunks into a single response carrying the full text and final metadata"""
+    usage_metadata = None
+    grounding_metadata = None
+    finish_reason = None
+    for chunk in chunks:
+        if chunk.usage_metadata:
+            usage_metadata = chunk.usage_metadata
+        for candidate in chunk.candidates or []:
+            if candidate.grounding_metadata:
+                grounding_metadata = candidate.grounding_metadata
+            if candidate.finish_reason:
+                finish_reason = candidate.finish_reason
+    return types.GenerateContentResponse(
+        candidates=[types.Candidate(
+            content=types.Content(role='model', parts=[types.Part(text=text)]),
+            grounding_metadata=grounding_metadata,
+            finish_reason=finish_reason,
+        )],
+        usage_metadata=usage_metadata,
+    )
+
+
+def stream_course_content(client, teaching_style, duration, difficulty_level, google_search_tool, system_prompt, filepath=None, course_content=None, task=None, on_chunk=None, use_cache=True, refresh_cache=False, stage=None):
+    """
+    Streaming counterpart of generate_course_content
+
+    Calls on_chunk(text) for every text chunk as it arrives. A cache hit is
+    delivered as a single chunk, and a completed stream is stored in the cache
+    so later non-streaming calls with the same inputs hit it too.
+
+    Returns:
+        (response, metrics) where response is the merged GenerateContentResponse
+        and metrics holds time_to_first_token, total_seconds, output_tokens,
+        tokens_per_second and cached
+    """
+    with span("llm.generate_content_stream", kind="llm", stage=stage, model=PLANNER_MODEL) as current:
+        course_content = compact_course_content(client, course_content, stage)
+        contents = build_contents(teaching_style, duration, difficulty_level, filepath, course_content, task)
+        config = build_generate_config(google_search_tool, system_prompt)
+
+        start = time.perf_counter()
+        cache, cache_key, cached = _cache_lookup(contents, config, use_cache, refresh_cache)
+        if cached is not None:
+            current.set("cached", True)
+            if on_chunk and cached.text:
+                on_chunk(cached.text)
+            elapsed = time.perf_counter() - start
+            return cached, {
+                "time_to_first_token": elapsed,
+                "total_seconds": elapsed,
+                "output_tokens": 0,
+                "tokens_per_second": 0.0,
+                "cached": True,
+            }
+
+        limiter = get_default_limiter()
+        estimated_tokens = estimate_request_tokens(contents, system_prompt)
+        chunks = []
+        text_parts = []
+        first_token_at = None
+        for attempt in range(DEFAULT_MAX_RETRIES + 1):
+            limiter.acquire(PLANNER_MODEL, estimated_tokens)
+            try:
+                for chunk in client.models.generate_content_stream(
+                    model=PLANNER_MODEL,
+                    contents=contents,
+                    config=config,
+                ):
+                    chunks.append(chunk)
+                    chunk_text = chunk.text
+                    if not chunk_text:
+                        continue
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    text_parts.append(chunk_text)
+                    if on_chunk:
+                        on_chunk(chunk_text)
+                break
+            except Exception as e:
+                if not text_parts:
+                    limiter.reconcile(PLANNER_MODEL, estimated_tokens, 0)
+                # Only retry before anything was delivered; a half-written stream cannot be replayed
+                if text_parts or attempt >= DEFAULT_MAX_RETRIES or not is_retryable(e):
+                    raise
+                delay = backoff_delay(attempt, e)
+                if getattr(e, "code", None) == 429:
+                    limiter.cooldown(PLANNER_MODEL, delay)
+                print(f"⏳ Stream request failed ({e}), retry {attempt + 1}/{DEFAULT_MAX_RETRIES} in {delay:.1f}s")
+                current.add("retries")
+                chunks = []
+                time.sleep(delay)
+        finished_at = time.perf_counter()
+
+        response = _merge_stream_chunks(chunks, "".join(text_parts))
+        record_response(current, response)
+        limiter.reconcile(PLANNER_MODEL, estimated_tokens, _usage_total_tokens(response))
+        if cache and response.text:
+            cache.put(cache_key, response, model=PLANNER_MODEL)
+
+        output_tokens = 0
+        if response.usage_metadata and response.usage_metadata.candidates_token_count:
+            output_tokens = response.usage_metadata.candidates_token_count
+        time_to_first_token = (first_token_at or finished_at) - start
+        current.set("time_to_first_token", time_to_first_token)
+        generation_seconds = finished_at - (first_token_at or finished_at)
+        return response, {
+            "time_to_first_token": time_to_first_token,
+            "total_seconds": finished_at - start,
+            "output_tokens": output_tokens,
+            "tokens_per_second": (output_tokens / generation_seconds) if generation_seconds > 0 else 0.0,
+            "cached": False,
+        }
+
+
+def print_grounding_metadata(response):
+    """Print grounding metadata (web search queries and sources) if available"""
     if response.candidates:
         for candidate in response.candidates:
             if candidate.grounding_metadata and candidate.grounding_metadata.web_search_queries:
@@ -272,7 +536,74 @@ try:
                     for chunk in candidate.grounding_metadata.grounding_chunks:
                         if chunk.web:
                             print(f"  - Title: {chunk.web.title}, URL: {chunk.web.uri}")
-except Exception as e:
-    print(f"An error occurred during LLM interaction: {e}")
-else:
-    print("Could not load input data for the LLM.")
\ No newline at end of file
+
+
+def run_planner(client, user_config, filepath=CURRICULUM_PATH, output_file_path=PLANNER_OUTPUT_PATH, stream=True):
+    """Generate the master course plan from the curriculum PDF and save it for the agents"""
+    args = (
+        client,
+        user_config['teaching_style'],
+        user_config['duration'],
+        user_config['difficulty_level'],
+        create_google_search_tool(),
+        system_prompt,
+        filepath,
+    )
+
+    if stream:
+        # Append chunks to the plan file as they arrive so progress is visible
+        # and downstream stages can start tailing it early
+        with open(output_file_path, 'w', encoding='utf-8') as f:
+            def write_chunk(chunk_text):
+                f.write(chunk_text)
+                f.flush()
+                print(chunk_text, end='', flush=True)
+
+            response, metrics = stream_course_content(*args, on_chunk=write_chunk, stage="planner")
+        print(f"\n\nResponse streamed to: {output_file_path}")
+        if metrics['cached']:
+            print("Served from response cache.")
+        else:
+            print(f"Time to first token: {metrics['time_to_first_token']:.2f}s | "
+                  f"Total: {metrics['total_seconds']:.2f}s | "
+                  f"{metrics['output_tokens']} output tokens at {metrics['tokens_per_second']:.1f} tokens/s")
+    else:
+        response = generate_course_content(*args, stage="planner")
+
+        print(response.text)
+
+        # Save the response to a text file for the master agent
+        try:
+            with open(output_file_path, 'w', encoding='utf-8') as f:
+                f.write(response.text)
+            print(f"\nResponse saved to: {output_file_path}")
+        except Exception as e:
+            print(f"Error saving response to file: {e}")
+
+    # Optional: Print grounding metadata if available
+    print_grounding_metadata(response)
+    return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the master course plan from the curriculum PDF")
+    parser.add_argument("--no-stream", action="store_true", help="wait for the full plan instead of streaming it to the file")
+    args = parser.parse_args()
+
+    user_config = prompt_user_inputs()
+
+    print("Thank you for providing the inputs. Processing your request...")
+
+    client = create_client()
+
+    try:
+        run_planner(client, user_config, stream=not args.no_stream)
+    except Exception as e:
+        print(f"An error occurred during LLM interaction: {e}")
+
+    stats = get_default_cache().stats()
+    print(f"Response cache: {stats['hits']} hits, {stats['misses']} misses")
+
+
+if __name__ == "__main__":
+    main()
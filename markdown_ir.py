@@ -0,0 +1,296 @@
+"""
+Course Markdown to a compact intermediate representation, with DOCX and ReportLab renderers
+
+parse() reads the text once into a list of block tuples:
+
+    ("heading", level, text)        # text without inline markup
+    ("paragraph", lines)            # lines: tuple of runs, one per source line
+    ("bullet", runs)
+    ("numbered", number, runs)
+    ("code", lines)                 # raw source lines of a ``` block
+    ("table", rows)                 # rows: tuple of cells, each a tuple of runs
+    ("rule",)
+    ("marker", text)                # === WEEK N COMPLETED === and similar lines
+    ("blank",)
+
+where runs is a tuple of (text, style) pairs and style combines BOLD, ITALIC
+and CODE. "Halt for N seconds" lines are dropped. The same blocks can be
+rendered into a python-docx Document with render_docx() and into ReportLab
+flowables with render_flowables(), so producing several formats from one
+course does not re-parse it.
+"""
+import re
+from xml.sax.saxutils import escape
+
+from docx.shared import RGBColor
+from reportlab.lib import colors
+from reportlab.platypus import Paragraph, Preformatted, Spacer, Table, TableStyle
+
+HEADING = "heading"
+PARAGRAPH = "paragraph"
+BULLET = "bullet"
+NUMBERED = "numbered"
+CODE = "code"
+TABLE = "table"
+RULE = "rule"
+MARKER = "marker"
+BLANK = "blank"
+
+# Inline run styles
+PLAIN, BOLD, ITALIC, CODE_SPAN = 0, 1, 2, 4
+
+HEADING_RE = re.compile(r'(#{1,6})\s+(.*)')
+NUMBERED_RE = re.compile(r'(\d+)\.\s+(.*)')
+INLINE_RE = re.compile(r'\*\*(.+?)\*\*|\*(.+?)\*|`([^`]+)`')
+TABLE_DIVIDER_RE = re.compile(r'^\|?[\s:|-]*-[\s:|-]*$')
+BLANK_BLOCK = (BLANK,)
+RULE_BLOCK = (RULE,)
+
+
+def parse_inline(text):
+    """Split text into (text, style) runs for **bold**, *italic* and `code`"""
+    if '*' not in text and '`' not in text:
+        return ((text, PLAIN),)
+    runs = []
+    position = 0
+    for match in INLINE_RE.finditer(text):
+        if match.start() > position:
+            runs.append((text[position:match.start()], PLAIN))
+        bold, italic, code = match.groups()
+        if bold is not None:
+            runs.append((bold, BOLD))
+        elif italic is not None:
+            runs.append((italic, ITALIC))
+        else:
+            runs.append((code, CODE_SPAN))
+        position = match.end()
+    if position < len(text):
+        runs.append((text[position:], PLAIN))
+    return tuple(runs)
+
+
+def plain_text(runs):
+    return "".join(text for text, _ in runs)
+
+
+def _table_row(line):
+    cells = line.strip('|').split('|')
+    return tuple(parse_inline(cell.strip()) for cell in cells)
+
+
+def parse(text):
+    """Parse course Markdown into a list of blocks (see the module docstring)"""
+    blocks = []
+    paragraph = []
+    table = []
+    code = None
+
+    for raw in text.split('\n'):
+        if code is not None:
+            if raw.lstrip().startswith('```'):
+                blocks.append((CODE, tuple(code)))
+                code = None
+            else:
+                code.append(raw.rstrip())
+            continue
+
+        line = raw.strip()
+        if table and not line.startswith('|'):
+            blocks.append((TABLE, tuple(table)))
+            table = []
+        if not line:
+            if paragraph:
+                blocks.append((PARAGRAPH, tuple(paragraph)))
+                paragraph = []
+            blocks.append(BLANK_BLOCK)
+            continue
+
+        first = line[0]
+        block = None
+        if first == '#':
+            match = HEADING_RE.match(line)
+            if match:
+                block = (HEADING, len(match.group(1)), plain_text(parse_inline(match.group(2).strip())))
+        elif first == '`' and line.startswith('```'):
+            code = []
+        elif first in '-*+' and line[1:2] == ' ':
+            block = (BULLET, parse_inline(line[2:].strip()))
+        elif first.isdigit():
+            match = NUMBERED_RE.match(line)
+            if match:
+                block = (NUMBERED, int(match.group(1)), parse_inline(match.group(2)))
+        elif first == '|':
+            if paragraph:
+                blocks.append((PARAGRAPH, tuple(paragraph)))
+                paragraph = []
+            if not TABLE_DIVIDER_RE.match(line):
+                table.append(_table_row(line))
+            continue
+
+        if block is None and code is None:
+            # "--- [Agent | week N] ---" labels of the agent logs count as rules too
+            if line.startswith('---') or (first in '=*_' and len(line) >= 3 and line == first * len(line)):
+                block = RULE_BLOCK
+            elif line.startswith('==='):
+                block = (MARKER, line)
+            elif 'Halt for' in line and 'seconds' in line:
+                continue
+            else:
+                paragraph.append(parse_inline(line))
+                continue
+
+        if paragraph:
+            blocks.append((PARAGRAPH, tuple(paragraph)))
+            paragraph = []
+        if block is not None:
+            blocks.append(block)
+
+    if code is not None:
+        blocks.append((CODE, tuple(code)))
+    if table:
+        blocks.append((TABLE, tuple(table)))
+    if paragraph:
+        blocks.append((PARAGRAPH, tuple(paragraph)))
+    return blocks
+
+
+def _join_lines(lines):
+    """Paragraph lines as one run sequence, joined with spaces like the source text reflows"""
+    if len(lines) == 1:
+        return lines[0]
+    joined = []
+    for i, runs in enumerate(lines):
+        if i:
+            joined.append((" ", PLAIN))
+        joined.extend(runs)
+    return joined
+
+
+# --- DOCX ---------------------------------------------------------------
+
+def add_runs(paragraph, runs):
+    for text, style in runs:
+        run = paragraph.add_run(text)
+        if style & BOLD:
+            run.bold = True
+        if style & ITALIC:
+            run.italic = True
+        if style & CODE_SPAN:
+            run.font.name = 'Courier New'
+    return paragraph
+
+
+def _styled_paragraph(doc, style_ids, name, text=None):
+    """
+    doc.add_paragraph(text, style=name) without python-docx's per-call style lookup
+
+    Resolving a style name scans the styles part each time, which costs more
+    than the paragraph itself, so the style id is looked up once per render.
+    """
+    style_id = style_ids.get(name)
+    if style_id is None:
+        style_id = style_ids[name] = doc.styles[name].style_id
+    p = doc.add_paragraph(text)
+    p._p.style = style_id
+    return p
+
+
+def render_docx(doc, blocks, heading_offset=0, rule_width=80):
+    """
+    Append blocks to a python-docx Document
+
+    Headings move down heading_offset levels, rules are lines of rule_width
+    box-drawing characters and only COMPLETED markers are kept (bold, green).
+    Blank lines stay empty paragraphs, as in the text.
+    """
+    style_ids = {}
+    for block in blocks:
+        kind = block[0]
+        if kind == PARAGRAPH:
+            add_runs(doc.add_paragraph(), _join_lines(block[1]))
+        elif kind == BLANK:
+            doc.add_paragraph()
+        elif kind == HEADING:
+            _styled_paragraph(doc, style_ids, f"Heading {min(block[1] + heading_offset, 9)}", block[2])
+        elif kind == BULLET:
+            add_runs(_styled_paragraph(doc, style_ids, 'List Bullet'), block[1])
+        elif kind == NUMBERED:
+            add_runs(_styled_paragraph(doc, style_ids, 'List Number'), block[2])
+        elif kind == CODE:
+            for line in block[1]:
+                p = doc.add_paragraph(line)
+                for run in p.runs:
+                    run.font.name = 'Courier New'
+        elif kind == TABLE:
+            rows = block[1]
+            columns = max(len(row) for row in rows)
+            table = doc.add_table(rows=len(rows), cols=columns)
+            table.style = 'Table Grid'
+            for i, (row, cells) in enumerate(zip(table.rows, rows)):
+                for cell, runs in zip(row.cells, cells):
+                    # The first row is the header
+                    add_runs(cell.paragraphs[0], [(text, style | BOLD) for text, style in runs] if i == 0 else runs)
+        elif kind == RULE:
+            doc.add_paragraph('─' * rule_width)
+        elif kind == MARKER and 'COMPLETED' in block[1].upper():
+            p = doc.add_paragraph(block[1])
+            for run in p.runs:
+                run.bold = True
+                run.font.color.rgb = RGBColor(0, 128, 0)  # Green color
+    return doc
+
+
+# --- ReportLab ----------------------------------------------------------
+
+def inline_markup(runs):
+    """ReportLab paragraph markup for runs, with the text escaped"""
+    parts = []
+    for text, style in runs:
+        text = escape(text)
+        if style & CODE_SPAN:
+            text = f'<font face="Courier">{text}</font>'
+        if style & ITALIC:
+            text = f'<i>{text}</i>'
+        if style & BOLD:
+            text = f'<b>{text}</b>'
+        parts.append(text)
+    return "".join(parts)
+
+
+def render_flowables(blocks, styles, heading_styles=None):
+    """
+    ReportLab flowables for blocks
+
+    styles needs 'normal' and 'code' ParagraphStyles; heading_styles maps a
+    heading level to its style (headings without one use 'normal'). Rules,
+    markers and blank lines produce no flowables.
+    """
+    heading_styles = heading_styles or {}
+    normal = styles['normal']
+    elements = []
+    for block in blocks:
+        kind = block[0]
+        if kind == PARAGRAPH:
+            elements.append(Paragraph(inline_markup(_join_lines(block[1])), normal))
+        elif kind == HEADING:
+            elements.append(Paragraph(escape(block[2]), heading_styles.get(block[1], normal)))
+        elif kind == BULLET:
+            elements.append(Paragraph(f"• {inline_markup(block[1])}", normal))
+        elif kind == NUMBERED:
+            elements.append(Paragraph(f"{block[1]}. {inline_markup(block[2])}", normal))
+        elif kind == CODE:
+            elements.append(Preformatted("\n".join(block[1]), styles['code']))
+            elements.append(Spacer(1, 6))
+        elif kind == TABLE:
+            rows = [[Paragraph(inline_markup(cell), normal) for cell in row] for row in block[1]]
+            columns = max(len(row) for row in rows)
+            rows = [row + [""] * (columns - len(row)) for row in rows]
+            table = Table(rows, repeatRows=1)
+            table.setStyle(TableStyle([
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+                ('BACKGROUND', (0, 0), (-1, 0), colors.whitesmoke),
+                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ]))
+            elements.append(table)
+            elements.append(Spacer(1, 8))
+    return elements
@@ -0,0 +1,338 @@
+"""
+Single-process orchestrator for the course generation pipeline
+
+Replaces the sequential start.bat chain with a dependency graph:
+
+    planner -> course_plan -> deep_content -> course_material
+                                           -> quizzes
+                                           -> flashcards
+
+Independent stages run concurrently in one event loop, sharing one Gemini
+client and one loaded user configuration. A per-stage timing table is printed
+at the end.
+
+Every stage records a manifest of its input hashes (upstream files, the
+curriculum, user_config.json and the stage's own prompt/code modules) and its
+output paths. Stages whose inputs are unchanged and whose outputs still exist
+are skipped, make-style.
+
+With --combined-agents (or COPILOT_COMBINED_AGENTS=on) the course_plan stage
+is folded into deep_content: the CoursePlannerAgent and the deep content loop
+run in one ADK session, and deep_content writes plan_agent_output.txt too.
+
+Usage: python pipeline.py [--stages STAGE ...] [--force STAGE ...] [--dry-run] [--combined-agents]
+"""
+import argparse
+import asyncio
+import importlib
+import os
+import sys
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.dirname(__file__))
+COPILOT_DIR = os.path.join(PROJECT_ROOT, "copilot")
+
+# The agent runners import their agents as top-level `knowledge` packages
+if COPILOT_DIR not in sys.path:
+    sys.path.insert(0, COPILOT_DIR)
+
+import llm
+from build_manifest import hash_inputs, rebuild_reasons, write_manifest
+from tracing import span
+
+IO_DIR = "Inputs and Outputs"
+USER_CONFIG_PATH = "user_config.json"
+PLAN_OUTPUT_PATH = os.path.join(IO_DIR, "plan_agent_output.txt")
+
+
+class Stage:
+    """A named pipeline step with the stages it depends on and the files it reads and writes"""
+
+    def __init__(self, name, deps, run, description="", inputs=None, outputs=None):
+        self.name = name
+        self.deps = deps
+        self.run = run
+        self.description = description
+        self.inputs = inputs or []
+        self.outputs = outputs or []
+
+
+def deep_content_path():
+    """The deep content file the downstream generators read (same fallback order as their readers)"""
+    for path in (
+        os.path.join("copilot", IO_DIR, "deep_course_content_output.txt"),
+        os.path.join("copilot", IO_DIR, "deep_agent_output.txt"),
+        os.path.join(IO_DIR, "deep_agent_output.txt"),
+    ):
+        if os.path.exists(path):
+            return path
+    return os.path.join(IO_DIR, "deep_agent_output.txt")
+
+
+async def run_planner_stage(context):
+    await asyncio.to_thread(llm.run_planner, context["client"], context["user_config"])
+
+
+async def run_course_plan_stage(context):
+    # Imported lazily so stages that do not need ADK start fast; the agent is built from the current file per run
+    copilot_main = importlib.import_module("copilot.main")
+    await copilot_main.main_async(progress=context.get("progress"))
+
+
+async def run_deep_content_stage(context):
+    # Imported lazily so stages that do not need ADK start fast; the agents are built from the current plan per run
+    deep_main = importlib.import_module("copilot.deep_main")
+    await deep_main.main_async(progress=context.get("progress"))
+
+
+async def run_combined_content_stage(context):
+    # Planner agent and deep content loop in one session; the plan file is written along the way
+    deep_main = importlib.import_module("copilot.deep_main")
+    await deep_main.main_async(progress=context.get("progress"), combined=True)
+
+
+async def run_course_material_stage(context):
+    course_material = importlib.import_module("course_material")
+    created_files = await asyncio.to_thread(course_material.create_course_material_combined)
+    if not created_files:
+        raise RuntimeError("No course material documents were created")
+
+
+async def run_quizzes_stage(context):
+    quizzes = importlib.import_module("quizzes")
+    generated = await quizzes.generate_quizzes_async(client=context["client"], user_config=context["user_config"])
+    if not generated:
+        raise RuntimeError("No quiz papers were generated")
+
+
+async def run_flashcards_stage(context):
+    flash_cards = importlib.import_module("flash_cards")
+    created = await flash_cards.generate_flashcards_async(client=context["client"], user_config=context["user_config"])
+    if not created:
+        raise RuntimeError("No flashcards were created")
+
+
+def source_files(*names):
+    """Stage code inputs, resolved against the project root so batch runs in other directories find them"""
+    return [os.path.join(PROJECT_ROOT, name) for name in names]
+
+
+# Code inputs stand in for the prompt templates and code version of each stage
+LLM_CODE = source_files("llm.py", "prompt_budget.py", "retrieval.py")
+
+DEEP_CODE = source_files("copilot/deep_main.py", "copilot/knowledge_1/agent.py", "session_store.py", "week_files.py")
+DEEP_OUTPUTS = [os.path.join(IO_DIR, "deep_agent_output.txt"), os.path.join(IO_DIR, "weeks")]
+
+
+def combined_agents_enabled():
+    return os.getenv("COPILOT_COMBINED_AGENTS", "off").lower() in ("on", "1", "true")
+
+
+def build_stages(combined=False):
+    """The pipeline stages; combined folds course_plan into deep_content (one ADK session for both agents)"""
+    if combined:
+        plan_stages = [
+            Stage("deep_content", ["planner"], run_combined_content_stage, "CoursePlannerAgent plan and deep content loop in one session",
+                  inputs=[llm.PLANNER_OUTPUT_PATH] + source_files("copilot/knowledge/agent.py") + DEEP_CODE,
+                  outputs=[PLAN_OUTPUT_PATH] + DEEP_OUTPUTS),
+        ]
+    else:
+        plan_stages = [
+            Stage("course_plan", ["planner"], run_course_plan_stage, "CoursePlannerAgent detailed plan",
+                  inputs=[llm.PLANNER_OUTPUT_PATH] + source_files("copilot/main.py", "copilot/knowledge/agent.py"),
+                  outputs=[PLAN_OUTPUT_PATH]),
+            Stage("deep_content", ["course_plan"], run_deep_content_stage, "Deep week-by-week content loop",
+                  inputs=[PLAN_OUTPUT_PATH] + DEEP_CODE,
+                  outputs=DEEP_OUTPUTS),
+        ]
+    return [
+        Stage("planner", [], run_planner_stage, "Master course plan from the curriculum PDF",
+              inputs=[str(llm.CURRICULUM_PATH), USER_CONFIG_PATH] + source_files("llm.py", "prompt_budget.py"),
+              outputs=[llm.PLANNER_OUTPUT_PATH]),
+        *plan_stages,
+        Stage("course_material", ["deep_content"], run_course_material_stage, "Combined DOCX/PDF course material",
+              inputs=[llm.PLANNER_OUTPUT_PATH, deep_content_path] + source_files("course_material.py"),
+              outputs=[os.path.join(IO_DIR, "course material")]),
+        Stage("quizzes", ["deep_content"], run_quizzes_stage, "Themed quiz papers",
+              inputs=[llm.PLANNER_OUTPUT_PATH, deep_content_path, USER_CONFIG_PATH] + source_files("quizzes.py") + LLM_CODE,
+              outputs=[os.path.join(IO_DIR, "quizzes")]),
+        Stage("flashcards", ["deep_content"], run_flashcards_stage, "Flashcard images and summary",
+              inputs=[llm.PLANNER_OUTPUT_PATH, deep_content_path, USER_CONFIG_PATH] + source_files("flash_cards.py") + LLM_CODE,
+              outputs=[os.path.join(IO_DIR, "flashcards")]),
+    ]
+
+
+STAGES = build_stages(combined_agents_enabled())
+
+DONE_STATUSES = ("ok", "cached")
+
+
+def plan_rebuild(stages, selected=None, force=None):
+    """
+    Return {name: reasons} for the selected stages that would be rebuilt
+
+    A stage rebuilds when it is forced, its manifest is stale, or one of its
+    upstream stages rebuilds (its inputs will change).
+    """
+    selected = set(selected or (stage.name for stage in stages))
+    force = set(force or [])
+    plan = {}
+    for stage in stages:
+        if stage.name not in selected:
+            continue
+        if stage.name in force or "all" in force:
+            reasons = ["forced"]
+        else:
+            reasons = rebuild_reasons(stage.name, hash_inputs(stage.inputs))
+        reasons += [f"upstream rebuild: {dep}" for dep in stage.deps if dep in plan]
+        if reasons:
+            plan[stage.name] = reasons
+    return plan
+
+
+def print_rebuild_plan(stages, plan, selected=None):
+    selected = set(selected or (stage.name for stage in stages))
+    print(f"\n{'=' * 60}")
+    print("🔍 WHAT WOULD REBUILD")
+    print(f"{'=' * 60}")
+    for stage in stages:
+        if stage.name not in selected:
+            continue
+        if stage.name in plan:
+            print(f"🔨 {stage.name}")
+            for reason in plan[stage.name]:
+                print(f"   - {reason}")
+        else:
+            print(f"⏭️ {stage.name} (up to date)")
+
+
+async def run_dag(stages, context, selected=None, force=None, on_event=None):
+    """
+    Run stages as soon as their dependencies finish
+
+    Dependencies outside `selected` are treated as already satisfied. A stage
+    whose dependency failed is skipped, and a stage whose manifest is up to
+    date is not re-run (status "cached") unless it is in `force`. Returns
+    {name: result} where result holds status, start offset, duration and error.
+    on_event(event) is called with a dict for every stage start and result.
+    """
+    selected = set(selected or (stage.name for stage in stages))
+    force = set(force or [])
+    results = {}
+    tasks = {}
+    started = time.perf_counter()
+
+    def finish(stage, result):
+        results[stage.name] = result
+        if on_event:
+            on_event({"type": "stage_finished", "stage": stage.name, **result})
+
+    async def run_stage(stage):
+        for dep in stage.deps:
+            if dep in tasks:
+                await tasks[dep]
+        failed_deps = [dep for dep in stage.deps if dep in results and results[dep]["status"] not in DONE_STATUSES]
+        if failed_deps:
+            finish(stage, {"status": "skipped", "start": None, "seconds": 0.0, "error": f"dependency failed: {', '.join(failed_deps)}"})
+            return
+
+        # Hash inputs before running so edits made during the run trigger a rebuild next time
+        input_hashes = hash_inputs(stage.inputs)
+        forced = stage.name in force or "all" in force
+        if not forced and not rebuild_reasons(stage.name, input_hashes):
+            print(f"\n⏭️ [{stage.name}] up to date, skipping")
+            finish(stage, {"status": "cached", "start": None, "seconds": 0.0, "error": None})
+            return
+
+        start = time.perf_counter()
+        print(f"\n▶️ [{stage.name}] started - {stage.description}")
+        if on_event:
+            on_event({"type": "stage_started", "stage": stage.name, "description": stage.description})
+        try:
+            with span(f"stage.{stage.name}", kind="stage", stage=stage.name):
+                await stage.run(context)
+            write_manifest(stage.name, input_hashes, stage.outputs)
+            status, error = "ok", None
+            print(f"✅ [{stage.name}] finished in {time.perf_counter() - start:.1f}s")
+        except Exception as e:
+            status, error = "failed", f"{e.__class__.__name__}: {e}"
+            print(f"❌ [{stage.name}] failed: {error}")
+        finish(stage, {
+            "status": status,
+            "start": start - started,
+            "seconds": time.perf_counter() - start,
+            "error": error,
+        })
+
+    for stage in stages:
+        if stage.name in selected:
+            tasks[stage.name] = asyncio.create_task(run_stage(stage))
+    await asyncio.gather(*tasks.values())
+    return results
+
+
+def print_timing_table(stages, results, total_seconds):
+    print(f"\n{'=' * 60}")
+    print("⏱️ PIPELINE TIMING")
+    print(f"{'=' * 60}")
+    print(f"{'stage':<18}{'status':<10}{'start (s)':>12}{'duration (s)':>15}")
+    for stage in stages:
+        result = results.get(stage.name)
+        if not result:
+            continue
+        start = f"{result['start']:.1f}" if result["start"] is not None else "-"
+        print(f"{stage.name:<18}{result['status']:<10}{start:>12}{result['seconds']:>15.1f}")
+    print(f"{'-' * 55}")
+    print(f"{'total wall time':<28}{total_seconds:>27.1f}")
+    for name, result in results.items():
+        if result["error"]:
+            print(f"   {name}: {result['error']}")
+
+
+async def run_pipeline(selected=None, force=None, stages=None):
+    stages = stages or STAGES
+    user_config = llm.prompt_user_inputs()
+    context = {
+        "client": llm.create_client(),
+        "user_config": user_config,
+    }
+
+    started = time.perf_counter()
+    results = await run_dag(stages, context, selected, force)
+    print_timing_table(stages, results, time.perf_counter() - started)
+    return results
+
+
+def main():
+    # Every stage name is accepted here; the ones the chosen layout lacks are rejected below
+    stage_names = [stage.name for stage in build_stages()]
+    parser = argparse.ArgumentParser(description="Run the course generation pipeline in a single process")
+    parser.add_argument("--stages", nargs="+", choices=stage_names,
+                        help="only run these stages (their other dependencies are assumed up to date)")
+    parser.add_argument("--force", nargs="+", default=[], choices=stage_names + ["all"],
+                        help="rebuild these stages even if their manifests are up to date")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="report which stages would rebuild and why, without running anything")
+    parser.add_argument("--combined-agents", action="store_true",
+                        help="plan the course and write its deep content in one agent session (no course_plan stage)")
+    args = parser.parse_args()
+
+    stages = STAGES
+    if args.combined_agents:
+        os.environ["COPILOT_COMBINED_AGENTS"] = "on"
+        stages = build_stages(combined=True)
+    unknown = [name for name in (args.stages or []) + args.force if name != "all" and name not in {stage.name for stage in stages}]
+    if unknown:
+        parser.error(f"not a stage with combined agents: {', '.join(unknown)} (course_plan runs inside deep_content)")
+
+    if args.dry_run:
+        print_rebuild_plan(stages, plan_rebuild(stages, args.stages, args.force), args.stages)
+        return
+
+    results = asyncio.run(run_pipeline(args.stages, args.force, stages))
+    if any(result["status"] not in DONE_STATUSES for result in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
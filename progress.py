@@ -0,0 +1,189 @@
+"""
+Live progress events for the agent runners
+
+The runners in copilot/ wrap their work in stage_progress() and turn their ADK
+runner events into small progress events through its ProgressTracker. Each
+event is a dict with a "type":
+
+    stage_started   stage, total_weeks, done_weeks
+    week_started    week
+    week_completed  week, done_weeks, total_weeks, eta_seconds
+    tool_call       name, week (for save_week)
+    tokens          input_tokens, output_tokens, total_tokens, eta_seconds
+    stage_finished  status, error, seconds
+
+plus "stage" and "time" on every event. stream_progress() runs a runner and
+yields its events as an async generator, through a bounded ProgressStream: when
+the consumer falls behind, the runner waits on the full buffer instead of
+growing it (token events, which are cumulative, are dropped instead).
+
+    async for event in stream_progress(deep_main.main_async):
+        print(event["type"], event.get("week", ""))
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager, suppress
+
+from session_store import COMPLETED_RE, PROCESSING_RE
+
+STAGE_STARTED = "stage_started"
+WEEK_STARTED = "week_started"
+WEEK_COMPLETED = "week_completed"
+TOOL_CALL = "tool_call"
+TOKENS = "tokens"
+STAGE_FINISHED = "stage_finished"
+EVENT_TYPES = (STAGE_STARTED, WEEK_STARTED, WEEK_COMPLETED, TOOL_CALL, TOKENS, STAGE_FINISHED)
+
+DEFAULT_BUFFER_SIZE = 64
+
+
+class ProgressStream:
+    """Bounded buffer between a run that emits progress events and one consumer"""
+
+    def __init__(self, maxsize=DEFAULT_BUFFER_SIZE):
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    async def emit(self, event):
+        # Token totals are cumulative, so the next one makes up for a dropped one
+        if event["type"] == TOKENS and self.queue.full():
+            self.dropped += 1
+            return
+        await self.queue.put(event)
+
+
+async def stream_progress(run, *args, maxsize=DEFAULT_BUFFER_SIZE, **kwargs):
+    """
+    Run run(*args, progress=stream, **kwargs) and yield its progress events as they happen
+
+    Re-raises the run's exception after the events emitted before it. Leaving
+    the loop early cancels the run.
+    """
+    stream = ProgressStream(maxsize)
+    task = asyncio.create_task(run(*args, progress=stream, **kwargs))
+    try:
+        while True:
+            get = asyncio.ensure_future(stream.queue.get())
+            done, _ = await asyncio.wait({get, task}, return_when=asyncio.FIRST_COMPLETED)
+            if get in done:
+                yield get.result()
+                continue
+            get.cancel()
+            while not stream.queue.empty():
+                yield stream.queue.get_nowait()
+            break
+        task.result()
+    finally:
+        if not task.done():
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+
+
+class ProgressTracker:
+    """
+    Turn one stage's ADK runner events into progress events for a sink
+
+    sink is anything with an async emit(event), usually a ProgressStream; with
+    no sink nothing is emitted. Weeks are recognised from save_week calls
+    and from the PROCESSING / COMPLETED markers, and each is reported once.
+    The remaining-time estimate is the average time per week completed in this
+    run times the weeks still to do.
+    """
+
+    def __init__(self, stage, sink=None):
+        self.stage = stage
+        self.sink = sink
+        self.total_weeks = 0
+        self.started_weeks = set()
+        self.done_weeks = set()
+        self.resumed_weeks = 0
+        self.tokens = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+        self.started = time.perf_counter()
+
+    async def emit(self, event_type, **fields):
+        if self.sink is not None:
+            await self.sink.emit({"type": event_type, "stage": self.stage, "time": time.time(), **fields})
+
+    def eta_seconds(self):
+        finished = len(self.done_weeks) - self.resumed_weeks
+        if not self.total_weeks or finished <= 0:
+            return None
+        remaining = max(self.total_weeks - len(self.done_weeks), 0)
+        return round((time.perf_counter() - self.started) / finished * remaining, 1)
+
+    async def stage_started(self, total_weeks=0, done_weeks=()):
+        """Weeks in done_weeks were finished by an earlier run and do not count towards the estimate"""
+        self.total_weeks = total_weeks
+        self.started_weeks = set(done_weeks)
+        self.done_weeks = set(done_weeks)
+        self.resumed_weeks = len(self.done_weeks)
+        self.started = time.perf_counter()
+        await self.emit(STAGE_STARTED, total_weeks=self.total_weeks, done_weeks=len(self.done_weeks))
+
+    async def stage_finished(self, error=None):
+        await self.emit(STAGE_FINISHED, status="failed" if error else "ok",
+                        error=f"{error.__class__.__name__}: {error}" if error else None,
+                        seconds=round(time.perf_counter() - self.started, 3))
+
+    async def week_started(self, week):
+        if self.sink is None or week in self.started_weeks:
+            return
+        self.started_weeks.add(week)
+        await self.emit(WEEK_STARTED, week=week)
+
+    async def week_completed(self, week):
+        if self.sink is None or week in self.done_weeks:
+            return
+        await self.week_started(week)
+        self.done_weeks.add(week)
+        await self.emit(WEEK_COMPLETED, week=week, done_weeks=len(self.done_weeks),
+                        total_weeks=self.total_weeks, eta_seconds=self.eta_seconds())
+
+    async def feed(self, event):
+        """Emit the progress events found in one ADK runner event"""
+        if self.sink is None:
+            return
+        usage = getattr(event, "usage_metadata", None)
+        if usage is not None:
+            self.tokens["input_tokens"] += getattr(usage, "prompt_token_count", None) or 0
+            self.tokens["output_tokens"] += getattr(usage, "candidates_token_count", None) or 0
+            self.tokens["total_tokens"] += getattr(usage, "total_token_count", None) or 0
+            await self.emit(TOKENS, eta_seconds=self.eta_seconds(), **self.tokens)
+
+        for call in event.get_function_calls() if hasattr(event, "get_function_calls") else []:
+            week = (call.args or {}).get("week_number") if call.name == "save_week" else None
+            try:
+                # Model-supplied args: numbers may arrive as floats, or not be numbers at all
+                week = int(float(week)) if week is not None else None
+            except (TypeError, ValueError):
+                week = None
+            await self.emit(TOOL_CALL, name=call.name, week=week)
+        for response in event.get_function_responses() if hasattr(event, "get_function_responses") else []:
+            result = response.response or {}
+            if response.name == "save_week" and result.get("status") == "success":
+                await self.week_completed(int(result["week_number"]))
+
+        content = getattr(event, "content", None)
+        if getattr(event, "partial", False) or not content:
+            return
+        for part in content.parts or []:
+            text = getattr(part, "text", None)
+            if not text:
+                continue
+            for match in PROCESSING_RE.finditer(text):
+                await self.week_started(int(match.group(1)))
+            for match in COMPLETED_RE.finditer(text):
+                await self.week_completed(int(match.group(1)))
+
+
+@asynccontextmanager
+async def stage_progress(stage, sink=None):
+    """Yield a ProgressTracker for one stage and emit its stage_finished event, failed if the block raises"""
+    tracker = ProgressTracker(stage, sink)
+    try:
+        yield tracker
+    except Exception as e:
+        await tracker.stage_finished(e)
+        raise
+    await tracker.stage_finished()
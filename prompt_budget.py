@@ -0,0 +1,210 @@
+import hashlib
+import os
+import re
+from pathlib import Path
+
+from google.genai import types
+
+from rate_limit import call_with_retry
+from retrieval import WEEK_HEADING_RE, estimate_tokens
+from tracing import record_response, retry_counter, span
+
+SUMMARY_MODEL = 'gemini-2.5-flash'
+SUMMARY_CACHE_DIR = os.getenv("PROMPT_BUDGET_CACHE_DIR") or os.path.join("Inputs and Outputs", ".cache", "summaries")
+
+# Per-stage prompt budgets in tokens, overridable with PROMPT_BUDGET_<STAGE>. Quiz and
+# flashcard prompts are already cut to RETRIEVAL_TOKEN_BUDGET by retrieval, so they
+# only reach the default budget here when that is raised past it
+STAGE_TOKEN_BUDGETS = {
+    "planner": 200000,
+    "default": 64000,
+}
+
+# Only ask the count_tokens API when the local estimate is this close to the budget
+EXACT_COUNT_THRESHOLD = 0.8
+
+WEEK_SUMMARY_PROMPT = """Summarize the following course week for use as context by other course-generation agents.
+Keep the week number and title, every key concept and definition, the main examples and case studies, and how the week connects to the others.
+Use compact Markdown bullet points and at most 200 words."""
+
+COURSE_DIGEST_PROMPT = """Merge the following week summaries into one compact course digest.
+Keep one short bullet list per week with its key concepts, in week order, and at most 60 words per week."""
+
+
+def get_stage_budget(stage):
+    """Return the token budget for a pipeline stage"""
+    stage = stage or "default"
+    override = os.getenv(f"PROMPT_BUDGET_{stage.upper()}")
+    if override:
+        return int(override)
+    return STAGE_TOKEN_BUDGETS.get(stage, STAGE_TOKEN_BUDGETS["default"])
+
+
+def count_tokens(client, text, model=SUMMARY_MODEL, budget=None):
+    """
+    Count tokens in text
+
+    Uses the local estimator when there is no client, when PROMPT_BUDGET_OFFLINE
+    is set, when the estimate is comfortably inside the budget, or when the
+    count_tokens API call fails.
+    """
+    estimate = estimate_tokens(text)
+    if client is None or os.getenv("PROMPT_BUDGET_OFFLINE"):
+        return estimate
+    if budget is not None and estimate < budget * EXACT_COUNT_THRESHOLD:
+        return estimate
+    try:
+        return client.models.count_tokens(model=model, contents=[text]).total_tokens
+    except Exception:
+        return estimate
+
+
+def split_into_weeks(text):
+    """
+    Split text into segments [(week_number_or_None, segment_text)]
+
+    Each week segment runs from its week heading to the next one; text before
+    the first week (and between sources) is kept as a None segment.
+    """
+    segments = []
+    week = None
+    start = 0
+    offset = 0
+    for line in text.splitlines(keepends=True):
+        match = WEEK_HEADING_RE.match(line.strip())
+        if match:
+            number = int(match.group(1) or match.group(2))
+            if number != week:
+                if offset > start:
+                    segments.append((week, text[start:offset]))
+                week = number
+                start = offset
+        elif line.startswith("=== DETAILED COURSE CONTENT ===") or line.startswith("=== COURSE PLAN CONTENT ==="):
+            if offset > start:
+                segments.append((week, text[start:offset]))
+            week = None
+            start = offset
+        offset += len(line)
+    if offset > start:
+        segments.append((week, text[start:offset]))
+    return segments
+
+
+def _extractive_summary(text, max_chars=1200):
+    """Offline fallback summary: the headings plus the first sentence under each"""
+    lines = []
+    want_sentence = True
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith("==="):
+            continue
+        if stripped.startswith("#"):
+            lines.append(stripped)
+            want_sentence = True
+        elif want_sentence:
+            sentence = re.split(r'(?<=[.!?])\s', stripped, maxsplit=1)[0]
+            lines.append(f"- {sentence}")
+            want_sentence = False
+        if sum(len(l) + 1 for l in lines) >= max_chars:
+            break
+    return "\n".join(lines)[:max_chars]
+
+
+def _summarize(client, prompt, text, cache_name):
+    """Summarize text with the LLM (or extractively offline), cached by content hash"""
+    digest = hashlib.sha256(f"{prompt}\0{text}".encode("utf-8")).hexdigest()
+    cache_path = Path(SUMMARY_CACHE_DIR) / f"{cache_name}-{digest}.md"
+    if cache_path.exists():
+        return cache_path.read_text(encoding="utf-8")
+
+    summary = None
+    if client is not None and not os.getenv("PROMPT_BUDGET_OFFLINE"):
+        try:
+            with span("llm.summarize", kind="llm", model=SUMMARY_MODEL, summary=cache_name) as current:
+                response = call_with_retry(
+                    lambda: client.models.generate_content(
+                        model=SUMMARY_MODEL,
+                        contents=[text],
+                        config=types.GenerateContentConfig(system_instruction=prompt),
+                    ),
+                    model=SUMMARY_MODEL,
+                    tokens=estimate_tokens(text) + 1000,
+                    on_retry=retry_counter(current),
+                )
+                record_response(current, response)
+            summary = (response.text or "").strip() or None
+        except Exception as e:
+            print(f"⚠️ Summary generation failed, using extractive summary: {e}")
+    if summary is None:
+        summary = _extractive_summary(text)
+
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    cache_path.write_text(summary, encoding="utf-8")
+    return summary
+
+
+def summarize_week(client, week_number, week_text):
+    """Return a cached summary of one week, keyed by the hash of the week's content"""
+    summary = _summarize(client, WEEK_SUMMARY_PROMPT, week_text, f"week{week_number:02d}")
+    return f"# Week {week_number} (summary)\n{summary}\n\n"
+
+
+def summarize_course(client, week_summaries):
+    """Return a cached digest built from the week summaries (second summary level)"""
+    digest = _summarize(client, COURSE_DIGEST_PROMPT, "\n\n".join(week_summaries), "course")
+    return f"# Course digest (summary of all weeks)\n{digest}\n\n"
+
+
+def compact_course_content(client, course_content, stage=None, budget=None):
+    """
+    Shrink course_content to fit the stage's token budget
+
+    Full weeks are swapped for their cached summaries, largest week first, until
+    the text fits. If every week is already summarized and the text still does
+    not fit, the week summaries are collapsed into a single course digest.
+    Logs bytes and tokens before and after compaction.
+    """
+    if not course_content:
+        return course_content
+    if budget is None:
+        budget = get_stage_budget(stage)
+    label = stage or "default"
+
+    before_bytes = len(course_content.encode("utf-8"))
+    before_tokens = count_tokens(client, course_content, budget=budget)
+    if before_tokens <= budget:
+        print(f"📐 [{label}] {before_bytes:,} bytes / {before_tokens:,} tokens (budget {budget:,}) - no compaction needed")
+        return course_content
+
+    segments = split_into_weeks(course_content)
+    texts = [text for _, text in segments]
+    sizes = [estimate_tokens(text) for text in texts]
+    week_positions = sorted((i for i, (week, _) in enumerate(segments) if week is not None), key=lambda i: -sizes[i])
+
+    total = sum(sizes)
+    summarized = 0
+    for i in week_positions:
+        if total <= budget:
+            break
+        texts[i] = summarize_week(client, segments[i][0], segments[i][1])
+        total += estimate_tokens(texts[i]) - sizes[i]
+        sizes[i] = estimate_tokens(texts[i])
+        summarized += 1
+
+    compacted = "".join(texts)
+    after_tokens = count_tokens(client, compacted, budget=budget)
+    if after_tokens > budget and week_positions:
+        # Second level: collapse all week summaries into one course digest
+        in_order = sorted(week_positions)
+        digest = summarize_course(client, [texts[i] for i in in_order])
+        week_set = set(in_order)
+        texts = [digest if i == in_order[0] else text for i, text in enumerate(texts) if i == in_order[0] or i not in week_set]
+        compacted = "".join(texts)
+        after_tokens = count_tokens(client, compacted, budget=budget)
+
+    after_bytes = len(compacted.encode("utf-8"))
+    print(f"📐 [{label}] {before_bytes:,} bytes / {before_tokens:,} tokens -> "
+          f"{after_bytes:,} bytes / {after_tokens:,} tokens (budget {budget:,}, {summarized} weeks summarized)")
+    if after_tokens > budget:
+        print(f"⚠️ [{label}] Prompt still exceeds its budget after compaction")
+    return compacted
@@ -1,10 +1,19 @@
+import argparse
+import asyncio
+import functools
+import json
 import os
 import pathlib
 import re
+from xml.sax.saxutils import escape
 from google import genai
 from google.genai import types
 from dotenv import load_dotenv
-from llm import generate_course_content, load_user_inputs
+from llm import create_client, generate_course_content, generate_course_content_async, load_user_inputs, run_concurrently
+from response_cache import get_default_cache
+from retrieval import CourseIndex, build_retrieved_content
+from tracing import traced
+import markdown_ir
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
@@ -13,9 +22,9 @@ from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
 
 load_dotenv()
 
-def generate_single_quiz(client, google_search_tool, system_prompt, combined_content, quiz_number, quiz_theme, user_config):
+def build_quiz_task(quiz_number, quiz_theme):
     # Create specific task for this quiz
-    task = f"""
+    return f"""
 GENERATE ONLY ONE QUIZ PAPER:
 
 Quiz Theme: {quiz_theme}
@@ -34,6 +43,42 @@ Requirements:
 
 Format the output as a single, complete quiz paper ready for students to take in 10-15 minutes.
 """
+
+def extract_single_quiz(response, quiz_number):
+    if not response or not hasattr(response, 'text') or not response.text:
+        print(f"❌ No response for Quiz {quiz_number}")
+        return None
+    
+    # Extract only the relevant quiz content (filter out any extra content)
+    quiz_content = response.text
+    
+    # If the response contains multiple quizzes, try to extract just this one
+    if f"Quiz Paper {quiz_number + 1}" in quiz_content or "Quiz Paper 2" in quiz_content:
+        print(f"⚠️ Response contains multiple quizzes, extracting Quiz {quiz_number} only...")
+        # Try to extract just this quiz
+        lines = quiz_content.split('\n')
+        quiz_lines = []
+        found_start = False
+        
+        for line in lines:
+            # Start collecting when we find our quiz
+            if f"Quiz Paper {quiz_number}" in line or (quiz_number == 1 and "Quiz Paper:" in line and not "Quiz Paper 2" in line):
+                found_start = True
+                quiz_lines.append(line)
+            elif found_start and (f"Quiz Paper {quiz_number + 1}" in line or "Quiz Paper 2" in line or "Quiz Paper 3" in line):
+                # Stop when we hit the next quiz
+                break
+            elif found_start:
+                quiz_lines.append(line)
+        
+        if quiz_lines:
+            quiz_content = '\n'.join(quiz_lines).strip()
+            print(f"✅ Extracted individual quiz content ({len(quiz_content)} characters)")
+        
+    return quiz_content
+
+def generate_single_quiz(client, google_search_tool, system_prompt, combined_content, quiz_number, quiz_theme, user_config):
+    task = build_quiz_task(quiz_number, quiz_theme)
     
     print(f"🔄 Generating Quiz Paper {quiz_number}: {quiz_theme}...")
     
@@ -46,45 +91,180 @@ Format the output as a single, complete quiz paper ready for students to take in
             google_search_tool=google_search_tool,
             system_prompt=system_prompt,
             course_content=combined_content,
+            stage="quizzes",
             task=task
         )
+        return extract_single_quiz(response, quiz_number)
         
-        if not response or not hasattr(response, 'text') or not response.text:
-            print(f"❌ No response for Quiz {quiz_number}")
-            return None
-        
-        # Extract only the relevant quiz content (filter out any extra content)
-        quiz_content = response.text
-        
-        # If the response contains multiple quizzes, try to extract just this one
-        if f"Quiz Paper {quiz_number + 1}" in quiz_content or "Quiz Paper 2" in quiz_content:
-            print(f"⚠️ Response contains multiple quizzes, extracting Quiz {quiz_number} only...")
-            # Try to extract just this quiz
-            lines = quiz_content.split('\n')
-            quiz_lines = []
-            found_start = False
-            
-            for line in lines:
-                # Start collecting when we find our quiz
-                if f"Quiz Paper {quiz_number}" in line or (quiz_number == 1 and "Quiz Paper:" in line and not "Quiz Paper 2" in line):
-                    found_start = True
-                    quiz_lines.append(line)
-                elif found_start and (f"Quiz Paper {quiz_number + 1}" in line or "Quiz Paper 2" in line or "Quiz Paper 3" in line):
-                    # Stop when we hit the next quiz
-                    break
-                elif found_start:
-                    quiz_lines.append(line)
-            
-            if quiz_lines:
-                quiz_content = '\n'.join(quiz_lines).strip()
-                print(f"✅ Extracted individual quiz content ({len(quiz_content)} characters)")
-            
-        return quiz_content
+    except Exception as e:
+        print(f"❌ Error generating Quiz {quiz_number}: {e}")
+        return None
+
+async def generate_single_quiz_async(client, google_search_tool, system_prompt, combined_content, quiz_number, quiz_theme, user_config):
+    task = build_quiz_task(quiz_number, quiz_theme)
+    
+    print(f"🔄 Generating Quiz Paper {quiz_number}: {quiz_theme}...")
+    
+    try:
+        response = await generate_course_content_async(
+            client=client,
+            teaching_style=user_config.get('teaching_style', 'Project-Based / Hands-On'),
+            duration=user_config.get('duration', '6 weeks'),
+            difficulty_level=user_config.get('difficulty_level', 'intermediate'),
+            google_search_tool=google_search_tool,
+            system_prompt=system_prompt,
+            course_content=combined_content,
+            stage="quizzes",
+            task=task
+        )
+        return extract_single_quiz(response, quiz_number)
         
     except Exception as e:
         print(f"❌ Error generating Quiz {quiz_number}: {e}")
         return None
 
+QUIZ_THEMES = [
+    "Foundation and Analysis",
+    "Application and Synthesis", 
+    "Evaluation and Innovation"
+]
+
+# Retrieval queries used to pick the course chunks relevant to each quiz theme
+THEME_QUERIES = {
+    "Foundation and Analysis": "foundation analysis definition concept principle fundamental core terminology overview introduction explanation why how",
+    "Application and Synthesis": "application synthesis practical example scenario case study project implementation combine real-world problem solution steps",
+    "Evaluation and Innovation": "evaluation innovation compare trade-off advantages limitations critical assessment advanced emerging research future design",
+}
+
+# JSON response schema for generating every themed quiz paper in one call
+QUIZ_BATCH_SCHEMA = types.Schema(
+    type=types.Type.OBJECT,
+    properties={
+        "quizzes": types.Schema(
+            type=types.Type.ARRAY,
+            items=types.Schema(
+                type=types.Type.OBJECT,
+                properties={
+                    "quiz_number": types.Schema(type=types.Type.INTEGER),
+                    "theme": types.Schema(type=types.Type.STRING),
+                    "focus": types.Schema(type=types.Type.STRING, description="Which aspect of the course this quiz emphasizes"),
+                    "questions": types.Schema(
+                        type=types.Type.ARRAY,
+                        min_items=10,
+                        max_items=15,
+                        items=types.Schema(
+                            type=types.Type.OBJECT,
+                            properties={
+                                "question_type": types.Schema(type=types.Type.STRING),
+                                "topic_focus": types.Schema(type=types.Type.STRING),
+                                "question": types.Schema(type=types.Type.STRING),
+                            },
+                            required=["question_type", "topic_focus", "question"],
+                        ),
+                    ),
+                },
+                required=["quiz_number", "theme", "focus", "questions"],
+            ),
+        ),
+    },
+    required=["quizzes"],
+)
+
+def build_quiz_batch_task(quiz_themes):
+    theme_lines = "\n".join(f"- Quiz Number {i}: {theme}" for i, theme in enumerate(quiz_themes, 1))
+    return f"""
+GENERATE {len(quiz_themes)} QUIZ PAPERS IN ONE RESPONSE:
+
+Quiz Themes:
+{theme_lines}
+
+Requirements for EACH quiz paper:
+- Create exactly 10-15 short questions focused specifically on that paper's theme
+- Each question is worth 1 mark only
+- Total time limit: 10-15 minutes
+- Questions should be answerable in 1-2 sentences
+- Focus on key facts, definitions, and quick applications
+- Do not repeat questions across quiz papers
+- Use the quiz numbers and themes exactly as listed above
+
+Return a JSON object with one entry in "quizzes" per theme.
+"""
+
+def format_quiz_paper(quiz_data, quiz_number, quiz_theme):
+    """Render one quiz paper from the batch JSON into the Markdown layout of a single-quiz response"""
+    questions = quiz_data.get('questions') or []
+    focus = quiz_data.get('focus') or quiz_theme.lower()
+    
+    lines = [
+        f"# Quiz Paper {quiz_number}: {quiz_theme}",
+        "",
+        "## Instructions for Students:",
+        "- Time Limit: 10-15 minutes",
+        f"- Total Marks: {len(questions)} marks (1 mark per question)",
+        f"- This quiz focuses on {focus}",
+        "- Answer each question concisely (1-2 sentences maximum)",
+        "- Quick recall and understanding are tested",
+        "",
+        "## Questions:",
+        "",
+    ]
+    for i, question in enumerate(questions, 1):
+        lines.append(f"### Question {i} (1 mark): {question.get('question_type', 'Question')} - {question.get('topic_focus', quiz_theme)}")
+        lines.append(question.get('question', '').strip())
+        lines.append("")
+        lines.append("---")
+        lines.append("")
+    return "\n".join(lines).strip() + "\n"
+
+def split_quiz_batch(response, quiz_themes):
+    """Split a batched JSON response into per-quiz Markdown, None for any missing paper"""
+    results = [None] * len(quiz_themes)
+    
+    if not response or not hasattr(response, 'text') or not response.text:
+        print("❌ No response for batched quiz generation")
+        return results
+    
+    try:
+        data = json.loads(response.text)
+    except json.JSONDecodeError as e:
+        print(f"❌ Could not parse batched quiz JSON: {e}")
+        return results
+    
+    papers = data.get('quizzes', []) if isinstance(data, dict) else []
+    for position, paper in enumerate(papers, 1):
+        quiz_number = paper.get('quiz_number') or position
+        if not 1 <= quiz_number <= len(quiz_themes) or results[quiz_number - 1] is not None:
+            continue
+        if not paper.get('questions'):
+            continue
+        results[quiz_number - 1] = format_quiz_paper(paper, quiz_number, quiz_themes[quiz_number - 1])
+    
+    print(f"✅ Batched response contained {sum(1 for r in results if r)} of {len(quiz_themes)} quiz papers")
+    return results
+
+async def generate_quiz_batch_async(client, system_prompt, combined_content, quiz_themes, user_config):
+    print(f"🔄 Generating {len(quiz_themes)} quiz papers in a single call...")
+    
+    try:
+        response = await generate_course_content_async(
+            client=client,
+            teaching_style=user_config.get('teaching_style', 'Project-Based / Hands-On'),
+            duration=user_config.get('duration', '6 weeks'),
+            difficulty_level=user_config.get('difficulty_level', 'intermediate'),
+            google_search_tool=None,
+            system_prompt=system_prompt,
+            course_content=combined_content,
+            stage="quizzes",
+            task=build_quiz_batch_task(quiz_themes),
+            response_schema=QUIZ_BATCH_SCHEMA
+        )
+        return split_quiz_batch(response, quiz_themes)
+        
+    except Exception as e:
+        print(f"❌ Error generating batched quizzes: {e}")
+        return [None] * len(quiz_themes)
+
+@traced("render.save_quiz_as_txt_and_pdf", kind="render")
 def save_quiz_as_txt_and_pdf(quiz_content, quiz_number, quiz_theme, output_dir):
     # Create clean filename
     clean_theme = quiz_theme.replace(' ', '_').replace('&', 'and').replace(':', '')
@@ -186,6 +366,7 @@ def parse_quiz_content(quiz_text):
     
     return quizzes
 
+@functools.lru_cache(maxsize=1)
 def create_pdf_styles():
     styles = getSampleStyleSheet()
     
@@ -239,62 +420,52 @@ def format_quiz_content_for_pdf(quiz_content):
     styles = create_pdf_styles()
     elements = []
     
-    lines = quiz_content.split('\n')
-    current_section = []
-    
-    for line in lines:
-        line = line.strip()
-        if not line:
+    for block in markdown_ir.parse(quiz_content):
+        kind = block[0]
+        
+        # Quiz title, main headings and questions
+        if kind == markdown_ir.HEADING:
+            level, text = block[1], escape(block[2])
+            if level == 1:
+                elements.append(Paragraph(text, styles['title']))
+                elements.append(Spacer(1, 20))
+            elif level == 2:
+                elements.append(Paragraph(text, styles['heading']))
+            else:
+                elements.append(Paragraph(text, styles['question']))
             continue
-            
-        # Quiz title
-        if line.startswith('# Quiz Paper'):
-            if current_section:
-                elements.extend(current_section)
-                current_section = []
-            elements.append(Paragraph(line.replace('# ', ''), styles['title']))
-            elements.append(Spacer(1, 20))
-            
-        # Main headings
-        elif line.startswith('## '):
-            if current_section:
-                elements.extend(current_section)
-                current_section = []
-            elements.append(Paragraph(line.replace('## ', ''), styles['heading']))
-            
-        # Sub-headings
-        elif line.startswith('### '):
-            if current_section:
-                elements.extend(current_section)
-                current_section = []
-            elements.append(Paragraph(line.replace('### ', ''), styles['question']))
-            
-        # Instructions or special content
-        elif 'Instructions' in line:
-            elements.append(Paragraph(line, styles['instructions']))
         
-        # Skip evaluation criteria and grading content (not for students)
-        elif 'Evaluation Criteria' in line or 'Answer Guidelines' in line or line.startswith('**Evaluation'):
+        if kind == markdown_ir.TABLE:
+            elements.extend(markdown_ir.render_flowables([block], {'normal': styles['normal']}))
             continue
-            
-        # Regular content
+        
+        # Every other line is its own paragraph
+        if kind == markdown_ir.PARAGRAPH:
+            lines = [("", runs) for runs in block[1]]
+        elif kind == markdown_ir.BULLET:
+            lines = [("• ", block[1])]
+        elif kind == markdown_ir.NUMBERED:
+            lines = [(f"{block[1]}. ", block[2])]
+        elif kind == markdown_ir.CODE:
+            lines = [("", ((line, markdown_ir.CODE_SPAN),)) for line in block[1] if line.strip()]
         else:
-            # Handle markdown formatting properly
-            # First handle bold formatting (**text**)
-            line = re.sub(r'\*\*(.*?)\*\*', r'<b>\1</b>', line)
-            # Then handle italic formatting (*text*)
-            line = re.sub(r'\*(.*?)\*', r'<i>\1</i>', line)
-            
-            try:
-                elements.append(Paragraph(line, styles['normal']))
-            except Exception as e:
-                # If there's still a formatting issue, use plain text
-                print(f"⚠️ PDF formatting error for line: {line[:50]}...")
-                clean_line = re.sub(r'<[^>]+>', '', line)  # Remove all HTML tags
-                elements.append(Paragraph(clean_line, styles['normal']))
+            continue
+        
+        for prefix, runs in lines:
+            text = markdown_ir.plain_text(runs)
+            # Instructions or special content
+            if 'Instructions' in text:
+                style = styles['instructions']
+            # Skip evaluation criteria and grading content (not for students)
+            elif 'Evaluation Criteria' in text or 'Answer Guidelines' in text or (runs[0][1] & markdown_ir.BOLD and text.startswith('Evaluation')):
+                continue
+            else:
+                style = styles['normal']
+            elements.append(Paragraph(prefix + markdown_ir.inline_markup(runs), style))
     
     return elements
 
+@traced("render.save_quiz_as_pdf", kind="render")
 def save_quiz_as_pdf(quiz_data, output_dir):
     # Create filename
     filename = f"Quiz_Paper_{quiz_data['number']}_{quiz_data['title'].replace(' ', '_').replace(':', '').replace('&', 'and')}.pdf"
@@ -367,7 +538,8 @@ def read_course_content_files():
     else:
         print(f"⚠️ Planner file not found: {planner_file}")
     
-    # Read from copilot folder "Inputs and Outputs"
+    # Read from copilot folder "Inputs and Outputs" (agents launched from copilot/ by start.bat),
+    # falling back to the project "Inputs and Outputs" (agents run in-process by pipeline.py)
     copilot_dir_path = pathlib.Path("copilot/Inputs and Outputs")
     
     # Try to read deep course content output
@@ -375,6 +547,8 @@ def read_course_content_files():
     if not deep_file.exists():
         # Try alternative filename
         deep_file = copilot_dir_path / "deep_agent_output.txt"
+    if not deep_file.exists():
+        deep_file = home_dir_path / "deep_agent_output.txt"
     
     if deep_file.exists():
         try:
@@ -388,7 +562,7 @@ def read_course_content_files():
     
     return planner_content, deep_content
 
-def create_quiz_system_prompt(difficulty_level):
+def create_quiz_system_prompt(difficulty_level, batched=False):
     # Define difficulty-specific standards
     difficulty_standards = {
         "foundational": '''
@@ -425,13 +599,25 @@ def create_quiz_system_prompt(difficulty_level):
     # Get the appropriate difficulty standard
     current_standard = difficulty_standards.get(difficulty_level.lower(), difficulty_standards["intermediate"])
     
+    # Batched mode asks for every themed paper in one schema-constrained JSON response
+    if batched:
+        critical_instruction = "Generate one quiz paper for EACH theme listed in the task, all in a single response. Keep every paper focused exclusively on its own theme and do not repeat questions across papers."
+        mission = "Create one focused quiz paper per requested theme (10-15 questions, 1 mark each), each based on the provided course content and designed for 10-15 minute completion time."
+        response_instruction = "Respond only with the JSON object described by the response schema. Do not include any analysis, Markdown or text outside the JSON."
+    else:
+        critical_instruction = "Generate EXACTLY ONE quiz paper only. Do not generate multiple quizzes. Focus solely on the specific theme provided in the task."
+        mission = "Create 1 focused quiz paper (10-15 questions, 1 mark each) based on the provided course content designed for 10-15 minute completion time."
+        response_instruction = """Begin your response with: "=== QUIZ GENERATION ANALYSIS ==="
+
+Then provide your comprehensive analysis of the course content followed by the three complete quiz papers."""
+    
     system_prompt = f"""You are an Expert Quiz Designer specializing in creating concise, focused assessments for quick knowledge evaluation and practice.
 
 ## 🎯 CRITICAL INSTRUCTION
-Generate EXACTLY ONE quiz paper only. Do not generate multiple quizzes. Focus solely on the specific theme provided in the task.
+{critical_instruction}
 
 ## 📋 YOUR MISSION
-Create 1 focused quiz paper (10-15 questions, 1 mark each) based on the provided course content designed for 10-15 minute completion time.
+{mission}
 
 ## ⏱️ TIME CONSTRAINT REQUIREMENTS
 - **Total Duration**: 10-15 minutes maximum
@@ -572,18 +758,20 @@ Each question must:
 
 Analyze the provided course content thoroughly, identify the most important concepts and learning objectives, then create three distinct quiz papers that will genuinely test and develop students' critical thinking, logical reasoning, and conceptual understanding.
 
-Begin your response with: "=== QUIZ GENERATION ANALYSIS ==="
-
-Then provide your comprehensive analysis of the course content followed by the three complete quiz papers."""
+{response_instruction}"""
 
     return system_prompt
 
-def generate_quizzes():
+def generate_quizzes(mode="batched"):
+    return asyncio.run(generate_quizzes_async(mode))
+
+async def generate_quizzes_async(mode="batched", client=None, user_config=None):
     print("🎯 Starting Quiz Generation Process...")
     print("="*60)
     
     # Load user configuration
-    user_config = load_user_inputs()
+    if user_config is None:
+        user_config = load_user_inputs()
     if not user_config:
         print("❌ No user configuration found. Please run the main application first.")
         return
@@ -599,36 +787,23 @@ def generate_quizzes():
         print("❌ No course content found in either directory. Please ensure content files exist.")
         return
     
-    # Create combined content input
-    combined_content = f"""
-=== COURSE PLAN CONTENT ===
-{planner_content}
-
-=== DETAILED COURSE CONTENT ===
-{deep_content}
-"""
-    
-    print(f"✅ Combined content length: {len(combined_content)} characters")
+    # Index the course once so each request only carries the relevant chunks
+    index = CourseIndex.from_texts(planner_content, deep_content)
+    print(f"✅ Indexed {len(index.chunks)} content chunks (~{index.total_tokens} tokens)")
     
-    # Initialize LLM client
-    client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+    # Initialize LLM client (reuse the caller's client when running inside the pipeline)
+    if client is None:
+        client = create_client()
     
     # Configure Google Search tool
     google_search_tool = genai.types.Tool(
         google_search=genai.types.GoogleSearch()
     )
     
-    # Create system prompt
-    system_prompt = create_quiz_system_prompt(difficulty_level)
-    
     # Define quiz themes
-    quiz_themes = [
-        "Foundation and Analysis",
-        "Application and Synthesis", 
-        "Evaluation and Innovation"
-    ]
+    quiz_themes = QUIZ_THEMES
     
-    print("\n🧠 Generating individual quiz papers...")
+    print(f"\n🧠 Generating quiz papers ({mode} mode)...")
     
     # Ensure output directory exists under Inputs and Outputs
     output_dir = os.path.join("Inputs and Outputs", "quizzes")
@@ -636,24 +811,53 @@ def generate_quizzes():
     print(f"📁 Created quizzes output directory: {output_dir}")
     
     generated_files = []
+    quiz_results = [None] * len(quiz_themes)
     
-    # Generate each quiz individually
-    for i, theme in enumerate(quiz_themes, 1):
+    # Batched mode sends the course content once for all themes
+    if mode == "batched":
+        batch_query = " ".join(THEME_QUERIES.get(theme, theme) for theme in quiz_themes)
+        quiz_results = await generate_quiz_batch_async(
+            client=client,
+            system_prompt=create_quiz_system_prompt(difficulty_level, batched=True),
+            combined_content=build_retrieved_content(index, planner_content, deep_content, batch_query),
+            quiz_themes=quiz_themes,
+            user_config=user_config
+        )
+    
+    # Generate any remaining quizzes per theme, concurrently - wall time is bounded by the slowest call
+    missing = [i for i, quiz_content in enumerate(quiz_results, 1) if not quiz_content]
+    if missing:
+        if mode == "batched":
+            print(f"⚠️ Falling back to per-theme generation for quiz(zes): {missing}")
+        system_prompt = create_quiz_system_prompt(difficulty_level)
+        print(f"🚀 Requesting {len(missing)} quiz papers concurrently...")
+        retried = await run_concurrently([
+            generate_single_quiz_async(
+                client=client,
+                google_search_tool=google_search_tool,
+                system_prompt=system_prompt,
+                combined_content=build_retrieved_content(
+                    index, planner_content, deep_content, THEME_QUERIES.get(quiz_themes[i - 1], quiz_themes[i - 1])
+                ),
+                quiz_number=i,
+                quiz_theme=quiz_themes[i - 1],
+                user_config=user_config
+            )
+            for i in missing
+        ])
+        for i, quiz_content in zip(missing, retried):
+            quiz_results[i - 1] = quiz_content
+    
+    # Save each quiz in order
+    for i, (theme, quiz_content) in enumerate(zip(quiz_themes, quiz_results), 1):
         print(f"\n{'='*40}")
-        print(f"🎯 GENERATING QUIZ {i} OF 3")
+        print(f"🎯 SAVING QUIZ {i} OF {len(quiz_themes)}")
         print(f"📋 Theme: {theme}")
         print(f"{'='*40}")
         
-        # Generate single quiz
-        quiz_content = generate_single_quiz(
-            client=client,
-            google_search_tool=google_search_tool,
-            system_prompt=system_prompt,
-            combined_content=combined_content,
-            quiz_number=i,
-            quiz_theme=theme,
-            user_config=user_config
-        )
+        if isinstance(quiz_content, Exception):
+            print(f"❌ Error generating Quiz {i}: {quiz_content}")
+            quiz_content = None
         
         if quiz_content:
             # Save as TXT and convert to PDF
@@ -698,7 +902,12 @@ def generate_quizzes():
         return None
 
 def main():
-    generated_quizzes = generate_quizzes()
+    parser = argparse.ArgumentParser(description="Generate themed quiz papers from the course content")
+    parser.add_argument("--mode", choices=["batched", "per-theme"], default="batched",
+                        help="batched: one schema-constrained call for all papers; per-theme: one call per paper")
+    args = parser.parse_args()
+    
+    generated_quizzes = generate_quizzes(args.mode)
     
     if generated_quizzes:
         print("\n🎉 Quiz generation process completed successfully!")
@@ -712,5 +921,8 @@ def main():
     else:
         print("\n❌ Quiz generation failed. Please check the error messages above.")
 
+    cache_stats = get_default_cache().stats()
+    print(f"💾 Response cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
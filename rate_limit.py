@@ -0,0 +1,265 @@
+import asyncio
+import os
+import random
+import re
+import sqlite3
+import time
+from pathlib import Path
+
+import httpx
+from google.genai import errors
+
+DEFAULT_DB_PATH = os.path.join("Inputs and Outputs", ".cache", "ratelimit.sqlite")
+DEFAULT_REQUESTS_PER_MINUTE = 10
+DEFAULT_TOKENS_PER_MINUTE = 250000
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BASE_DELAY = 2.0
+DEFAULT_MAX_DELAY = 60.0
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+RETRY_IN_RE = re.compile(r'retry in ([\d.]+)\s*s', re.IGNORECASE)
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter for requests per minute and tokens per minute
+
+    Bucket state lives in a small SQLite database and every update runs in a
+    BEGIN IMMEDIATE transaction, so the separate processes started by start.bat
+    (or a batch/orchestrator run) draw from the same quota. A 429 sets a shared
+    cooldown that makes every process wait before its next request.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE):
+        self.db_path = Path(db_path)
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, level REAL NOT NULL, updated REAL NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS cooldowns (name TEXT PRIMARY KEY, until REAL NOT NULL)")
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _refill(self, conn, name, capacity, now):
+        row = conn.execute("SELECT level, updated FROM buckets WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return capacity
+        level, updated = row
+        return min(capacity, level + (now - updated) * capacity / 60.0)
+
+    def try_acquire(self, model, tokens=0):
+        """
+        Take one request and `tokens` tokens from the model's buckets if available
+
+        Returns 0 on success, otherwise the number of seconds to wait before
+        trying again. Requests larger than a whole minute of tokens are clamped
+        so they can still go through once the bucket is full.
+        """
+        tokens = min(max(tokens, 0), self.tokens_per_minute)
+        request_bucket = f"{model}:requests"
+        token_bucket = f"{model}:tokens"
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            cooldown = conn.execute("SELECT until FROM cooldowns WHERE name = ?", (model,)).fetchone()
+            if cooldown and cooldown[0] > now:
+                conn.execute("COMMIT")
+                return cooldown[0] - now
+
+            requests_level = self._refill(conn, request_bucket, self.requests_per_minute, now)
+            tokens_level = self._refill(conn, token_bucket, self.tokens_per_minute, now)
+            if requests_level >= 1 and tokens_level >= tokens:
+                requests_level -= 1
+                tokens_level -= tokens
+                wait = 0.0
+            else:
+                request_wait = max(0.0, 1 - requests_level) * 60.0 / self.requests_per_minute
+                token_wait = max(0.0, tokens - tokens_level) * 60.0 / self.tokens_per_minute
+                wait = max(request_wait, token_wait, 0.05)
+
+            conn.executemany(
+                "INSERT INTO buckets (name, level, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET level = excluded.level, updated = excluded.updated",
+                [(request_bucket, requests_level, now), (token_bucket, tokens_level, now)],
+            )
+            conn.execute("COMMIT")
+            return wait
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def acquire(self, model, tokens=0):
+        """Block until the request fits within the shared quota"""
+        while True:
+            wait = self.try_acquire(model, tokens)
+            if wait <= 0:
+                return
+            time.sleep(wait + random.uniform(0, 0.25))
+
+    async def acquire_async(self, model, tokens=0):
+        """Async counterpart of acquire; the SQLite transaction runs in a worker thread"""
+        while True:
+            wait = await asyncio.to_thread(self.try_acquire, model, tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait + random.uniform(0, 0.25))
+
+    def reconcile(self, model, estimated_tokens, actual_tokens):
+        """Charge (or refund) the difference between estimated and actual token usage"""
+        delta = (actual_tokens or 0) - (estimated_tokens or 0)
+        if not delta:
+            return
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            name = f"{model}:tokens"
+            level = self._refill(conn, name, self.tokens_per_minute, now) - delta
+            conn.execute(
+                "INSERT INTO buckets (name, level, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET level = excluded.level, updated = excluded.updated",
+                (name, min(level, self.tokens_per_minute), now),
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def cooldown(self, model, seconds):
+        """Make every process wait `seconds` before the next request to model"""
+        conn = self._connect()
+        try:
+            until = time.time() + seconds
+            conn.execute(
+                "INSERT INTO cooldowns (name, until) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET until = MAX(until, excluded.until)",
+                (model, until),
+            )
+        finally:
+            conn.close()
+
+
+_default_limiter = None
+
+
+def get_default_limiter():
+    """Return the process-wide limiter, configured from GEMINI_RPM / GEMINI_TPM / GEMINI_RATE_LIMIT_DB"""
+    global _default_limiter
+    if _default_limiter is None:
+        _default_limiter = RateLimiter(
+            db_path=os.getenv("GEMINI_RATE_LIMIT_DB", DEFAULT_DB_PATH),
+            requests_per_minute=float(os.getenv("GEMINI_RPM", DEFAULT_REQUESTS_PER_MINUTE)),
+            tokens_per_minute=float(os.getenv("GEMINI_TPM", DEFAULT_TOKENS_PER_MINUTE)),
+        )
+    return _default_limiter
+
+
+def is_retryable(error):
+    """Return True for quota, overload and transient server or connection errors"""
+    if isinstance(error, errors.APIError):
+        return error.code in RETRYABLE_STATUS_CODES
+    # google-genai surfaces dropped connections and timeouts as httpx errors
+    return isinstance(error, (ConnectionError, TimeoutError, httpx.TransportError))
+
+
+def retry_hint(error):
+    """Return the server-suggested retry delay in seconds, if the error carries one"""
+    details = getattr(error, "details", None)
+    if isinstance(details, dict):
+        for detail in (details.get("error") or {}).get("details") or []:
+            delay = detail.get("retryDelay") if isinstance(detail, dict) else None
+            if isinstance(delay, str) and delay.endswith("s"):
+                try:
+                    return float(delay[:-1])
+                except ValueError:
+                    pass
+    match = RETRY_IN_RE.search(str(error))
+    if match:
+        return float(match.group(1))
+    return None
+
+
+def backoff_delay(attempt, error=None, base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY):
+    """Jittered exponential backoff that never undercuts the server's retry hint"""
+    delay = random.uniform(base_delay, min(max_delay, base_delay * (2 ** attempt)))
+    hint = retry_hint(error) if error is not None else None
+    if hint is not None:
+        delay = max(delay, hint + random.uniform(0, 1))
+    return delay
+
+
+def _usage_tokens(response):
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "total_token_count", None) if usage else None
+
+
+def call_with_retry(fn, model, tokens=0, max_retries=DEFAULT_MAX_RETRIES, on_retry=None, limiter=None):
+    """
+    Call fn() under the shared rate limiter, retrying transient errors
+
+    Args:
+        fn: Zero-argument callable issuing one Gemini request
+        model: Model name, selects the rate-limit buckets
+        tokens: Estimated tokens for the request (input plus expected output)
+        max_retries: Retries after the first attempt for retryable errors
+        on_retry: Optional callback(attempt, delay, error) invoked before each retry
+        limiter: RateLimiter to use, defaults to the shared limiter
+    """
+    limiter = limiter or get_default_limiter()
+    for attempt in range(max_retries + 1):
+        limiter.acquire(model, tokens)
+        try:
+            response = fn()
+        except Exception as e:
+            # A failed attempt used no tokens, so give its estimate back
+            limiter.reconcile(model, tokens, 0)
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            delay = backoff_delay(attempt, e)
+            if getattr(e, "code", None) == 429:
+                limiter.cooldown(model, delay)
+            print(f"⏳ {model} request failed ({e.__class__.__name__}: {getattr(e, 'code', '')}), retry {attempt + 1}/{max_retries} in {delay:.1f}s")
+            if on_retry:
+                on_retry(attempt + 1, delay, e)
+            time.sleep(delay)
+            continue
+        limiter.reconcile(model, tokens, _usage_tokens(response))
+        return response
+
+
+async def call_with_retry_async(fn, model, tokens=0, max_retries=DEFAULT_MAX_RETRIES, on_retry=None, limiter=None):
+    """
+    Async counterpart of call_with_retry; fn returns an awaitable
+
+    The limiter's SQLite calls run in a worker thread, so a contended
+    database does not stall the event loop.
+    """
+    limiter = limiter or get_default_limiter()
+    for attempt in range(max_retries + 1):
+        await limiter.acquire_async(model, tokens)
+        try:
+            response = await fn()
+        except Exception as e:
+            await asyncio.to_thread(limiter.reconcile, model, tokens, 0)
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            delay = backoff_delay(attempt, e)
+            if getattr(e, "code", None) == 429:
+                await asyncio.to_thread(limiter.cooldown, model, delay)
+            print(f"⏳ {model} request failed ({e.__class__.__name__}: {getattr(e, 'code', '')}), retry {attempt + 1}/{max_retries} in {delay:.1f}s")
+            if on_retry:
+                on_retry(attempt + 1, delay, e)
+            await asyncio.sleep(delay)
+            continue
+        await asyncio.to_thread(limiter.reconcile, model, tokens, _usage_tokens(response))
+        return response
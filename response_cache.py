@@ -0,0 +1,221 @@
+import hashlib
+import json
+import os
+import re
+import time
+from pathlib import Path
+
+from google.genai import types
+
+DEFAULT_CACHE_DIR = os.path.join("Inputs and Outputs", ".cache", "llm")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512 MB
+DEFAULT_MAX_AGE_SECONDS = 30 * 24 * 60 * 60  # 30 days
+EVICT_EVERY_WRITES = 100
+
+# created_at is written first, so eviction can read it without parsing the response
+CREATED_AT_RE = re.compile(rb'"created_at":\s*([0-9.eE+-]+)')
+
+
+def _update_with_part(digest, part):
+    """Feed one content part into the hash, using raw bytes for inline data"""
+    if isinstance(part, str):
+        digest.update(b"text\0")
+        digest.update(part.encode("utf-8"))
+    elif isinstance(part, types.Part) and part.inline_data is not None:
+        digest.update(b"blob\0")
+        digest.update((part.inline_data.mime_type or "").encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(part.inline_data.data or b"")
+    elif hasattr(part, "model_dump_json"):
+        digest.update(b"json\0")
+        digest.update(part.model_dump_json(exclude_none=True).encode("utf-8"))
+    else:
+        digest.update(b"repr\0")
+        digest.update(repr(part).encode("utf-8"))
+    digest.update(b"\0\0")
+
+
+def make_cache_key(model, contents, config):
+    """
+    Build a content-addressed key for a generate_content request
+
+    The key covers the model name, every content part (PDF bytes included) and
+    the full GenerateContentConfig, which carries the system instruction, the
+    tool configuration and any response schema.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"model={model}\0".encode("utf-8"))
+    for part in contents:
+        _update_with_part(digest, part)
+    if config is not None:
+        digest.update(config.model_dump_json(exclude_none=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """
+    Persistent on-disk cache of Gemini responses
+
+    Each entry is one JSON file named after its key. Entries expire
+    max_age_seconds after the created_at stored in them, both on lookup and on
+    eviction. The file modification time doubles as the last-access time: hits
+    touch the file, and eviction removes the least recently used entries until
+    the cache fits in max_bytes.
+
+    Eviction scans the whole directory, so put() only runs it when the bytes
+    written since the last scan may have pushed the cache over max_bytes, and
+    every EVICT_EVERY_WRITES writes to drop expired entries.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, max_age_seconds=DEFAULT_MAX_AGE_SECONDS):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._approx_bytes = None  # cache size as of the last eviction scan plus later writes
+        self._writes_since_evict = 0
+
+    def _entry_path(self, key):
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key):
+        """Return the cached GenerateContentResponse for key, or None"""
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError):
+            # Corrupt or half-written entry - treat as a miss and drop it
+            self._remove(path)
+            self.misses += 1
+            return None
+
+        if self._expired(entry.get("created_at", 0), time.time()):
+            self._remove(path)
+            self.evictions += 1
+            self.misses += 1
+            return None
+
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        self.hits += 1
+        return types.GenerateContentResponse.model_validate(entry["response"])
+
+    def put(self, key, response, model=None):
+        """Store a response under key and enforce the size/age limits"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entry = {
+            "created_at": time.time(),
+            "key": key,
+            "model": model,
+            "response": response.model_dump(mode="json", exclude_none=True),
+        }
+        path = self._entry_path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        self.writes += 1
+        self._writes_since_evict += 1
+        if self._approx_bytes is not None:
+            self._approx_bytes += os.path.getsize(path)
+        if (self._approx_bytes is None or self._approx_bytes > self.max_bytes
+                or self._writes_since_evict >= EVICT_EVERY_WRITES):
+            self.evict()
+
+    def _expired(self, created_at, now):
+        return now - created_at > self.max_age_seconds
+
+    @staticmethod
+    def _created_at(path):
+        """created_at of an entry, read from the start of the file (0 if unreadable)"""
+        try:
+            with open(path, 'rb') as f:
+                match = CREATED_AT_RE.search(f.read(256))
+                if match is None:  # entries written before created_at came first
+                    f.seek(0)
+                    return float(json.load(f).get("created_at", 0))
+            return float(match.group(1))
+        except (OSError, ValueError):
+            return 0
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones until under max_bytes"""
+        self._writes_since_evict = 0
+        if not self.cache_dir.exists():
+            self._approx_bytes = 0
+            return
+        now = time.time()
+        entries = []
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if self._expired(self._created_at(path), now):
+                self._remove(path)
+                self.evictions += 1
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            self.evictions += 1
+            total -= size
+        self._approx_bytes = total
+
+    def clear(self):
+        """Remove every entry from the cache"""
+        if self.cache_dir.exists():
+            for path in self.cache_dir.glob("*.json"):
+                self._remove(path)
+
+    def stats(self):
+        """Return hit/miss counters for this process"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+_default_cache = None
+
+
+def get_default_cache():
+    """Return the process-wide cache, configured from LLM_CACHE_* environment variables"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResponseCache(
+            cache_dir=os.getenv("LLM_CACHE_DIR", DEFAULT_CACHE_DIR),
+            max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+            max_age_seconds=float(os.getenv("LLM_CACHE_MAX_AGE_SECONDS", DEFAULT_MAX_AGE_SECONDS)),
+        )
+    return _default_cache
+
+
+def cache_mode():
+    """Return the LLM_CACHE mode: 'on' (default), 'off' to bypass, or 'refresh' to overwrite"""
+    mode = os.getenv("LLM_CACHE", "on").strip().lower()
+    return mode if mode in ("on", "off", "refresh") else "on"
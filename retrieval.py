@@ -0,0 +1,238 @@
+import os
+import re
+
+import numpy as np
+
+DEFAULT_TOKEN_BUDGET = 8000
+MAX_CHUNK_TOKENS = 600
+
+WEEK_HEADING_RE = re.compile(r'^(?:#{1,6}\s*Week\s+(\d+)\b|=== PROCESSING WEEK (\d+) ===)', re.IGNORECASE)
+HEADING_RE = re.compile(r'^#{1,6}\s+\S')
+TERM_RE = re.compile(r'[a-z0-9]+')
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have how in into is it its of on or that the their this to was were what
+when which why will with you your can should each this these those than then there also more most such
+""".split())
+
+
+def estimate_tokens(text):
+    """Cheap offline token estimate (~4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+def tokenize(text):
+    return [term for term in TERM_RE.findall(text.lower()) if term not in STOPWORDS and len(term) > 1]
+
+
+class Chunk:
+    """A retrievable piece of course content: one section of one week (or of the plan)"""
+
+    __slots__ = ("position", "source", "week", "heading", "text", "tokens")
+
+    def __init__(self, position, source, week, heading, text):
+        self.position = position
+        self.source = source
+        self.week = week
+        self.heading = heading
+        self.text = text
+        self.tokens = estimate_tokens(text)
+
+
+def _split_long_section(lines, max_tokens):
+    """Split a section's lines into pieces of at most ~max_tokens, breaking on blank lines"""
+    pieces, current, size = [], [], 0
+    for line in lines:
+        line_tokens = estimate_tokens(line)
+        if current and size + line_tokens > max_tokens and (not line.strip() or size > 2 * max_tokens):
+            pieces.append(current)
+            current, size = [], 0
+        current.append(line)
+        size += line_tokens
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_course_text(text, source="deep", max_chunk_tokens=MAX_CHUNK_TOKENS):
+    """
+    Split course text into week/section chunks
+
+    A new week starts at '# Week N' style headings or '=== PROCESSING WEEK N ==='
+    markers; within a week every Markdown heading starts a new section. Sections
+    longer than max_chunk_tokens are split further on paragraph boundaries.
+    """
+    sections = []  # (week, heading, lines)
+    week = None
+    heading = ""
+    lines = []
+
+    def flush():
+        if any(line.strip() for line in lines):
+            sections.append((week, heading, list(lines)))
+        lines.clear()
+
+    for line in text.split('\n'):
+        stripped = line.strip()
+        week_match = WEEK_HEADING_RE.match(stripped)
+        if week_match:
+            flush()
+            week = int(week_match.group(1) or week_match.group(2))
+            heading = stripped.lstrip('#= ').rstrip('= ')
+        elif HEADING_RE.match(stripped):
+            flush()
+            heading = stripped.lstrip('# ')
+        lines.append(line)
+    flush()
+
+    chunks = []
+    for week, heading, section_lines in sections:
+        for piece in _split_long_section(section_lines, max_chunk_tokens):
+            piece_text = '\n'.join(piece).strip()
+            if piece_text:
+                chunks.append(Chunk(len(chunks), source, week, heading, piece_text))
+    return chunks
+
+
+class CourseIndex:
+    """
+    BM25 index over course chunks
+
+    Postings are stored as flat NumPy arrays sorted by term id, so scoring a
+    query touches only the postings of its terms.
+    """
+
+    def __init__(self, chunks, k1=1.5, b=0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self.vocabulary = {}
+
+        term_ids, doc_ids, term_freqs = [], [], []
+        doc_lengths = np.zeros(len(chunks), dtype=np.float64)
+        for doc_id, chunk in enumerate(chunks):
+            terms = [self.vocabulary.setdefault(term, len(self.vocabulary)) for term in tokenize(chunk.heading + "\n" + chunk.text)]
+            doc_lengths[doc_id] = len(terms)
+            if not terms:
+                continue
+            ids, counts = np.unique(np.asarray(terms, dtype=np.int64), return_counts=True)
+            term_ids.append(ids)
+            doc_ids.append(np.full(len(ids), doc_id, dtype=np.int64))
+            term_freqs.append(counts.astype(np.float64))
+
+        if term_ids:
+            term_ids = np.concatenate(term_ids)
+            doc_ids = np.concatenate(doc_ids)
+            term_freqs = np.concatenate(term_freqs)
+        else:
+            term_ids = doc_ids = np.zeros(0, dtype=np.int64)
+            term_freqs = np.zeros(0, dtype=np.float64)
+
+        order = np.argsort(term_ids, kind='stable')
+        self._posting_docs = doc_ids[order]
+        self._posting_freqs = term_freqs[order]
+        self._offsets = np.searchsorted(term_ids[order], np.arange(len(self.vocabulary) + 1))
+
+        document_freqs = np.diff(self._offsets).astype(np.float64)
+        n_docs = max(len(chunks), 1)
+        self._idf = np.log(1.0 + (n_docs - document_freqs + 0.5) / (document_freqs + 0.5))
+        self._doc_lengths = doc_lengths
+        self._avg_length = doc_lengths.mean() if len(chunks) else 0.0
+
+    @classmethod
+    def from_texts(cls, planner_content="", deep_content=""):
+        """Build an index over the course plan and the deep week-by-week content"""
+        chunks = chunk_course_text(planner_content, source="plan") if planner_content else []
+        if deep_content:
+            for chunk in chunk_course_text(deep_content, source="deep"):
+                chunk.position = len(chunks)
+                chunks.append(chunk)
+        return cls(chunks)
+
+    @property
+    def total_tokens(self):
+        return sum(chunk.tokens for chunk in self.chunks)
+
+    def scores(self, query):
+        """BM25 score of every chunk for the query"""
+        scores = np.zeros(len(self.chunks), dtype=np.float64)
+        if not self.chunks or self._avg_length == 0:
+            return scores
+        norm = self.k1 * (1.0 - self.b + self.b * self._doc_lengths / self._avg_length)
+        for term in set(tokenize(query)):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, end = self._offsets[term_id], self._offsets[term_id + 1]
+            docs = self._posting_docs[start:end]
+            tf = self._posting_freqs[start:end]
+            scores[docs] += self._idf[term_id] * tf * (self.k1 + 1.0) / (tf + norm[docs])
+        return scores
+
+    def search(self, query, top_k=None, token_budget=None, per_week=True):
+        """
+        Return the best chunks for the query, in course order
+
+        Args:
+            query: Free-text query
+            top_k: Maximum number of chunks to return
+            token_budget: Maximum estimated tokens across the returned chunks
+            per_week: Take the best chunk of every week first so the selection
+                      covers the whole course before deepening any one week
+        """
+        scores = self.scores(query)
+        ranked = list(np.argsort(-scores, kind='stable'))
+
+        if per_week:
+            best_per_week = {}
+            for doc_id in ranked:
+                week = self.chunks[doc_id].week
+                if week is not None and week not in best_per_week:
+                    best_per_week[week] = doc_id
+            first = sorted(best_per_week.values(), key=lambda doc_id: -scores[doc_id])
+            first_set = set(first)
+            ranked = first + [doc_id for doc_id in ranked if doc_id not in first_set]
+
+        selected, used = [], 0
+        for doc_id in ranked:
+            chunk = self.chunks[doc_id]
+            if token_budget is not None and used + chunk.tokens > token_budget:
+                continue
+            selected.append(chunk)
+            used += chunk.tokens
+            if top_k is not None and len(selected) >= top_k:
+                break
+        return sorted(selected, key=lambda chunk: chunk.position)
+
+
+def get_token_budget():
+    return int(os.getenv("RETRIEVAL_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET))
+
+
+def format_combined_content(planner_content, deep_content):
+    """Combine the course plan and deep content the way the generators send them"""
+    return f"""
+=== COURSE PLAN CONTENT ===
+{planner_content}
+
+=== DETAILED COURSE CONTENT ===
+{deep_content}
+"""
+
+
+def build_retrieved_content(index, planner_content, deep_content, query, token_budget=None):
+    """
+    Return the combined course content for a prompt, limited to the chunks
+    most relevant to query when the full content exceeds the token budget
+    """
+    if token_budget is None:
+        token_budget = get_token_budget()
+    if index.total_tokens <= token_budget:
+        return format_combined_content(planner_content, deep_content)
+
+    chunks = index.search(query, token_budget=token_budget)
+    plan_text = "\n\n".join(chunk.text for chunk in chunks if chunk.source == "plan")
+    deep_text = "\n\n".join(chunk.text for chunk in chunks if chunk.source == "deep")
+    content = format_combined_content(plan_text, deep_text)
+    print(f"🔎 Retrieved {len(chunks)}/{len(index.chunks)} chunks "
+          f"(~{sum(chunk.tokens for chunk in chunks)} of ~{index.total_tokens} tokens)")
+    return content
@@ -0,0 +1,419 @@
+"""
+Long-running HTTP service for course generation
+
+Keeps one Gemini client, the imported stage and ADK/agent modules and the
+flashcard fonts and PDF styles warm between jobs (all loaded at startup), and
+runs submitted jobs through the pipeline DAG from a bounded queue. Jobs run one
+at a time: the pipeline writes to "Inputs and Outputs" relative to the working
+directory, which is per process. Lines a job prints become "log" events of that
+job only; output from the HTTP handlers goes to the console.
+
+    POST /jobs                        submit {user_name, difficulty_level, duration,
+                                      teaching_style, curriculum | curriculum_base64,
+                                      stages?, force?} -> 202 {"id": ...}
+    GET  /jobs                        list jobs
+    GET  /jobs/<id>                   job status, stage results and artifacts
+    GET  /jobs/<id>/events            progress as server-sent events (stages, logs
+                                      and the agents' week, tool call and token events)
+    GET  /jobs/<id>/artifacts/<path>  download a generated file
+
+Run it against the replay backend (COPILOT_GENAI_MODE=replay) to test without
+network access or quota.
+
+Usage: python service.py [--host 127.0.0.1] [--port 8080] [--queue-size 8]
+"""
+import argparse
+import asyncio
+import base64
+import contextvars
+import importlib
+import json
+import mimetypes
+import os
+import shutil
+import sys
+import time
+import uuid
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+from dotenv import load_dotenv
+
+from batch import IO_DIR, PROJECT_ROOT, shared_environment
+from progress import TOKENS, TOOL_CALL, WEEK_COMPLETED, WEEK_STARTED
+
+DEFAULT_JOBS_DIR = PROJECT_ROOT / IO_DIR / "service" / "jobs"
+DEFAULT_QUEUE_SIZE = 8
+MAX_BODY_BYTES = 64 * 1024 * 1024
+REQUIRED_FIELDS = ("difficulty_level", "duration", "teaching_style")
+# Modules the pipeline stages import lazily, loaded once at startup instead of on the first job
+STAGE_MODULES = ("copilot.main", "copilot.deep_main", "course_material", "quizzes", "flash_cards")
+
+# JobLog of the job running in the current context; tasks and to_thread calls started by the job inherit it
+current_job_log = contextvars.ContextVar("current_job_log", default=None)
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class JobLog:
+    """Forwards each line a job prints as a "log" event of that job"""
+
+    def __init__(self, service, job):
+        self.service = service
+        self.job = job
+        self.buffer = ""
+
+    def write(self, text):
+        self.buffer += text
+        while "\n" in self.buffer:
+            line, self.buffer = self.buffer.split("\n", 1)
+            if line.strip():
+                self.service.emit_threadsafe(self.job, {"type": "log", "line": line})
+
+
+class ContextStdout:
+    """
+    sys.stdout for the service, installed once at startup
+
+    Everything still reaches the console; text written from within a job's
+    context is also passed to that job's JobLog, so prints from request
+    handlers never end up in a job's events.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, text):
+        self.stream.write(text)
+        log = current_job_log.get()
+        if log is not None:
+            log.write(text)
+        return len(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class JobProgress:
+    """Progress sink for the agent stages that forwards their week, tool call and token events as job events"""
+
+    # The pipeline already reports every stage's start and finish
+    FORWARDED = (WEEK_STARTED, WEEK_COMPLETED, TOOL_CALL, TOKENS)
+
+    def __init__(self, service, job):
+        self.service = service
+        self.job = job
+
+    async def emit(self, event):
+        if event["type"] in self.FORWARDED:
+            self.service.emit(self.job, event)
+
+
+class CourseService:
+    def __init__(self, jobs_dir=DEFAULT_JOBS_DIR, queue_size=DEFAULT_QUEUE_SIZE):
+        self.jobs_dir = Path(jobs_dir).resolve()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.jobs = {}
+        self.loop = asyncio.get_running_loop()
+        self.pipeline = importlib.import_module("pipeline")
+        self.client = self.pipeline.llm.create_client()
+        self.warm_up()
+
+    def warm_up(self):
+        """Import the stage modules and build their fonts and PDF styles before the first job"""
+        modules = {name: importlib.import_module(name) for name in STAGE_MODULES}
+        modules["course_material"].create_pdf_styles()
+        modules["quizzes"].create_pdf_styles()
+        modules["flash_cards"].load_fonts()
+
+    # --- events ---------------------------------------------------------
+
+    def emit(self, job, event):
+        event = {"time": time.time(), **event}
+        job["events"].append(event)
+        job["changed"].set()
+        job["changed"] = asyncio.Event()
+
+    def emit_threadsafe(self, job, event):
+        self.loop.call_soon_threadsafe(self.emit, job, event)
+
+    # --- jobs -----------------------------------------------------------
+
+    def submit(self, request):
+        if not isinstance(request, dict):
+            raise HTTPError(400, "body must be a JSON object")
+        missing = [field for field in REQUIRED_FIELDS if not request.get(field)]
+        if missing:
+            raise HTTPError(400, f"missing {', '.join(missing)}")
+        if not request.get("curriculum") and not request.get("curriculum_base64"):
+            raise HTTPError(400, "missing curriculum or curriculum_base64")
+        for field in ("stages", "force"):
+            if request.get(field) is not None and not isinstance(request[field], list):
+                raise HTTPError(400, f"{field} must be a list of stage names")
+        stage_names = [stage.name for stage in self.pipeline.STAGES]
+        for name in (request.get("stages") or []) + [n for n in request.get("force") or [] if n != "all"]:
+            if name not in stage_names:
+                raise HTTPError(400, f"unknown stage {name!r}")
+
+        job_id = uuid.uuid4().hex[:12]
+        job_dir = self.jobs_dir / job_id
+        io_dir = job_dir / IO_DIR
+        io_dir.mkdir(parents=True, exist_ok=True)
+        curriculum_path = io_dir / "curriculum.pdf"
+        if request.get("curriculum_base64"):
+            curriculum_path.write_bytes(base64.b64decode(request["curriculum_base64"]))
+        else:
+            source = Path(request["curriculum"])
+            if not source.is_file():
+                shutil.rmtree(job_dir, ignore_errors=True)
+                raise HTTPError(400, f"curriculum not found: {source}")
+            shutil.copyfile(source, curriculum_path)
+
+        user_name = request.get("user_name") or "service"
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "dir": job_dir,
+            "user_config": {
+                "user_name": user_name,
+                "user_id": request.get("user_id") or user_name,
+                "difficulty_level": request["difficulty_level"],
+                "duration": request["duration"],
+                "teaching_style": request["teaching_style"],
+            },
+            "stages": request.get("stages"),
+            "force": request.get("force"),
+            "created": time.time(),
+            "started": None,
+            "finished": None,
+            "results": {},
+            "events": [],
+            "changed": asyncio.Event(),
+        }
+        with open(job_dir / "user_config.json", 'w', encoding='utf-8') as f:
+            json.dump(job["user_config"], f, indent=2)
+
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise HTTPError(503, "job queue is full, try again later")
+        self.jobs[job_id] = job
+        self.emit(job, {"type": "queued", "position": self.queue.qsize()})
+        return job
+
+    async def run_job(self, job):
+        job["status"] = "running"
+        job["started"] = time.time()
+        self.emit(job, {"type": "started"})
+
+        previous_cwd = os.getcwd()
+        previous_io_dir = os.environ.get("COPILOT_IO_DIR")
+        os.chdir(job["dir"])
+        os.environ["COPILOT_IO_DIR"] = str(job["dir"] / IO_DIR)
+        log_token = current_job_log.set(JobLog(self, job))
+        try:
+            context = {"client": self.client, "user_config": job["user_config"], "progress": JobProgress(self, job)}
+            job["results"] = await self.pipeline.run_dag(
+                self.pipeline.STAGES, context, job["stages"], job["force"],
+                on_event=lambda event: self.emit(job, event),
+            )
+            ok = all(result["status"] in self.pipeline.DONE_STATUSES for result in job["results"].values())
+            job["status"] = "done" if ok else "failed"
+        except Exception as e:
+            job["status"] = "failed"
+            self.emit(job, {"type": "error", "error": f"{e.__class__.__name__}: {e}"})
+        finally:
+            current_job_log.reset(log_token)
+            os.chdir(previous_cwd)
+            if previous_io_dir is None:
+                os.environ.pop("COPILOT_IO_DIR", None)
+            else:
+                os.environ["COPILOT_IO_DIR"] = previous_io_dir
+            job["finished"] = time.time()
+            self.emit(job, {"type": "finished", "status": job["status"], "artifacts": self.artifacts(job)})
+
+    async def worker(self):
+        while True:
+            job = await self.queue.get()
+            try:
+                await self.run_job(job)
+            finally:
+                self.queue.task_done()
+
+    def artifacts(self, job):
+        """Generated files of a job, relative to its Inputs and Outputs directory"""
+        io_dir = job["dir"] / IO_DIR
+        files = []
+        for path in sorted(io_dir.rglob("*")):
+            relative = path.relative_to(io_dir)
+            if path.is_file() and not any(part.startswith(".") for part in relative.parts):
+                files.append(relative.as_posix())
+        return files
+
+    def describe(self, job):
+        return {
+            "id": job["id"],
+            "status": job["status"],
+            "user_config": job["user_config"],
+            "created": job["created"],
+            "started": job["started"],
+            "finished": job["finished"],
+            "results": job["results"],
+            "artifacts": self.artifacts(job),
+        }
+
+    def get_job(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise HTTPError(404, f"unknown job {job_id}")
+        return job
+
+    # --- HTTP -----------------------------------------------------------
+
+    async def handle_connection(self, reader, writer):
+        try:
+            method, path, headers, body = await read_request(reader)
+            await self.route(method, path, body, writer)
+        except HTTPError as e:
+            await send_json(writer, e.status, {"error": e.message})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            await send_json(writer, 500, {"error": f"{e.__class__.__name__}: {e}"})
+        finally:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    async def route(self, method, path, body, writer):
+        parts = [unquote(part) for part in urlsplit(path).path.strip("/").split("/") if part]
+        if parts == ["jobs"] and method == "POST":
+            try:
+                request = json.loads(body or b"{}")
+            except ValueError:
+                raise HTTPError(400, "body must be JSON")
+            job = self.submit(request)
+            await send_json(writer, 202, {"id": job["id"], "status": job["status"]})
+        elif parts == ["jobs"] and method == "GET":
+            await send_json(writer, 200, [self.describe(job) for job in self.jobs.values()])
+        elif len(parts) == 2 and parts[0] == "jobs" and method == "GET":
+            await send_json(writer, 200, self.describe(self.get_job(parts[1])))
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "events" and method == "GET":
+            await self.stream_events(self.get_job(parts[1]), writer)
+        elif len(parts) >= 4 and parts[0] == "jobs" and parts[2] == "artifacts" and method == "GET":
+            await self.send_artifact(self.get_job(parts[1]), "/".join(parts[3:]), writer)
+        else:
+            raise HTTPError(404, "not found")
+
+    async def stream_events(self, job, writer):
+        """Send every event of the job so far, then new ones as they happen, as SSE"""
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\nConnection: close\r\n\r\n")
+        await writer.drain()
+        sent = 0
+        while True:
+            changed = job["changed"]
+            while sent < len(job["events"]):
+                event = job["events"][sent]
+                writer.write(f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n".encode("utf-8"))
+                sent += 1
+            await writer.drain()
+            if job["status"] in ("done", "failed") and sent >= len(job["events"]):
+                return
+            await changed.wait()
+
+    async def send_artifact(self, job, relative_path, writer):
+        io_dir = (job["dir"] / IO_DIR).resolve()
+        path = (io_dir / relative_path).resolve()
+        if io_dir not in path.parents or not path.is_file():
+            raise HTTPError(404, f"no artifact {relative_path}")
+        content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        data = await asyncio.to_thread(path.read_bytes)
+        await send_response(writer, 200, data, content_type)
+
+
+async def read_request(reader):
+    request_line = (await reader.readline()).decode("latin-1").strip()
+    if not request_line:
+        raise ConnectionError("empty request")
+    try:
+        method, path, _ = request_line.split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "malformed request line")
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1")
+        if line in ("\r\n", "\n", ""):
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HTTPError(400, "malformed Content-Length header")
+    if length < 0:
+        raise HTTPError(400, "malformed Content-Length header")
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, "request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), path, headers, body
+
+
+REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+           500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+async def send_response(writer, status, body, content_type):
+    head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n")
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+
+
+async def send_json(writer, status, payload):
+    await send_response(writer, status, json.dumps(payload, default=str).encode("utf-8"), "application/json")
+
+
+async def serve(host, port, queue_size, jobs_dir):
+    if not isinstance(sys.stdout, ContextStdout):
+        sys.stdout = ContextStdout(sys.stdout)
+    service = CourseService(jobs_dir, queue_size)
+    worker = asyncio.create_task(service.worker())
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    print(f"🚀 Course generation service listening on http://{host}:{port} (queue size {queue_size})")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        worker.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the course generation HTTP service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE, help="maximum queued jobs")
+    parser.add_argument("--jobs-dir", default=str(DEFAULT_JOBS_DIR), help="where job directories are created")
+    args = parser.parse_args()
+
+    load_dotenv(dotenv_path=PROJECT_ROOT / ".env", override=False)
+    # Caches and the rate limiter must not follow the per-job working directory
+    os.environ.update(shared_environment())
+    try:
+        asyncio.run(serve(args.host, args.port, args.queue_size, args.jobs_dir))
+    except KeyboardInterrupt:
+        print("\n👋 Service stopped")
+
+
+if __name__ == "__main__":
+    main()
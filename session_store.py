@@ -0,0 +1,284 @@
+"""
+Durable ADK sessions and week checkpoints for long agent runs
+
+SqliteSessionService is a write-through InMemorySessionService: every session,
+event and state change is also stored in SQLite, so a session survives the
+process and can be read back (e.g. its output_key state) after a crash.
+
+WeekCheckpoints stores each week of deep content as soon as its
+"=== WEEK N COMPLETED ===" marker is streamed, keyed by a run key (the agent
+tree's hash). A restarted run reads the completed weeks back and resumes from
+the first incomplete one instead of regenerating the whole course.
+"""
+import json
+import os
+import re
+import sqlite3
+import time
+from pathlib import Path
+
+from google.adk.events import Event
+from google.adk.sessions import InMemorySessionService, Session
+
+DEFAULT_DB_PATH = os.path.join("Inputs and Outputs", ".cache", "sessions.sqlite")
+
+PROCESSING_RE = re.compile(r'=== PROCESSING WEEK (\d+) ===')
+COMPLETED_RE = re.compile(r'=== WEEK (\d+) COMPLETED ===')
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS sessions (app_name TEXT NOT NULL, user_id TEXT NOT NULL, id TEXT NOT NULL,"
+    " state TEXT NOT NULL, last_update_time REAL NOT NULL, PRIMARY KEY (app_name, user_id, id))",
+    "CREATE TABLE IF NOT EXISTS events (app_name TEXT NOT NULL, user_id TEXT NOT NULL, session_id TEXT NOT NULL,"
+    " seq INTEGER NOT NULL, event TEXT NOT NULL, PRIMARY KEY (app_name, user_id, session_id, seq))",
+    "CREATE TABLE IF NOT EXISTS app_states (app_name TEXT PRIMARY KEY, state TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS user_states (app_name TEXT NOT NULL, user_id TEXT NOT NULL, state TEXT NOT NULL,"
+    " PRIMARY KEY (app_name, user_id))",
+    "CREATE TABLE IF NOT EXISTS runs (run_key TEXT PRIMARY KEY, status TEXT NOT NULL, session_id TEXT,"
+    " attempts INTEGER NOT NULL, updated REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS week_checkpoints (run_key TEXT NOT NULL, week INTEGER NOT NULL,"
+    " content TEXT NOT NULL, completed_at REAL NOT NULL, PRIMARY KEY (run_key, week))",
+)
+
+
+def _connect(db_path):
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+def _init_db(db_path):
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = _connect(db_path)
+    try:
+        for statement in SCHEMA:
+            conn.execute(statement)
+    finally:
+        conn.close()
+    return db_path
+
+
+class SqliteSessionService(InMemorySessionService):
+    """
+    InMemorySessionService that writes every change through to SQLite
+
+    Sessions are loaded from the database on first use, so a new process (or
+    a resumed run) sees the sessions, events and state of earlier ones.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        super().__init__()
+        self.db_path = _init_db(db_path)
+
+    def _load_states(self, conn, app_name, user_id):
+        if app_name not in self.app_state:
+            row = conn.execute("SELECT state FROM app_states WHERE app_name = ?", (app_name,)).fetchone()
+            if row:
+                self.app_state[app_name] = json.loads(row[0])
+        if user_id not in self.user_state.get(app_name, {}):
+            row = conn.execute("SELECT state FROM user_states WHERE app_name = ? AND user_id = ?",
+                               (app_name, user_id)).fetchone()
+            if row:
+                self.user_state.setdefault(app_name, {})[user_id] = json.loads(row[0])
+
+    def _load_session(self, conn, app_name, user_id, session_id, row=None):
+        if session_id in self.sessions.get(app_name, {}).get(user_id, {}):
+            return
+        if row is None:
+            row = conn.execute("SELECT state, last_update_time FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+                               (app_name, user_id, session_id)).fetchone()
+            if row is None:
+                return
+        events = [
+            Event.model_validate_json(event)
+            for (event,) in conn.execute(
+                "SELECT event FROM events WHERE app_name = ? AND user_id = ? AND session_id = ? ORDER BY seq",
+                (app_name, user_id, session_id))
+        ]
+        self.sessions.setdefault(app_name, {}).setdefault(user_id, {})[session_id] = Session(
+            app_name=app_name, user_id=user_id, id=session_id,
+            state=json.loads(row[0]), last_update_time=row[1], events=events,
+        )
+
+    def _load(self, app_name, user_id, session_id):
+        conn = _connect(self.db_path)
+        try:
+            self._load_states(conn, app_name, user_id)
+            if session_id:
+                self._load_session(conn, app_name, user_id, session_id.strip())
+        finally:
+            conn.close()
+
+    def _save(self, app_name, user_id, session_id, new_events=()):
+        """Store the session row, its app/user state and any new (seq, event) pairs in one transaction"""
+        session = self.sessions[app_name][user_id][session_id]
+        conn = _connect(self.db_path)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?)",
+                         (app_name, user_id, session_id, json.dumps(session.state, default=str), session.last_update_time))
+            for seq, event in new_events:
+                conn.execute("INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?)",
+                             (app_name, user_id, session_id, seq, event.model_dump_json(exclude_none=True)))
+            if app_name in self.app_state:
+                conn.execute("INSERT OR REPLACE INTO app_states VALUES (?, ?)",
+                             (app_name, json.dumps(self.app_state[app_name], default=str)))
+            if user_id in self.user_state.get(app_name, {}):
+                conn.execute("INSERT OR REPLACE INTO user_states VALUES (?, ?, ?)",
+                             (app_name, user_id, json.dumps(self.user_state[app_name][user_id], default=str)))
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    async def create_session(self, *, app_name, user_id, state=None, session_id=None):
+        # Loading first makes an existing stored session id raise AlreadyExistsError as usual
+        self._load(app_name, user_id, session_id)
+        session = await super().create_session(app_name=app_name, user_id=user_id, state=state, session_id=session_id)
+        self._save(app_name, user_id, session.id)
+        return session
+
+    async def get_session(self, *, app_name, user_id, session_id, config=None):
+        self._load(app_name, user_id, session_id)
+        return await super().get_session(app_name=app_name, user_id=user_id, session_id=session_id, config=config)
+
+    async def list_sessions(self, *, app_name, user_id=None):
+        conn = _connect(self.db_path)
+        try:
+            query = "SELECT user_id, id, state, last_update_time FROM sessions WHERE app_name = ?"
+            params = (app_name,) if user_id is None else (app_name, user_id)
+            if user_id is not None:
+                query += " AND user_id = ?"
+            for row in conn.execute(query, params).fetchall():
+                self._load_states(conn, app_name, row[0])
+                self._load_session(conn, app_name, row[0], row[1], row=row[2:])
+        finally:
+            conn.close()
+        return await super().list_sessions(app_name=app_name, user_id=user_id)
+
+    async def delete_session(self, *, app_name, user_id, session_id):
+        await super().delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        conn = _connect(self.db_path)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                         (app_name, user_id, session_id))
+            conn.execute("DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+                         (app_name, user_id, session_id))
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    async def append_event(self, session, event):
+        self._load(session.app_name, session.user_id, session.id)
+        stored = self.sessions.get(session.app_name, {}).get(session.user_id, {}).get(session.id)
+        before = len(stored.events) if stored is not None else 0
+        event = await super().append_event(session=session, event=event)
+        # Partial and re-delivered events are not stored by the in-memory service either
+        stored = self.sessions[session.app_name][session.user_id][session.id]
+        if len(stored.events) > before:
+            self._save(session.app_name, session.user_id, session.id,
+                       [(seq, stored.events[seq]) for seq in range(before, len(stored.events))])
+        return event
+
+
+class WeekCheckpoints:
+    """
+    Completed weeks of a run, stored as soon as they are streamed
+
+    A run is identified by run_key. Its status is "running" until
+    finish_run() marks it "complete"; a complete run starts over on the next
+    start_run(), an incomplete one keeps its weeks so it can be resumed.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = _init_db(db_path)
+
+    def get_run(self, run_key):
+        conn = _connect(self.db_path)
+        try:
+            row = conn.execute("SELECT status, session_id, attempts, updated FROM runs WHERE run_key = ?",
+                               (run_key,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        return {"status": row[0], "session_id": row[1], "attempts": row[2], "updated": row[3]}
+
+    def start_run(self, run_key, session_id, reset=False):
+        """Record a new attempt at run_key, dropping its checkpoints if reset"""
+        conn = _connect(self.db_path)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT attempts FROM runs WHERE run_key = ?", (run_key,)).fetchone()
+            attempts = 1 if row is None or reset else row[0] + 1
+            if reset:
+                conn.execute("DELETE FROM week_checkpoints WHERE run_key = ?", (run_key,))
+            conn.execute("INSERT OR REPLACE INTO runs VALUES (?, 'running', ?, ?, ?)",
+                         (run_key, session_id, attempts, time.time()))
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return attempts
+
+    def finish_run(self, run_key):
+        conn = _connect(self.db_path)
+        try:
+            conn.execute("UPDATE runs SET status = 'complete', updated = ? WHERE run_key = ?", (time.time(), run_key))
+        finally:
+            conn.close()
+
+    def save_week(self, run_key, week, content):
+        """Store (or replace, if the loop regenerated it) one completed week"""
+        conn = _connect(self.db_path)
+        try:
+            conn.execute("INSERT OR REPLACE INTO week_checkpoints VALUES (?, ?, ?, ?)",
+                         (run_key, week, content, time.time()))
+        finally:
+            conn.close()
+
+    def completed_weeks(self, run_key):
+        """Return {week_number: content} for every checkpointed week of the run"""
+        conn = _connect(self.db_path)
+        try:
+            rows = conn.execute("SELECT week, content FROM week_checkpoints WHERE run_key = ? ORDER BY week",
+                                (run_key,)).fetchall()
+        finally:
+            conn.close()
+        return dict(rows)
+
+
+class WeekTracker:
+    """
+    Split streamed text into completed weeks
+
+    feed() returns [(week_number, week_text)] for every
+    "=== WEEK N COMPLETED ===" marker seen so far. Only the text after the last
+    marker is kept, so memory stays bounded by one week even on long runs.
+    """
+
+    def __init__(self):
+        self._pending = ""
+
+    def feed(self, text):
+        self._pending += text
+        completed = []
+        end = 0
+        for match in COMPLETED_RE.finditer(self._pending):
+            week = int(match.group(1))
+            segment = self._pending[end:match.end()]
+            # Start the week at its own PROCESSING marker when present, dropping chatter before it
+            starts = [m.start() for m in PROCESSING_RE.finditer(segment) if int(m.group(1)) == week]
+            if starts:
+                segment = segment[starts[-1]:]
+            completed.append((week, segment.strip() + "\n"))
+            end = match.end()
+        self._pending = self._pending[end:]
+        return completed
+
+
+def first_incomplete_week(completed):
+    """Lowest week number (from 1) that has no checkpoint"""
+    week = 1
+    while week in completed:
+        week += 1
+    return week
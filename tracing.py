@@ -0,0 +1,244 @@
+"""
+Structured trace spans for LLM calls, agent runs, rendering and pipeline stages
+
+Spans are written as JSON lines to Inputs and Outputs/traces/<trace_id>.jsonl
+(one file per process, or per COPILOT_TRACE_ID when a parent process sets it).
+Nesting follows contextvars, so spans opened inside asyncio tasks and
+asyncio.to_thread calls are parented correctly. Set COPILOT_TRACE=off to
+disable tracing.
+
+Usage: python tracing.py [TRACE_FILE ...] [--top N]
+"""
+import argparse
+import contextvars
+import functools
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+TRACE_DIR = os.path.join("Inputs and Outputs", "traces")
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_write_lock = threading.Lock()
+_trace_id = None
+
+
+def tracing_enabled():
+    return os.getenv("COPILOT_TRACE", "on").lower() not in ("off", "0", "false")
+
+
+def get_trace_id():
+    """Trace id shared by every span of this run"""
+    global _trace_id
+    if _trace_id is None:
+        _trace_id = os.getenv("COPILOT_TRACE_ID") or f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+    return _trace_id
+
+
+def trace_path():
+    return os.path.join(os.getenv("COPILOT_TRACE_DIR", TRACE_DIR), f"{get_trace_id()}.jsonl")
+
+
+class Span:
+    """One timed operation; attributes are free-form JSON values"""
+
+    def __init__(self, name, parent=None, attributes=None):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = dict(attributes or {})
+        if "stage" not in self.attributes and parent is not None and "stage" in parent.attributes:
+            self.attributes["stage"] = parent.attributes["stage"]
+        self.start = time.time()
+        self._started = time.perf_counter()
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def add(self, key, amount=1):
+        """Increment a numeric attribute (token counts, retries, events)"""
+        if amount:
+            self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def to_record(self, status, error, duration):
+        return {
+            "trace_id": get_trace_id(),
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration": duration,
+            "status": status,
+            "error": error,
+            "attributes": self.attributes,
+        }
+
+
+def _write_record(record):
+    path = trace_path()
+    line = json.dumps(record, default=str) + "\n"
+    with _write_lock:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Time a block as a span nested under the current one
+
+    The yielded Span accepts extra attributes via set()/add(). The "stage"
+    attribute is inherited from the parent span when not given.
+    """
+    current = Span(name, _current_span.get(), {k: v for k, v in attributes.items() if v is not None})
+    token = _current_span.set(current)
+    status, error = "ok", None
+    try:
+        yield current
+    except BaseException as e:
+        status, error = "error", f"{e.__class__.__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        if tracing_enabled():
+            try:
+                _write_record(current.to_record(status, error, time.perf_counter() - current._started))
+            except OSError as e:
+                print(f"⚠️ Could not write trace span: {e}")
+
+
+def traced(name=None, **attributes):
+    """Decorator wrapping every call of a function in a span"""
+    def decorator(fn):
+        span_name = name or f"{fn.__module__}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name, **attributes):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_usage(current, usage_metadata):
+    """Add token counts from a response's (or ADK event's) usage_metadata"""
+    if current is None or usage_metadata is None:
+        return
+    current.add("input_tokens", getattr(usage_metadata, "prompt_token_count", None) or 0)
+    current.add("output_tokens", getattr(usage_metadata, "candidates_token_count", None) or 0)
+    current.add("thinking_tokens", getattr(usage_metadata, "thoughts_token_count", None) or 0)
+    current.add("total_tokens", getattr(usage_metadata, "total_token_count", None) or 0)
+
+
+def record_response(current, response):
+    """Add token usage and grounding query count from a GenerateContentResponse"""
+    if current is None or response is None:
+        return
+    record_usage(current, getattr(response, "usage_metadata", None))
+    for candidate in getattr(response, "candidates", None) or []:
+        grounding = getattr(candidate, "grounding_metadata", None)
+        queries = getattr(grounding, "web_search_queries", None) if grounding else None
+        current.add("grounding_queries", len(queries or []))
+
+
+def record_event(current, event):
+    """Add model-call usage and grounding queries from an ADK runner event"""
+    if current is None:
+        return
+    current.add("events")
+    usage = getattr(event, "usage_metadata", None)
+    if usage is not None:
+        current.add("llm_calls")
+        record_usage(current, usage)
+    grounding = getattr(event, "grounding_metadata", None)
+    if grounding is not None:
+        current.add("grounding_queries", len(getattr(grounding, "web_search_queries", None) or []))
+
+
+def retry_counter(current):
+    """on_retry callback for rate_limit.call_with_retry that counts retries on the span"""
+    def on_retry(attempt, delay, error):
+        current.add("retries")
+        current.add("retry_wait_seconds", round(delay, 3))
+    return on_retry
+
+
+def load_spans(paths):
+    spans = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        spans.append(json.loads(line))
+                    except ValueError:
+                        continue
+    return spans
+
+
+def print_summary(spans, top=10):
+    """Print the slowest spans and per-stage token totals"""
+    print(f"\n{'=' * 80}")
+    print(f"🐢 SLOWEST {top} SPANS")
+    print(f"{'=' * 80}")
+    print(f"{'duration (s)':>12}  {'stage':<16}{'span':<40}{'status':<8}")
+    for record in sorted(spans, key=lambda s: -s["duration"])[:top]:
+        stage = record["attributes"].get("stage") or "-"
+        print(f"{record['duration']:>12.2f}  {stage:<16}{record['name'][:39]:<40}{record['status']:<8}")
+
+    totals = {}
+    for record in spans:
+        attributes = record["attributes"]
+        stage = attributes.get("stage") or "-"
+        total = totals.setdefault(stage, {"llm_calls": 0, "input_tokens": 0, "output_tokens": 0, "grounding_queries": 0, "retries": 0, "errors": 0})
+        total["llm_calls"] += 1 if attributes.get("kind") == "llm" else attributes.get("llm_calls", 0)
+        for key in ("input_tokens", "output_tokens", "grounding_queries", "retries"):
+            total[key] += attributes.get(key, 0) or 0
+        if record["status"] != "ok":
+            total["errors"] += 1
+
+    print(f"\n{'=' * 80}")
+    print("🔢 TOKENS PER STAGE")
+    print(f"{'=' * 80}")
+    print(f"{'stage':<18}{'llm calls':>10}{'input tok':>12}{'output tok':>12}{'searches':>10}{'retries':>9}{'errors':>8}")
+    for stage, total in sorted(totals.items()):
+        print(f"{stage:<18}{total['llm_calls']:>10}{total['input_tokens']:>12,}{total['output_tokens']:>12,}"
+              f"{total['grounding_queries']:>10}{total['retries']:>9}{total['errors']:>8}")
+
+    loops = [record for record in spans if record["attributes"].get("loop_iterations") is not None]
+    if loops:
+        print(f"\n{'=' * 80}")
+        print("🔁 LOOP ITERATIONS")
+        print(f"{'=' * 80}")
+        print(f"{'span':<40}{'agent':<20}{'iterations':>11}  missing weeks")
+        for record in loops:
+            attributes = record["attributes"]
+            missing = ", ".join(map(str, attributes.get("missing_weeks") or [])) or "-"
+            print(f"{record['name'][:39]:<40}{str(attributes.get('agent', '-'))[:19]:<20}{attributes['loop_iterations']:>11}  {missing}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize trace spans")
+    parser.add_argument("files", nargs="*", help="trace JSONL files (default: the most recent trace)")
+    parser.add_argument("--top", type=int, default=10, help="number of slowest spans to list")
+    args = parser.parse_args()
+
+    files = args.files
+    if not files:
+        candidates = sorted(glob.glob(os.path.join(os.getenv("COPILOT_TRACE_DIR", TRACE_DIR), "*.jsonl")), key=os.path.getmtime)
+        if not candidates:
+            print("❌ No trace files found")
+            return
+        files = candidates[-1:]
+    print(f"📄 Trace files: {', '.join(files)}")
+    print_summary(load_spans(files), args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+One file per week of deep content, plus an index
+
+The deep content agent saves each finished week with its save_week tool as
+weeks/week_NN.md in the output directory and records it in
+weeks/index.json (week number, title, file name, size, time saved), kept
+in week order. Later stages can load a single week with read_week() instead
+of parsing the whole course. merge_weeks() rebuilds deep_agent_output.txt
+from the week files for the stages that read the flat file, copying one
+file at a time.
+"""
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+
+WEEKS_DIR_NAME = "weeks"
+INDEX_NAME = "index.json"
+DONE_SENTINEL = "DONE and DUSTED"
+WEEK_TITLE_RE = re.compile(r'^#{1,6}\s*Week\s+\d+\s*[:\-–]?\s*(.*)$', re.IGNORECASE | re.MULTILINE)
+
+# index.json is read, updated and rewritten; weeks saved from several threads must not drop each other's entries
+_index_lock = threading.Lock()
+
+
+def weeks_dir(io_dir=None):
+    return Path(io_dir or os.getenv("COPILOT_IO_DIR") or "Inputs and Outputs") / WEEKS_DIR_NAME
+
+
+def week_path(week_number, io_dir=None):
+    return weeks_dir(io_dir) / f"week_{int(week_number):02d}.md"
+
+
+def _write_atomic(path, text):
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(text, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def load_index(io_dir=None):
+    """Return the index entries in week order ([] when nothing was saved)"""
+    try:
+        with open(weeks_dir(io_dir) / INDEX_NAME, 'r', encoding='utf-8') as f:
+            return json.load(f)["weeks"]
+    except (FileNotFoundError, ValueError, KeyError):
+        return []
+
+
+def week_title(markdown):
+    """Title from the first "# Week N: Title" heading, if any"""
+    match = WEEK_TITLE_RE.search(markdown or "")
+    return match.group(1).strip() if match else ""
+
+
+def save_week_file(week_number, title, markdown, io_dir=None):
+    """
+    Write one week's Markdown and update the index, replacing an earlier save of the same week
+
+    The PROCESSING / COMPLETED markers are added when missing so the merged
+    file keeps the layout the week parsers expect.
+    """
+    week_number = int(week_number)
+    text = markdown.strip()
+    if f"=== PROCESSING WEEK {week_number} ===" not in text:
+        text = f"=== PROCESSING WEEK {week_number} ===\n\n{text}"
+    if f"=== WEEK {week_number} COMPLETED ===" not in text:
+        text = f"{text}\n\n=== WEEK {week_number} COMPLETED ==="
+    text += "\n"
+
+    path = week_path(week_number, io_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _write_atomic(path, text)
+
+    entry = {
+        "week": week_number,
+        "title": title or week_title(text),
+        "file": path.name,
+        "bytes": len(text.encode("utf-8")),
+        "saved": time.time(),
+    }
+    with _index_lock:
+        entries = [e for e in load_index(io_dir) if e["week"] != week_number] + [entry]
+        entries.sort(key=lambda e: e["week"])
+        _write_atomic(path.parent / INDEX_NAME, json.dumps({"weeks": entries}, indent=2))
+    return entry
+
+
+def read_week(week_number, io_dir=None):
+    """Return one saved week's Markdown, or None if it was not saved"""
+    try:
+        return week_path(week_number, io_dir).read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return None
+
+
+def reset_weeks(io_dir=None):
+    """Remove saved weeks from an earlier course before a fresh run"""
+    directory = weeks_dir(io_dir)
+    shutil.rmtree(directory, ignore_errors=True)
+    directory.mkdir(parents=True, exist_ok=True)
+
+
+def merge_weeks(output_path, io_dir=None, done=True, label="DeepCourseContentCreator"):
+    """
+    Write every indexed week, in week order, into output_path
+
+    Week files are copied straight into the output one at a time, so memory
+    does not grow with the course. Appends the DONE sentinel when done is set.
+    Returns the number of weeks merged.
+    """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    merged = 0
+    with open(tmp_path, 'w', encoding='utf-8') as out:
+        for entry in load_index(io_dir):
+            try:
+                week_file = open(week_path(entry["week"], io_dir), 'r', encoding='utf-8')
+            except FileNotFoundError:
+                continue
+            with week_file:
+                separator = "\n\n" if merged else ""
+                out.write(f"{separator}--- [{label} | week {entry['week']}] ---\n")
+                shutil.copyfileobj(week_file, out)
+            merged += 1
+        if done and merged:
+            out.write(f"\n\n--- [{label} | done] ---\n{DONE_SENTINEL}\n")
+    os.replace(tmp_path, output_path)
+    return merged
@@ -0,0 +1,216 @@
+"""
+Single-pass week segmenter for deep content output
+
+scan() sweeps the text once with one regex and returns an offset index of
+every week marker: "# Week N" headings, "=== WEEK N ===" and
+"=== WEEK N COMPLETED ===" markers and plain "Week N" mentions. segment()
+resolves that index, never the text, into week spans using the same
+precedence as the old regex cascade in course_material.parse_weeks_from_content:
+
+    heading     # Week N ... === WEEK N COMPLETED ===
+    marker      === WEEK N === ... === WEEK N COMPLETED ===
+    colon       Week N: ... === WEEK N COMPLETED ===
+    completed   everything up to each === WEEK N COMPLETED ===
+    mentions    from the first mention of Week N to the next mention of Week N+1
+
+Every step is linear in the text (or in the number of markers), so large
+LoopAgent logs cannot make it backtrack. The same functions accept str, bytes
+or an mmap; iter_file_weeks() memory-maps a file and yields zero-copy
+memoryview slices, one week at a time.
+"""
+import mmap
+import re
+
+HEADING = "heading"
+MARKER = "marker"
+COMPLETED = "completed"
+MENTION = "mention"
+STRATEGIES = ("heading", "marker", "colon", "completed", "mentions")
+
+# Every marker contains "Week N"; matching only that core (its prefix and
+# suffix are checked by hand) keeps the regex engine on its fast literal search
+_CORE_PATTERN = r'week (\d+)'
+CORE_RE = re.compile(_CORE_PATTERN, re.IGNORECASE)
+CORE_RE_BYTES = re.compile(_CORE_PATTERN.encode('ascii'), re.IGNORECASE)
+WHITESPACE = frozenset(b' \t\n\r\x0b\x0c')
+_TEXT = {
+    str: ("# ", "=== ", " COMPLETED ===", " ===", ":"),
+    bytes: (b"# ", b"=== ", b" COMPLETED ===", b" ===", b":"),
+}
+
+
+def scan(buffer):
+    """
+    Offset index of the week markers in buffer: [(kind, week, start, end, colon)]
+
+    start/end are the marker's offsets (characters for str, bytes otherwise);
+    a heading or mention ends after its number, and colon tells whether a ":"
+    directly follows it. Markers are recognised case-insensitively, like
+    "# Week N", "=== WEEK N COMPLETED ===", "=== WEEK N ===" and "Week N".
+
+    Like the old regex passes, a marker's closing "===" can also open the
+    next one ("=== WEEK 1 === WEEK 1 COMPLETED ===" holds both); such a
+    marker starts 3 characters before the previous one ends.
+    """
+    is_text = isinstance(buffer, str)
+    core_re = CORE_RE if is_text else CORE_RE_BYTES
+    hash_prefix, marker_prefix, completed_suffix, marker_suffix, colon_text = _TEXT[str if is_text else bytes]
+    tokens = []
+    previous_end = 0
+    for match in core_re.finditer(buffer):
+        start, end = match.span()
+        week = int(match.group(1))
+        token = None
+        if start - 2 >= previous_end and buffer[start - 2:start] == hash_prefix:
+            token = (HEADING, week, start - 2, end, buffer[end:end + 1] == colon_text)
+        elif start - 4 >= previous_end and buffer[start - 4:start] == marker_prefix:
+            if buffer[end:end + 14].upper() == completed_suffix:
+                token = (COMPLETED, week, start - 4, end + 14, False)
+            elif buffer[end:end + 4] == marker_suffix:
+                token = (MARKER, week, start - 4, end + 4, False)
+        if token is None:
+            token = (MENTION, week, start, end, buffer[end:end + 1] == colon_text)
+        tokens.append(token)
+        # A MARKER or COMPLETED marker stops at its first closing " ===", which the next marker may reuse
+        previous_end = token[3] - 3 if token[0] in (MARKER, COMPLETED) else token[3]
+    return tokens
+
+
+def _pair(events):
+    """
+    Pair starts with the first later COMPLETED marker of the same week
+
+    events is an ordered list of (is_start, week, start, end). Like a lazy
+    regex with a backreference, the leftmost start that has a matching
+    COMPLETED marker after its end wins and the search resumes after that
+    marker, but the next matching marker of each start is found in one
+    backwards pass.
+    """
+    following = [None] * len(events)
+    next_completed = {}
+    for i in range(len(events) - 1, -1, -1):
+        is_start, week, start, end = events[i]
+        if is_start:
+            # Skip a COMPLETED marker sharing this start's closing "==="
+            candidate = next_completed.get(week)
+            while candidate is not None and candidate[0] < end:
+                candidate = candidate[2]
+            following[i] = candidate
+        else:
+            next_completed[week] = (start, end, next_completed.get(week))
+
+    spans = []
+    resume = 0
+    for i, (is_start, week, start, end) in enumerate(events):
+        if is_start and start >= resume and following[i] is not None:
+            completed_start, completed_end, _ = following[i]
+            spans.append((week, end, completed_start))
+            resume = completed_end
+    return spans
+
+
+def segment(buffer, tokens=None):
+    """
+    Return (strategy, [(week, start, end)]) for the week contents of buffer
+
+    strategy is the first of STRATEGIES that found any week (None if none
+    did); spans are in the order found, before whitespace trimming.
+    """
+    if tokens is None:
+        tokens = scan(buffer)
+    completed = [(False, week, start, end) for kind, week, start, end, _ in tokens if kind == COMPLETED]
+
+    for strategy, kinds in (("heading", (HEADING,)), ("marker", (MARKER,))):
+        events = [(kind != COMPLETED, week, start, end) for kind, week, start, end, _ in tokens
+                  if kind == COMPLETED or kind in kinds]
+        spans = _pair(events)
+        if spans:
+            return strategy, spans
+
+    # "Week N:" also appears inside "# Week N:" headings
+    events = []
+    for kind, week, start, end, colon in tokens:
+        if kind == COMPLETED:
+            events.append((False, week, start, end))
+        elif colon and kind in (HEADING, MENTION):
+            events.append((True, week, start + 2 if kind == HEADING else start, end + 1))
+    spans = _pair(events)
+    if spans:
+        return "colon", spans
+
+    if completed:
+        spans = []
+        resume = 0
+        for _, week, start, end in completed:
+            if start >= resume:  # not one sharing the previous marker's closing "==="
+                spans.append((week, resume, start))
+                resume = end
+        return "completed", spans
+
+    # A week runs from its first mention to the first later mention of the next week
+    first_mention = {}
+    ends = {}
+    for kind, week, start, end, _ in tokens:
+        position = start + 2 if kind == HEADING else start + 4 if kind == MARKER else start
+        first_mention.setdefault(week, position)
+        if week - 1 in first_mention and week - 1 not in ends and first_mention[week - 1] < position:
+            ends[week - 1] = position
+    if not first_mention:
+        return None, []
+    return "mentions", [(week, first_mention[week], ends.get(week, len(buffer))) for week in sorted(first_mention)]
+
+
+def strip_span(buffer, start, end):
+    """Narrow (start, end) past leading and trailing whitespace without copying the text"""
+    if isinstance(buffer, str):
+        while start < end and buffer[start].isspace():
+            start += 1
+        while end > start and buffer[end - 1].isspace():
+            end -= 1
+    else:
+        while start < end and buffer[start] in WHITESPACE:
+            start += 1
+        while end > start and buffer[end - 1] in WHITESPACE:
+            end -= 1
+    return start, end
+
+
+def iter_weeks(buffer):
+    """Yield (week, content) for buffer, trimmed; content is a memoryview slice unless buffer is a str"""
+    _, spans = segment(buffer)
+    view = buffer if isinstance(buffer, str) else memoryview(buffer)
+    for week, start, end in spans:
+        start, end = strip_span(buffer, start, end)
+        yield week, view[start:end]
+
+
+def iter_file_weeks(path, on_segment=None):
+    """
+    Memory-map path and yield (week, memoryview) for each week in it
+
+    Slices are only valid until the next week is requested (copy with
+    bytes() or .tobytes().decode() to keep one), so the file can be unmapped
+    when the iteration ends. on_segment(strategy, spans, tokens) is called
+    once the file is segmented, before the first week.
+    """
+    with open(path, 'rb') as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            return
+    with mapped:
+        view = memoryview(mapped)
+        try:
+            tokens = scan(mapped)
+            strategy, spans = segment(mapped, tokens)
+            if on_segment:
+                on_segment(strategy, spans, tokens)
+            for week, start, end in spans:
+                start, end = strip_span(mapped, start, end)
+                piece = view[start:end]
+                try:
+                    yield week, piece
+                finally:
+                    piece.release()
+        finally:
+            view.release()